@@ -111,13 +111,13 @@ def get_admin_token():
         print(f"   Response: {response.text}")
         sys.exit(1)
 
-def add_company(token, company_data):
-    """Add a single company"""
-    print(f"➕ Adding company: {company_data['company_name']}...")
+def add_companies(token, companies):
+    """Add several companies with one bulk request"""
+    print(f"➕ Adding {len(companies)} companies in one request...")
     
     response = requests.post(
-        f"{BACKEND_URL}/api/worked-with",
-        json=company_data,
+        f"{BACKEND_URL}/api/worked-with/bulk",
+        json=companies,
         headers={
             "Content-Type": "application/json",
             "Authorization": f"Bearer {token}"
@@ -125,8 +125,8 @@ def add_company(token, company_data):
     )
     
     if response.status_code == 200:
-        result = response.json()
-        print(f"   ✅ Added successfully! ID: {result.get('id', 'N/A')}")
+        for result in response.json():
+            print(f"   ✅ Added {result.get('company_name')}! ID: {result.get('id', 'N/A')}")
         return True
     else:
         print(f"   ❌ Failed: {response.status_code}")
@@ -175,17 +175,20 @@ def main():
     skipped_count = 0
     failed_count = 0
     
+    new_companies = []
     for company in MOCK_COMPANIES:
         # Skip if company already exists
         if company['company_name'] in existing_names:
             print(f"⏭️  Skipping: {company['company_name']} (already exists)")
             skipped_count += 1
             continue
-        
-        if add_company(token, company):
-            added_count += 1
+        new_companies.append(company)
+    
+    if new_companies:
+        if add_companies(token, new_companies):
+            added_count = len(new_companies)
         else:
-            failed_count += 1
+            failed_count = len(new_companies)
     
     print()
     print("=" * 60)
@@ -0,0 +1,275 @@
+"""
+Bulk appointment import
+Parses an NDJSON or CSV upload as it streams in, validates each row against
+AppointmentCreate, rejects slot conflicts against the slot index (read once
+per import), claims each accepted row's slot with a conditional write and
+commits the claimed rows in batched multi-location writes. A slot booked by
+someone else after the index was read is reported as a conflict for that row.
+Progress is reported as events (per-row errors, then a summary), so neither
+the upload nor the accepted rows are held in memory.
+"""
+import asyncio
+import csv
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from config import settings
+from models import Appointment, AppointmentCreate
+from slot_index import SLOT_INDEX_ROOT, ACTIVE_STATUSES, slot_key, slot_path, release_slot
+from timezone_utils import local_to_utc
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+IMPORT_STATUSES = ('pending', 'confirmed', 'completed', 'cancelled')
+MAX_ROW_BYTES = 64 * 1024
+MAX_REPORTED_ERRORS = 1000
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without buffering more than one line"""
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line.decode('utf-8-sig').rstrip('\r')
+        if len(buffer) > MAX_ROW_BYTES:
+            raise ValueError(f"Line longer than {MAX_ROW_BYTES} bytes")
+    if buffer:
+        yield buffer.decode('utf-8-sig').rstrip('\r')
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (row number, record, parse error) for each data row"""
+    row = 0
+    if fmt == 'ndjson':
+        async for line in lines:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row, None, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(record, dict):
+                yield row, None, "Each line must be a JSON object"
+                continue
+            yield row, record, None
+        return
+
+    # CSV: a record may span lines inside quotes, so join lines until the
+    # quotes balance (escaped quotes are doubled, which keeps the parity)
+    header = None
+    pending = ''
+    async for line in lines:
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            if len(pending) > MAX_ROW_BYTES:
+                raise ValueError(f"Row longer than {MAX_ROW_BYTES} bytes")
+            continue
+        record_text, pending = pending, ''
+        if not record_text.strip():
+            continue
+
+        values = next(csv.reader([record_text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row += 1
+        if len(values) != len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells are treated as missing so optional fields validate
+        yield row, {name: value for name, value in zip(header, values) if value != ''}, None
+
+    if pending:
+        yield row + 1, None, "Unterminated quoted field"
+
+
+def _validation_message(error: ValidationError) -> str:
+    """Compact one-line summary of a Pydantic validation error"""
+    return '; '.join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+class AppointmentImporter:
+    """Validates, de-conflicts and writes imported appointments in batches"""
+
+    def __init__(self, db, dry_run: bool = False, chunk_size: Optional[int] = None):
+        self._db = db
+        self.dry_run = dry_run
+        # Slot entries are claimed one request each, so the batch only holds records
+        self.chunk_size = chunk_size or settings.FIREBASE_BATCH_SIZE
+        self._taken: Set[Tuple[str, str]] = set()
+        self._pending: List[Tuple[int, Appointment]] = []
+        self.touched_days: Set[str] = set()
+        self.total = 0
+        self.imported = 0
+        self.failed = 0
+
+    async def load_slots(self):
+        """Read the slot index once; conflicts are then checked in memory"""
+        index = await self._db.get(SLOT_INDEX_ROOT) or {}
+        self._taken = {
+            (day, time_key)
+            for day, slots in index.items() if isinstance(slots, dict)
+            for time_key in slots
+        }
+
+    def validate(self, record: Dict[str, Any]) -> Appointment:
+        """Build an Appointment from a raw record; raises ValueError with a message"""
+        status_value = record.pop('status', 'pending')
+        if status_value not in IMPORT_STATUSES:
+            raise ValueError(f"status: must be one of {', '.join(IMPORT_STATUSES)}")
+
+        try:
+            appointment_data = AppointmentCreate(**record)
+        except ValidationError as e:
+            raise ValueError(_validation_message(e))
+
+        try:
+            utc_datetime = local_to_utc(
+                appointment_data.appointment_date,
+                appointment_data.appointment_time,
+                appointment_data.user_timezone
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid timezone or datetime format: {e}")
+
+        return Appointment(
+            **appointment_data.dict(),
+            appointment_datetime_utc=utc_datetime.isoformat(),
+            status=status_value
+        )
+
+    async def run(self, chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Dict[str, Any]]:
+        """Import a streamed upload, yielding error events and a final summary"""
+        await self.load_slots()
+        try:
+            async for row, record, error in iter_records(iter_lines(chunks), fmt):
+                self.total += 1
+                if error is None:
+                    try:
+                        appointment = self.validate(record)
+                        error = self._claim(appointment)
+                    except ValueError as e:
+                        error = str(e)
+
+                if error is not None:
+                    self.failed += 1
+                    yield {"row": row, "error": error}
+                    continue
+
+                self._pending.append((row, appointment))
+                if len(self._pending) >= self.chunk_size:
+                    async for event in self._flush():
+                        yield event
+
+            async for event in self._flush():
+                yield event
+        except (ValueError, UnicodeDecodeError) as e:
+            # Malformed stream: rows already committed stay imported
+            yield self.summary(error=str(e))
+            return
+
+        yield self.summary()
+
+    def _claim(self, appointment: Appointment) -> Optional[str]:
+        """Reserve the appointment's slot in the in-memory set (claimed in the database on flush)"""
+        if appointment.status not in ACTIVE_STATUSES:
+            return None
+        key = slot_key(appointment.appointment_datetime_utc)
+        if key in self._taken:
+            return "This appointment slot is already booked"
+        self._taken.add(key)
+        return None
+
+    async def _reserve_slots(self, appointments: List[Appointment]) -> List[Optional[bool]]:
+        """Claim the slots of active appointments with conditional writes
+
+        True when claimed (or no slot is needed), False when another booking
+        holds the slot and None when the claim failed.
+        """
+        semaphore = asyncio.Semaphore(settings.FIREBASE_POOL_SIZE)
+
+        async def reserve(appointment: Appointment) -> Optional[bool]:
+            if appointment.status not in ACTIVE_STATUSES:
+                return True
+            try:
+                async with semaphore:
+                    reserved, _ = await self._db.reserve(slot_path(appointment.appointment_datetime_utc), appointment.id)
+            except Exception as e:
+                logger.error(f"Failed to reserve slot for imported appointment {appointment.id}: {e}")
+                return None
+            return reserved
+
+        return await asyncio.gather(*(reserve(appointment) for appointment in appointments))
+
+    async def _release_slots(self, appointments: List[Appointment]):
+        """Give back slots claimed for appointments that were not written"""
+        await asyncio.gather(*(
+            release_slot(self._db, slot_path(appointment.appointment_datetime_utc), appointment.id)
+            for appointment in appointments if appointment.status in ACTIVE_STATUSES
+        ))
+
+    async def _flush(self) -> AsyncIterator[Dict[str, Any]]:
+        """Claim the slots of pending appointments, then commit the claimed ones in one batch"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        if not self.dry_run:
+            # A booking made since load_slots may hold a slot; those rows conflict
+            reserved = await self._reserve_slots([appointment for _, appointment in pending])
+            claimed = []
+            for (row, appointment), won in zip(pending, reserved):
+                if won:
+                    claimed.append((row, appointment))
+                    continue
+                self.failed += 1
+                if won is None:
+                    self._taken.discard(slot_key(appointment.appointment_datetime_utc))
+                    yield {"row": row, "error": "Failed to reserve appointment slot"}
+                else:
+                    yield {"row": row, "error": "This appointment slot is already booked"}
+            pending = claimed
+            if not pending:
+                return
+
+            batch = self._db.batch()
+            for _, appointment in pending:
+                batch.set(f'appointments/{appointment.id}', appointment.dict())
+
+            if not await batch.commit():
+                await self._release_slots([appointment for _, appointment in pending])
+                for row, appointment in pending:
+                    self._taken.discard(slot_key(appointment.appointment_datetime_utc))
+                    self.failed += 1
+                    yield {"row": row, "error": "Failed to write appointment"}
+                return
+
+        for _, appointment in pending:
+            self.touched_days.add(slot_key(appointment.appointment_datetime_utc)[0])
+        self.imported += len(pending)
+
+    def summary(self, error: Optional[str] = None) -> Dict[str, Any]:
+        """Final event of an import"""
+        summary = {
+            "summary": True,
+            "dry_run": self.dry_run,
+            "total_rows": self.total,
+            "imported": self.imported,
+            "failed": self.failed,
+        }
+        if error:
+            summary["error"] = error
+        logger.info(f"Appointment import: {self.imported} imported, {self.failed} failed of {self.total} rows")
+        return summary
@@ -0,0 +1,148 @@
+"""
+Benchmark for the appointments PDF export
+Compares the old single-table, in-memory report with exports.write_appointments_pdf
+(fixed-size tables written to a file). Each case runs in a fresh process so
+peak RSS is measured per case:
+
+    python benchmark_pdf_export.py                     # 1k, 10k, 50k rows
+    python benchmark_pdf_export.py --rows 1000 10000
+    python benchmark_pdf_export.py --skip-legacy       # new implementation only
+"""
+import sys
+import os
+import json
+import random
+import resource
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
+
+
+def sample_records(rows: int) -> list:
+    """Raw appointment records shaped like the database rows"""
+    random.seed(42)
+    start = datetime(2025, 3, 1)
+    records = []
+    for i in range(rows):
+        created = start + timedelta(minutes=7 * i)
+        records.append({
+            'id': f'appt-{i:06d}',
+            'name': f'Customer {i}',
+            'email': f'customer{i}@example.com',
+            'phone': f'+1555{i:07d}',
+            'business': random.choice(['Acme Inc', 'Globex', None, 'Initech']),
+            'appointment_date': created.strftime('%Y-%m-%d'),
+            'appointment_time': created.strftime('%H:%M'),
+            'user_timezone': 'America/New_York',
+            'appointment_datetime_utc': created.isoformat(),
+            'status': random.choice(STATUSES),
+            'created_at': created.isoformat(),
+        })
+    records.reverse()
+    return records
+
+
+def legacy_pdf(records: list) -> bytes:
+    """The export server.py used before exports.write_appointments_pdf"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.enums import TA_CENTER
+    from io import BytesIO
+    from models import Appointment
+
+    appointments = [Appointment(**record) for record in records]
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, spaceAfter=30,
+                                 alignment=TA_CENTER, textColor=colors.HexColor('#00FFD1'))
+    story = [
+        Paragraph("Lead G - Appointments Report", title_style),
+        Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal']),
+        Spacer(1, 20),
+    ]
+    summary_data = [['Status', 'Count'], ['Total', str(len(appointments))]]
+    summary_data += [[s.capitalize(), str(len([a for a in appointments if a.status == s]))] for s in STATUSES]
+    summary_table = Table(summary_data, colWidths=[2*inch, 1*inch])
+    summary_table.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 1, colors.black)]))
+    story += [summary_table, Spacer(1, 30), Paragraph("Appointment Details", styles['Heading2']), Spacer(1, 12)]
+
+    table_data = [['Name', 'Email', 'Phone', 'Business', 'Date', 'Time', 'Status']]
+    for a in appointments:
+        table_data.append([a.name, a.email, a.phone, a.business or 'N/A', a.appointment_date,
+                           a.appointment_time, a.status.capitalize()])
+    appointments_table = Table(table_data, colWidths=[1.2*inch, 1.5*inch, 1*inch, 1.2*inch, 0.8*inch, 0.6*inch, 0.7*inch])
+    appointments_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#333333')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    story.append(appointments_table)
+    doc.build(story)
+    buffer.seek(0)
+    return BytesIO(buffer.read()).getvalue()
+
+
+def run_case(case: str, rows: int):
+    """Run one case in this process and print a JSON result line"""
+    import reportlab.platypus  # noqa: F401 - import cost is not part of the timing
+    from exports import temp_export_path, remove_file, write_appointments_pdf
+
+    records = sample_records(rows)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if case == 'legacy':
+        size = len(legacy_pdf(records))
+    else:
+        path = temp_export_path('.pdf')
+        try:
+            write_appointments_pdf(records, path)
+            size = os.path.getsize(path)
+        finally:
+            remove_file(path)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': elapsed, 'peak_mb': peak / 1024, 'growth_mb': (peak - baseline) / 1024, 'bytes': size}))
+
+
+def measure(case: str, rows: int) -> dict:
+    """Run a case in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--case', case, '--rows', str(rows)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if '--case' in sys.argv:
+        run_case(sys.argv[sys.argv.index('--case') + 1], int(sys.argv[sys.argv.index('--rows') + 1]))
+        sys.exit(0)
+
+    sizes = [1000, 10000, 50000]
+    if '--rows' in sys.argv:
+        sizes = [int(value) for value in sys.argv[sys.argv.index('--rows') + 1:] if value.isdigit()]
+    cases = ['chunked'] if '--skip-legacy' in sys.argv else ['legacy', 'chunked']
+
+    print("=" * 60)
+    print("Lead G - PDF Export Benchmark")
+    print("=" * 60)
+    for rows in sizes:
+        for case in cases:
+            result = measure(case, rows)
+            print(f"{rows:>6} rows  {case:<8} {result['seconds']:8.2f} s | peak RSS {result['peak_mb']:7.1f} MB "
+                  f"(+{result['growth_mb']:.1f} MB) | {result['bytes'] / 1024:8.0f} KB")
@@ -0,0 +1,77 @@
+"""
+Microbenchmark for UTC -> local appointment time conversion
+Compares the old per-row pytz path with timezone_utils:
+
+    python benchmark_timezone.py               # 5,000 appointments
+    python benchmark_timezone.py --rows 50000
+"""
+import sys
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytz
+
+from timezone_utils import utc_to_local, utc_to_local_batch
+
+TIMEZONES = ['America/New_York', 'Europe/London', 'Asia/Kolkata', 'Australia/Sydney']
+
+
+def per_row_pytz(utc_datetime_str: str, timezone_str: str) -> tuple:
+    """The conversion server.py used before timezone_utils"""
+    utc_datetime = datetime.fromisoformat(utc_datetime_str.replace('Z', '+00:00'))
+    utc_datetime = utc_datetime.replace(tzinfo=pytz.UTC)
+    user_tz = pytz.timezone(timezone_str)
+    local_datetime = utc_datetime.astimezone(user_tz)
+    return local_datetime.strftime("%Y-%m-%d"), local_datetime.strftime("%H:%M")
+
+
+def sample_appointments(rows: int) -> list:
+    """UTC ISO strings on half-hour slots spread over 90 days"""
+    random.seed(42)
+    start = datetime(2025, 3, 1, tzinfo=pytz.UTC)
+    return [
+        (start + timedelta(minutes=30 * random.randrange(90 * 48))).isoformat()
+        for _ in range(rows)
+    ]
+
+
+def best_of(func, repeat: int = 5) -> float:
+    """Fastest wall time of several runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(rows: int):
+    values = sample_appointments(rows)
+
+    for timezone_str in TIMEZONES:
+        expected = [per_row_pytz(value, timezone_str) for value in values]
+        assert [utc_to_local(value, timezone_str) for value in values] == expected
+        assert utc_to_local_batch(values, timezone_str) == expected
+
+        legacy = best_of(lambda: [per_row_pytz(value, timezone_str) for value in values])
+        single = best_of(lambda: [utc_to_local(value, timezone_str) for value in values])
+        batch = best_of(lambda: utc_to_local_batch(values, timezone_str))
+
+        print(f"{timezone_str:<20} pytz per-row {legacy * 1000:8.1f} ms | "
+              f"utc_to_local {single * 1000:8.1f} ms ({legacy / single:4.1f}x) | "
+              f"batch {batch * 1000:8.1f} ms ({legacy / batch:4.1f}x)")
+
+
+if __name__ == "__main__":
+    rows = 5000
+    if '--rows' in sys.argv:
+        rows = int(sys.argv[sys.argv.index('--rows') + 1])
+
+    print("=" * 60)
+    print(f"Lead G - Timezone Conversion Benchmark ({rows} rows)")
+    print("=" * 60)
+    run(rows)
@@ -0,0 +1,160 @@
+"""
+In-process caches for hot read endpoints
+Entries expire after a TTL and the cache holds at most max_entries (least
+recently used entries are evicted first). Each worker has its own cache, so
+the TTL bounds how stale another worker's view can get.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# Result of a shared load whose loader was cancelled: waiters retry the load
+_CANCELLED = object()
+
+
+class TTLCache:
+    """TTL- and size-bounded LRU cache with tag based invalidation"""
+
+    def __init__(self, ttl: float, max_entries: int = 1024, name: str = 'cache'):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._generation = 0
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = ()) -> None:
+        """Store value under key; tags let a group of keys be dropped together"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            tags = tuple(tags)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], tags: Iterable[Hashable] = ()) -> Any:
+        """Read-through: return the cached value or await loader() and cache it
+
+        Concurrent misses for the same key share one load. A value loaded while
+        an invalidation happened is returned but not cached.
+        """
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            pending = self._loading.get(key)
+            if pending is None or pending.get_loop() is not asyncio.get_running_loop():
+                break
+            value = await asyncio.shield(pending)
+            if value is not _CANCELLED:
+                return value
+            # The loading request was cancelled (e.g. its client disconnected): load again
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Cancelling the future would cancel every waiter too
+            future.set_result(_CANCELLED)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(value)
+            with self._lock:
+                current = self._generation == generation
+            if current:
+                self.set(key, value, tags)
+            return value
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+    def delete(self, key: Hashable) -> None:
+        """Drop a single key"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Drop every key stored with tag and return how many were dropped"""
+        with self._lock:
+            self._generation += 1
+            keys = self._tags.pop(tag, set())
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+            if keys:
+                logger.debug(f"{self.name}: invalidated {len(keys)} entries for {tag}")
+            return len(keys)
+
+    def clear(self) -> None:
+        """Drop everything"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the health check"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _remove(self, key: Hashable) -> Optional[Any]:
+        """Remove key and its tag memberships (caller holds the lock)"""
+        value, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return value
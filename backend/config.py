@@ -13,6 +13,69 @@ class Settings:
     FIREBASE_CREDENTIALS_PATH = os.getenv('FIREBASE_CREDENTIALS_PATH', '/app/backend/firebase.json')
     FIREBASE_PROJECT_ID = os.getenv('FIREBASE_PROJECT_ID', 'lead-g-final')
     
+    # Firebase Realtime Database HTTP client (one keep-alive pool per worker)
+    FIREBASE_POOL_SIZE = int(os.getenv('FIREBASE_POOL_SIZE', '10'))
+    FIREBASE_POOL_BLOCK = os.getenv('FIREBASE_POOL_BLOCK', 'false').lower() == 'true'
+    FIREBASE_MAX_RETRIES = int(os.getenv('FIREBASE_MAX_RETRIES', '2'))
+    FIREBASE_CONNECT_TIMEOUT = float(os.getenv('FIREBASE_CONNECT_TIMEOUT', '3.05'))
+    FIREBASE_READ_TIMEOUT = float(os.getenv('FIREBASE_READ_TIMEOUT', '10'))
+    FIREBASE_HTTP2 = os.getenv('FIREBASE_HTTP2', 'false').lower() == 'true'
+    FIREBASE_BATCH_SIZE = int(os.getenv('FIREBASE_BATCH_SIZE', '500'))  # paths per multi-location PATCH
+    
+    # Storage backend: firebase (falls back to the mock when unavailable) or sqlite (single node)
+    DATABASE_BACKEND = os.getenv('DATABASE_BACKEND', 'firebase').lower()
+    SQLITE_DB_PATH = os.getenv('SQLITE_DB_PATH', '/app/backend/data/leadg.sqlite3')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL').upper()  # FULL, NORMAL or OFF
+    
+    # Mock database persistence (only used when Firebase is unavailable); empty = in-memory only
+    MOCK_DB_DIR = os.getenv('MOCK_DB_DIR', '')
+    MOCK_DB_FSYNC = os.getenv('MOCK_DB_FSYNC', 'interval').lower()  # always, interval or never
+    MOCK_DB_FSYNC_INTERVAL = float(os.getenv('MOCK_DB_FSYNC_INTERVAL', '1'))
+    MOCK_DB_SNAPSHOT_EVERY = int(os.getenv('MOCK_DB_SNAPSHOT_EVERY', '10000'))  # log records between snapshots
+    
+    # Availability cache (per worker, keyed by date and timezone)
+    AVAILABILITY_CACHE_TTL = float(os.getenv('AVAILABILITY_CACHE_TTL', '30'))
+    AVAILABILITY_CACHE_SIZE = int(os.getenv('AVAILABILITY_CACHE_SIZE', '1024'))
+    
+    # Public testimonials / worked-with list cache (per worker)
+    PUBLIC_LIST_CACHE_TTL = float(os.getenv('PUBLIC_LIST_CACHE_TTL', '300'))
+    PUBLIC_LIST_CACHE_SIZE = int(os.getenv('PUBLIC_LIST_CACHE_SIZE', '256'))
+    
+    # HTTP Cache-Control for public read endpoints (all send ETags and honour If-None-Match)
+    TESTIMONIALS_CACHE_CONTROL = os.getenv('TESTIMONIALS_CACHE_CONTROL', 'public, max-age=60, stale-while-revalidate=300')
+    WORKED_WITH_CACHE_CONTROL = os.getenv('WORKED_WITH_CACHE_CONTROL', 'public, max-age=60, stale-while-revalidate=300')
+    AVAILABILITY_CACHE_CONTROL = os.getenv('AVAILABILITY_CACHE_CONTROL', 'public, no-cache')
+    
+    # Export files (written to a temp dir, streamed back in chunks)
+    EXPORT_TMP_DIR = os.getenv('EXPORT_TMP_DIR', '')  # empty = system temp dir
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', str(64 * 1024)))
+    PDF_ROWS_PER_TABLE = int(os.getenv('PDF_ROWS_PER_TABLE', '40'))  # roughly one A4 page
+    EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', '1000'))  # records per database read in CSV/NDJSON exports
+    
+    # Export jobs: render worker processes (0 = threads) and the artifact cache
+    EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '2'))
+    EXPORT_ARTIFACT_DIR = os.getenv('EXPORT_ARTIFACT_DIR', '')  # empty = <system temp>/leadg_exports
+    EXPORT_JOB_TTL = float(os.getenv('EXPORT_JOB_TTL', '3600'))  # seconds a finished job stays queryable
+    
+    # ImgBB uploads (per worker): concurrent uploads, retries with exponential backoff
+    IMGBB_MAX_CONCURRENCY = int(os.getenv('IMGBB_MAX_CONCURRENCY', '4'))
+    IMGBB_MAX_RETRIES = int(os.getenv('IMGBB_MAX_RETRIES', '3'))
+    IMGBB_TIMEOUT = float(os.getenv('IMGBB_TIMEOUT', '30'))
+    IMGBB_BACKOFF = float(os.getenv('IMGBB_BACKOFF', '0.5'))  # first retry delay in seconds, doubled each attempt
+    IMGBB_MAX_BACKOFF = float(os.getenv('IMGBB_MAX_BACKOFF', '10'))
+    
+    # Uploads: size is enforced while the body streams in, dimensions come from the image header
+    MAX_LOGO_SIZE_MB = int(os.getenv('MAX_LOGO_SIZE_MB', '5'))
+    MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', '25000000'))
+    
+    # Logo storage: 'imgbb' (remote originals) or 'local' (resized variants under UPLOAD_DIR)
+    LOGO_STORAGE = os.getenv('LOGO_STORAGE', 'imgbb').lower()
+    UPLOAD_DIR = os.getenv('UPLOAD_DIR', '/app/backend/uploads')
+    LOGO_VARIANT_WIDTHS = [int(width) for width in os.getenv('LOGO_VARIANT_WIDTHS', '160,320,640').split(',') if width.strip()]
+    LOGO_DEFAULT_WIDTH = int(os.getenv('LOGO_DEFAULT_WIDTH', '320'))
+    LOGO_WEBP_QUALITY = int(os.getenv('LOGO_WEBP_QUALITY', '80'))
+    PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', '')  # base of /uploads URLs; empty = the request's base URL
+    
     # CORS Configuration - Very permissive for cross-domain access
     CORS_ORIGINS_STRING = os.getenv('CORS_ORIGINS', '*')
     
@@ -8,11 +8,27 @@ from datetime import datetime
 import os
 import json
 
+from mock_index import CollectionIndex
+
 logger = logging.getLogger(__name__)
 
 # In-memory storage for mock database
 _mock_storage = {}
 
+# Indexes of queried collections (see mock_index), kept up to date by the document writes
+_mock_indexes: Dict[str, CollectionIndex] = {}
+
+def _reindex(collection_name: str, doc_id: str):
+    """Update the collection's indexes after a document write"""
+    index = _mock_indexes.get(collection_name)
+    if index is None:
+        return
+    data = _mock_storage.get(collection_name, {})
+    if doc_id in data:
+        index.put(doc_id, data[doc_id])
+    else:
+        index.discard(doc_id)
+
 class MockDocument:
     """Mock Firestore document for development"""
     def __init__(self, data: Dict[str, Any]):
@@ -36,6 +52,7 @@ class MockDocumentReference:
     
     def set(self, data: Dict[str, Any]):
         _mock_storage[self.collection_name][self.doc_id] = data
+        _reindex(self.collection_name, self.doc_id)
         logger.info(f"Mock: Set document {self.doc_id} in {self.collection_name}")
         return self
     
@@ -44,6 +61,7 @@ class MockDocumentReference:
             _mock_storage[self.collection_name][self.doc_id].update(data)
         else:
             _mock_storage[self.collection_name][self.doc_id] = data
+        _reindex(self.collection_name, self.doc_id)
         logger.info(f"Mock: Updated document {self.doc_id} in {self.collection_name}")
         return self
     
@@ -58,6 +76,7 @@ class MockDocumentReference:
     def delete(self):
         if self.collection_name in _mock_storage and self.doc_id in _mock_storage[self.collection_name]:
             del _mock_storage[self.collection_name][self.doc_id]
+            _reindex(self.collection_name, self.doc_id)
             logger.info(f"Mock: Deleted document {self.doc_id} from {self.collection_name}")
         else:
             logger.warning(f"Mock: Attempted to delete non-existent document {self.doc_id} from {self.collection_name}")
@@ -86,46 +105,15 @@ class MockQuery:
     def get(self):
         logger.info(f"Mock: Query {self.collection_name} with filters {self._filters}")
         
-        # Get all documents from the collection
+        # Answer from the collection's indexes instead of scanning it
         collection_data = _mock_storage.get(self.collection_name, {})
-        documents = []
-        
-        for doc_id, data in collection_data.items():
-            # Apply filters
-            match = True
-            for field, op, value in self._filters:
-                if field in data:
-                    if op == '==':
-                        if data[field] != value:
-                            match = False
-                            break
-                    elif op == 'in':
-                        if data[field] not in value:
-                            match = False
-                            break
-                    elif op == '!=':
-                        if data[field] == value:
-                            match = False
-                            break
-                else:
-                    match = False
-                    break
-            
-            if match:
-                documents.append(MockDocument(data))
-        
-        # Apply ordering
-        if self._order_by:
-            field, direction = self._order_by
-            reverse = direction == 'DESCENDING'
-            try:
-                documents.sort(key=lambda doc: doc.to_dict().get(field, ''), reverse=reverse)
-            except Exception as e:
-                logger.warning(f"Error sorting by {field}: {e}")
-        
-        # Apply limit
-        if self._limit_count:
-            documents = documents[:self._limit_count]
+        index = _mock_indexes.get(self.collection_name)
+        if index is None:
+            index = _mock_indexes[self.collection_name] = CollectionIndex()
+        field, direction = self._order_by or (None, 'ASCENDING')
+        keys = index.select(collection_data, self._filters, order_field=field,
+                            descending=direction == 'DESCENDING', limit=self._limit_count)
+        documents = [MockDocument(collection_data[key]) for key in keys]
         
         logger.info(f"Mock: Returning {len(documents)} documents from {self.collection_name}")
         return documents
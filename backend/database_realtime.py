@@ -1,20 +1,150 @@
 """
 Firebase Realtime Database configuration and utilities
 """
+import asyncio
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 import uuid
-from datetime import datetime
+from datetime import datetime, date
 import os
 import json
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config import settings
+from query_builder import Query
+from write_batch import WriteBatch
 
 logger = logging.getLogger(__name__)
 
+# ETag the Realtime Database reports for a location that holds no data
+NULL_ETAG = 'null_etag'
+
+def _json_default(value: Any) -> Any:
+    """Serialize values the json module cannot handle (datetimes from Pydantic models)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _query_value(value: Any) -> Any:
+    """Format a filter value for the REST API (strings must be JSON-quoted)"""
+    return json.dumps(value) if isinstance(value, str) else value
+
+def _query_params(order_by: str = None, limit_to_first: int = None, limit_to_last: int = None,
+                  equal_to: Any = None, start_at: Any = None, end_at: Any = None) -> Dict[str, Any]:
+    """Build orderBy/limit/range query parameters for a REST GET"""
+    params = {}
+    if order_by:
+        params['orderBy'] = f'"{order_by}"'
+    if limit_to_first:
+        params['limitToFirst'] = limit_to_first
+    if limit_to_last:
+        params['limitToLast'] = limit_to_last
+    if equal_to is not None:
+        params['equalTo'] = _query_value(equal_to)
+    if start_at is not None:
+        params['startAt'] = _query_value(start_at)
+    if end_at is not None:
+        params['endAt'] = _query_value(end_at)
+    return params
+
+class PoolStats:
+    """Thread-safe counters describing how the HTTP connection pool is used"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+    
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+    
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+    
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a point-in-time copy of the counters"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': max(self.requests - self.new_connections, 0),
+                'total_wait_seconds': round(self.wait_seconds, 6),
+                'avg_wait_seconds': round(self.wait_seconds / self.requests, 6) if self.requests else 0.0,
+                'max_wait_seconds': round(self.max_wait_seconds, 6),
+            }
+
+def _instrumented_pool(base: type, stats: PoolStats) -> type:
+    """Build a urllib3 pool class that reports connection churn and checkout wait time"""
+    
+    class InstrumentedPool(base):
+        def _new_conn(self):
+            stats.record_new_connection()
+            return super()._new_conn()
+        
+        def _get_conn(self, timeout=None):
+            start = time.perf_counter()
+            try:
+                return super()._get_conn(timeout=timeout)
+            finally:
+                stats.record_wait(time.perf_counter() - start)
+    
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """requests adapter whose keep-alive pools feed a shared PoolStats"""
+    
+    def __init__(self, stats: PoolStats, **kwargs):
+        self._stats = stats
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _instrumented_pool(HTTPConnectionPool, self._stats),
+            'https': _instrumented_pool(HTTPSConnectionPool, self._stats),
+        }
+
+def _trace_hook(stats: PoolStats, started: float, use_async: bool = False):
+    """httpcore trace hook that feeds PoolStats for httpx clients
+    
+    Wait time is measured from the start of the request until httpcore either
+    opens a new connection or starts writing on a pooled one.
+    """
+    waited = []
+    
+    def trace(event_name: str, info: Dict[str, Any]):
+        if not waited and event_name.endswith(('connect_tcp.started', 'send_request_headers.started')):
+            waited.append(True)
+            stats.record_wait(time.perf_counter() - started)
+        if event_name == 'connection.connect_tcp.complete':
+            stats.record_new_connection()
+    
+    async def atrace(event_name: str, info: Dict[str, Any]):
+        trace(event_name, info)
+    
+    return atrace if use_async else trace
+
 class FirebaseRealtimeDB:
     _instance: Optional['FirebaseRealtimeDB'] = None
     _db_url = None
     _api_key = None
+    _client = None
+    _http2 = False
+    _pool_stats: Optional[PoolStats] = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -35,6 +165,7 @@ class FirebaseRealtimeDB:
                     self._api_key = config.get('apiKey')
                     
                 if self._db_url:
+                    self._create_client()
                     logger.info(f"Successfully connected to Firebase Realtime Database: {self._db_url}")
                 else:
                     raise ValueError("Database URL not found in credentials")
@@ -45,52 +176,135 @@ class FirebaseRealtimeDB:
             logger.error(f"Failed to initialize Firebase Realtime Database: {e}")
             raise
     
+    def _create_client(self):
+        """Create the shared keep-alive HTTP client used for every request"""
+        self._pool_stats = PoolStats()
+        
+        if settings.FIREBASE_HTTP2:
+            try:
+                import httpx
+                
+                self._client = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=settings.FIREBASE_POOL_SIZE,
+                        max_keepalive_connections=settings.FIREBASE_POOL_SIZE,
+                    ),
+                    timeout=self._timeout(),
+                )
+                self._http2 = True
+                logger.info(f"Firebase HTTP/2 client ready (pool size {settings.FIREBASE_POOL_SIZE})")
+                return
+            except ImportError as e:
+                logger.warning(f"HTTP/2 requested but httpx[http2] is not available ({e}); using HTTP/1.1 pool")
+        
+        session = requests.Session()
+        adapter = PooledHTTPAdapter(
+            self._pool_stats,
+            pool_connections=1,
+            pool_maxsize=settings.FIREBASE_POOL_SIZE,
+            pool_block=settings.FIREBASE_POOL_BLOCK,
+            max_retries=settings.FIREBASE_MAX_RETRIES,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        self._client = session
+        self._http2 = False
+        logger.info(f"Firebase HTTP/1.1 keep-alive pool ready (pool size {settings.FIREBASE_POOL_SIZE})")
+    
+    def _timeout(self, timeout: Any = None) -> Any:
+        """Resolve a per-call timeout into the format the active client expects
+        
+        Accepts a single number (read timeout) or a (connect, read) tuple.
+        """
+        connect_timeout = settings.FIREBASE_CONNECT_TIMEOUT
+        read_timeout = settings.FIREBASE_READ_TIMEOUT
+        if isinstance(timeout, (tuple, list)):
+            connect_timeout, read_timeout = timeout
+        elif timeout is not None:
+            read_timeout = timeout
+        
+        if self._http2:
+            import httpx
+            return httpx.Timeout(read_timeout, connect=connect_timeout, pool=connect_timeout)
+        return (connect_timeout, read_timeout)
+    
+    def _request(self, method: str, path: str, params: Dict[str, Any] = None,
+                 data: Any = None, timeout: Any = None, headers: Dict[str, str] = None,
+                 allow_status: Tuple[int, ...] = ()):
+        """Send a request through the pooled client and return the raw response"""
+        url = self._get_url(path)
+        params = dict(params or {})
+        if self._api_key:
+            params['auth'] = self._api_key
+        
+        body = None
+        headers = dict(headers or {})
+        if data is not None:
+            body = json.dumps(data, default=_json_default)
+            headers['Content-Type'] = 'application/json'
+        
+        self._pool_stats.record_request()
+        if self._http2:
+            response = self._client.request(
+                method, url, params=params, content=body, headers=headers,
+                timeout=self._timeout(timeout),
+                extensions={'trace': _trace_hook(self._pool_stats, time.perf_counter())},
+            )
+        else:
+            response = self._client.request(
+                method, url, params=params, data=body, headers=headers,
+                timeout=self._timeout(timeout),
+            )
+        if response.status_code not in allow_status:
+            response.raise_for_status()
+        return response
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool usage for this worker (reused vs new connections, wait time)"""
+        stats = self._pool_stats.snapshot() if self._pool_stats else {}
+        stats.update({
+            'http2': self._http2,
+            'pool_size': settings.FIREBASE_POOL_SIZE,
+            'pool_block': settings.FIREBASE_POOL_BLOCK,
+            'pid': os.getpid(),
+        })
+        return stats
+    
+    def close(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            self._client.close()
+    
     def _get_url(self, path: str) -> str:
         """Get full URL for a database path"""
         path = path.strip('/')
         return f"{self._db_url}/{path}.json"
     
-    def get(self, path: str, query_params: Dict[str, Any] = None) -> Any:
+    def get(self, path: str, query_params: Dict[str, Any] = None, timeout: Any = None) -> Any:
         """Get data from a path"""
         try:
-            url = self._get_url(path)
-            params = query_params or {}
-            if self._api_key:
-                params['auth'] = self._api_key
-                
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            response = self._request('GET', path, params=query_params, timeout=timeout)
             return response.json()
         except Exception as e:
             logger.error(f"Error getting data from {path}: {e}")
             return None
     
-    def set(self, path: str, data: Any) -> bool:
+    def set(self, path: str, data: Any, timeout: Any = None) -> bool:
         """Set data at a path (overwrites)"""
         try:
-            url = self._get_url(path)
-            params = {}
-            if self._api_key:
-                params['auth'] = self._api_key
-                
-            response = requests.put(url, json=data, params=params)
-            response.raise_for_status()
+            self._request('PUT', path, data=data, timeout=timeout)
             logger.info(f"Successfully set data at {path}")
             return True
         except Exception as e:
             logger.error(f"Error setting data at {path}: {e}")
             return False
     
-    def push(self, path: str, data: Any) -> Optional[str]:
+    def push(self, path: str, data: Any, timeout: Any = None) -> Optional[str]:
         """Push data to a path (creates new entry with unique key)"""
         try:
-            url = self._get_url(path)
-            params = {}
-            if self._api_key:
-                params['auth'] = self._api_key
-                
-            response = requests.post(url, json=data, params=params)
-            response.raise_for_status()
+            response = self._request('POST', path, data=data, timeout=timeout)
             result = response.json()
             new_key = result.get('name')
             logger.info(f"Successfully pushed data to {path} with key {new_key}")
@@ -99,32 +313,20 @@ class FirebaseRealtimeDB:
             logger.error(f"Error pushing data to {path}: {e}")
             return None
     
-    def update(self, path: str, data: Dict[str, Any]) -> bool:
+    def update(self, path: str, data: Dict[str, Any], timeout: Any = None) -> bool:
         """Update data at a path (merges with existing)"""
         try:
-            url = self._get_url(path)
-            params = {}
-            if self._api_key:
-                params['auth'] = self._api_key
-                
-            response = requests.patch(url, json=data, params=params)
-            response.raise_for_status()
+            self._request('PATCH', path, data=data, timeout=timeout)
             logger.info(f"Successfully updated data at {path}")
             return True
         except Exception as e:
             logger.error(f"Error updating data at {path}: {e}")
             return False
     
-    def delete(self, path: str) -> bool:
+    def delete(self, path: str, timeout: Any = None) -> bool:
         """Delete data at a path"""
         try:
-            url = self._get_url(path)
-            params = {}
-            if self._api_key:
-                params['auth'] = self._api_key
-                
-            response = requests.delete(url, params=params)
-            response.raise_for_status()
+            self._request('DELETE', path, timeout=timeout)
             logger.info(f"Successfully deleted data at {path}")
             return True
         except Exception as e:
@@ -132,30 +334,83 @@ class FirebaseRealtimeDB:
             return False
     
     def query(self, path: str, order_by: str = None, limit_to_first: int = None, 
-              limit_to_last: int = None, equal_to: Any = None) -> Any:
+              limit_to_last: int = None, equal_to: Any = None, start_at: Any = None,
+              end_at: Any = None, timeout: Any = None) -> Any:
         """Query data with filters"""
         try:
-            url = self._get_url(path)
-            params = {}
-            if self._api_key:
-                params['auth'] = self._api_key
-            
-            if order_by:
-                params['orderBy'] = f'"{order_by}"'
-            if limit_to_first:
-                params['limitToFirst'] = limit_to_first
-            if limit_to_last:
-                params['limitToLast'] = limit_to_last
-            if equal_to is not None:
-                params['equalTo'] = f'"{equal_to}"' if isinstance(equal_to, str) else equal_to
-                
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            params = _query_params(order_by, limit_to_first, limit_to_last, equal_to, start_at, end_at)
+            response = self._request('GET', path, params=params, timeout=timeout)
             return response.json()
         except Exception as e:
             logger.error(f"Error querying data from {path}: {e}")
             return None
     
+    def batch(self, chunk_size: int = None) -> WriteBatch:
+        """Collect writes to commit as multi-location updates (see write_batch)"""
+        return WriteBatch(self, chunk_size)
+    
+    def multi_update(self, updates: Dict[str, Any], chunk_size: int = None, timeout: Any = None) -> bool:
+        """Write many non-overlapping paths with multi-location PATCHes on the root
+        
+        Each PATCH carries at most chunk_size paths and is atomic on its own.
+        """
+        chunk_size = chunk_size or settings.FIREBASE_BATCH_SIZE
+        items = list(updates.items())
+        try:
+            for start in range(0, len(items), chunk_size):
+                self._request('PATCH', '', data=dict(items[start:start + chunk_size]), timeout=timeout)
+            logger.info(f"Successfully wrote {len(items)} paths in a multi-location update")
+            return True
+        except Exception as e:
+            logger.error(f"Error in multi-location update of {len(items)} paths: {e}")
+            return False
+    
+    def ref(self, path: str) -> Query:
+        """Query builder for the data at a path (see query_builder)"""
+        return Query(self, path)
+    
+    def get_with_etag(self, path: str, timeout: Any = None) -> Tuple[Any, Optional[str]]:
+        """Get data from a path together with its ETag"""
+        try:
+            response = self._request('GET', path, headers={'X-Firebase-ETag': 'true'}, timeout=timeout)
+            return response.json(), response.headers.get('ETag')
+        except Exception as e:
+            logger.error(f"Error getting data with ETag from {path}: {e}")
+            return None, None
+    
+    def set_if_match(self, path: str, data: Any, etag: str, timeout: Any = None) -> Tuple[bool, Any, Optional[str]]:
+        """Conditionally set data at a path if its ETag still matches
+        
+        Returns (written, current value, current ETag). When the ETag is stale
+        the server answers 412 with the current value and ETag, so callers can
+        retry without another read. Transport errors are raised.
+        """
+        response = self._request('PUT', path, data=data, timeout=timeout,
+                                 headers={'if-match': etag}, allow_status=(412,))
+        if response.status_code == 412:
+            return False, response.json(), response.headers.get('ETag')
+        return True, data, response.headers.get('ETag')
+    
+    def reserve(self, path: str, value: Any, max_retries: int = 3, timeout: Any = None) -> Tuple[bool, Any]:
+        """Atomically claim an empty path (or one that already holds value)
+        
+        Optimistically assumes the path is empty, so an uncontended claim is a
+        single round trip. Returns (reserved, current holder).
+        """
+        etag = NULL_ETAG
+        for _ in range(max_retries + 1):
+            written, current, current_etag = self.set_if_match(path, value, etag, timeout=timeout)
+            if written:
+                logger.info(f"Reserved {path}")
+                return True, value
+            if current is not None and current != value:
+                return False, current
+            if current == value:
+                return True, value
+            etag = current_etag
+        logger.warning(f"Gave up reserving {path} after {max_retries} retries")
+        return False, None
+    
     def get_collection(self, collection_name: str) -> Dict[str, Any]:
         """Get all documents in a collection"""
         data = self.get(collection_name)
@@ -169,5 +424,255 @@ class FirebaseRealtimeDB:
             }
         return {'items': [], 'raw': {}}
 
-# Global database instance
+class AsyncFirebaseRealtimeDB:
+    """asyncio variant of FirebaseRealtimeDB with the same method surface
+    
+    All requests go through one shared httpx.AsyncClient, so a single worker
+    can keep many database calls in flight without blocking the event loop.
+    """
+    _instance: Optional['AsyncFirebaseRealtimeDB'] = None
+    _db_url = None
+    _api_key = None
+    _client = None
+    _client_loop = None
+    _pool_stats: Optional[PoolStats] = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncFirebaseRealtimeDB, cls).__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+    
+    def _initialize(self):
+        """Reuse the credentials loaded by the synchronous client"""
+        import httpx  # noqa: F401 - fail early so callers can fall back to the mock database
+        
+        sync_db = FirebaseRealtimeDB()
+        self._db_url = sync_db._db_url
+        self._api_key = sync_db._api_key
+        self._pool_stats = PoolStats()
+        logger.info(f"Async Firebase Realtime Database client ready: {self._db_url}")
+    
+    def _get_client(self):
+        """Create the shared AsyncClient lazily so it binds to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._client_loop is not loop:
+            # A client cannot be shared across event loops (e.g. test clients)
+            self._client = None
+        if self._client is None:
+            import httpx
+            
+            http2 = settings.FIREBASE_HTTP2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("HTTP/2 requested but h2 is not installed; using HTTP/1.1 pool")
+                    http2 = False
+            
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.FIREBASE_POOL_SIZE,
+                    max_keepalive_connections=settings.FIREBASE_POOL_SIZE,
+                ),
+                timeout=self._timeout(),
+            )
+            self._client_loop = loop
+        return self._client
+    
+    def _timeout(self, timeout: Any = None):
+        """Resolve a per-call timeout (number or (connect, read) tuple) into httpx.Timeout"""
+        import httpx
+        
+        connect_timeout = settings.FIREBASE_CONNECT_TIMEOUT
+        read_timeout = settings.FIREBASE_READ_TIMEOUT
+        if isinstance(timeout, (tuple, list)):
+            connect_timeout, read_timeout = timeout
+        elif timeout is not None:
+            read_timeout = timeout
+        return httpx.Timeout(read_timeout, connect=connect_timeout, pool=connect_timeout)
+    
+    def _get_url(self, path: str) -> str:
+        """Get full URL for a database path"""
+        path = path.strip('/')
+        return f"{self._db_url}/{path}.json"
+    
+    async def _request(self, method: str, path: str, params: Dict[str, Any] = None,
+                       data: Any = None, timeout: Any = None, headers: Dict[str, str] = None,
+                       allow_status: Tuple[int, ...] = ()):
+        """Send a request through the shared AsyncClient and return the raw response"""
+        params = dict(params or {})
+        if self._api_key:
+            params['auth'] = self._api_key
+        
+        body = None
+        headers = dict(headers or {})
+        if data is not None:
+            body = json.dumps(data, default=_json_default)
+            headers['Content-Type'] = 'application/json'
+        
+        self._pool_stats.record_request()
+        response = await self._get_client().request(
+            method, self._get_url(path), params=params, content=body, headers=headers,
+            timeout=self._timeout(timeout),
+            extensions={'trace': _trace_hook(self._pool_stats, time.perf_counter(), use_async=True)},
+        )
+        if response.status_code not in allow_status:
+            response.raise_for_status()
+        return response
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool usage for this worker (reused vs new connections, wait time)"""
+        stats = self._pool_stats.snapshot()
+        stats.update({
+            'async': True,
+            'http2': settings.FIREBASE_HTTP2,
+            'pool_size': settings.FIREBASE_POOL_SIZE,
+            'pid': os.getpid(),
+        })
+        return stats
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            # A client bound to another (possibly closed) loop can only be dropped
+            if self._client_loop is asyncio.get_running_loop():
+                await self._client.aclose()
+            self._client = None
+    
+    async def get(self, path: str, query_params: Dict[str, Any] = None, timeout: Any = None) -> Any:
+        """Get data from a path"""
+        try:
+            response = await self._request('GET', path, params=query_params, timeout=timeout)
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error getting data from {path}: {e}")
+            return None
+    
+    async def set(self, path: str, data: Any, timeout: Any = None) -> bool:
+        """Set data at a path (overwrites)"""
+        try:
+            await self._request('PUT', path, data=data, timeout=timeout)
+            logger.info(f"Successfully set data at {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error setting data at {path}: {e}")
+            return False
+    
+    async def push(self, path: str, data: Any, timeout: Any = None) -> Optional[str]:
+        """Push data to a path (creates new entry with unique key)"""
+        try:
+            response = await self._request('POST', path, data=data, timeout=timeout)
+            new_key = response.json().get('name')
+            logger.info(f"Successfully pushed data to {path} with key {new_key}")
+            return new_key
+        except Exception as e:
+            logger.error(f"Error pushing data to {path}: {e}")
+            return None
+    
+    async def update(self, path: str, data: Dict[str, Any], timeout: Any = None) -> bool:
+        """Update data at a path (merges with existing)"""
+        try:
+            await self._request('PATCH', path, data=data, timeout=timeout)
+            logger.info(f"Successfully updated data at {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating data at {path}: {e}")
+            return False
+    
+    async def delete(self, path: str, timeout: Any = None) -> bool:
+        """Delete data at a path"""
+        try:
+            await self._request('DELETE', path, timeout=timeout)
+            logger.info(f"Successfully deleted data at {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting data at {path}: {e}")
+            return False
+    
+    async def query(self, path: str, order_by: str = None, limit_to_first: int = None,
+                    limit_to_last: int = None, equal_to: Any = None, start_at: Any = None,
+                    end_at: Any = None, timeout: Any = None) -> Any:
+        """Query data with filters"""
+        try:
+            params = _query_params(order_by, limit_to_first, limit_to_last, equal_to, start_at, end_at)
+            response = await self._request('GET', path, params=params, timeout=timeout)
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error querying data from {path}: {e}")
+            return None
+    
+    def batch(self, chunk_size: int = None) -> WriteBatch:
+        """Collect writes to commit as multi-location updates (see write_batch)"""
+        return WriteBatch(self, chunk_size)
+    
+    async def multi_update(self, updates: Dict[str, Any], chunk_size: int = None, timeout: Any = None) -> bool:
+        """Write many non-overlapping paths with multi-location PATCHes on the root
+        
+        Each PATCH carries at most chunk_size paths and is atomic on its own.
+        """
+        chunk_size = chunk_size or settings.FIREBASE_BATCH_SIZE
+        items = list(updates.items())
+        try:
+            for start in range(0, len(items), chunk_size):
+                await self._request('PATCH', '', data=dict(items[start:start + chunk_size]), timeout=timeout)
+            logger.info(f"Successfully wrote {len(items)} paths in a multi-location update")
+            return True
+        except Exception as e:
+            logger.error(f"Error in multi-location update of {len(items)} paths: {e}")
+            return False
+    
+    def ref(self, path: str) -> Query:
+        """Query builder for the data at a path (see query_builder)"""
+        return Query(self, path)
+    
+    async def get_with_etag(self, path: str, timeout: Any = None) -> Tuple[Any, Optional[str]]:
+        """Get data from a path together with its ETag"""
+        try:
+            response = await self._request('GET', path, headers={'X-Firebase-ETag': 'true'}, timeout=timeout)
+            return response.json(), response.headers.get('ETag')
+        except Exception as e:
+            logger.error(f"Error getting data with ETag from {path}: {e}")
+            return None, None
+    
+    async def set_if_match(self, path: str, data: Any, etag: str, timeout: Any = None) -> Tuple[bool, Any, Optional[str]]:
+        """Conditionally set data at a path if its ETag still matches (see FirebaseRealtimeDB.set_if_match)"""
+        response = await self._request('PUT', path, data=data, timeout=timeout,
+                                       headers={'if-match': etag}, allow_status=(412,))
+        if response.status_code == 412:
+            return False, response.json(), response.headers.get('ETag')
+        return True, data, response.headers.get('ETag')
+    
+    async def reserve(self, path: str, value: Any, max_retries: int = 3, timeout: Any = None) -> Tuple[bool, Any]:
+        """Atomically claim an empty path (see FirebaseRealtimeDB.reserve)"""
+        etag = NULL_ETAG
+        for _ in range(max_retries + 1):
+            written, current, current_etag = await self.set_if_match(path, value, etag, timeout=timeout)
+            if written:
+                logger.info(f"Reserved {path}")
+                return True, value
+            if current is not None and current != value:
+                return False, current
+            if current == value:
+                return True, value
+            etag = current_etag
+        logger.warning(f"Gave up reserving {path} after {max_retries} retries")
+        return False, None
+    
+    async def get_collection(self, collection_name: str) -> Dict[str, Any]:
+        """Get all documents in a collection"""
+        data = await self.get(collection_name)
+        if data and isinstance(data, dict):
+            # Convert to list format with id field
+            return {
+                'items': [
+                    {**value, 'id': key} for key, value in data.items()
+                ],
+                'raw': data
+            }
+        return {'items': [], 'raw': {}}
+
+# Global database instances
 firebase_db = FirebaseRealtimeDB()
+async_firebase_db = AsyncFirebaseRealtimeDB()
@@ -0,0 +1,20 @@
+"""
+Database backend selection
+DATABASE_BACKEND=sqlite stores the data in a local SQLite file (see
+sqlite_db); otherwise Firebase Realtime Database is used, falling back to the
+in-memory mock when Firebase is not configured. Every backend exposes the
+same interface, so the server and scripts import their client from here:
+
+    from db_backend import async_firebase_db   # server (asyncio)
+    from db_backend import firebase_db         # scripts (blocking)
+"""
+from config import settings
+
+if settings.DATABASE_BACKEND == 'sqlite':
+    from sqlite_db import firebase_db, async_firebase_db  # noqa: F401 - single-node SQLite storage
+else:
+    try:
+        from database_realtime import firebase_db, async_firebase_db  # noqa: F401 - Firebase Realtime Database
+    except Exception as e:
+        print(f"Firebase Realtime Database not available: {e}. Using mock database.")
+        from mock_realtime_db import firebase_db, async_firebase_db  # noqa: F401 - fallback to the mock database
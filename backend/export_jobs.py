@@ -0,0 +1,336 @@
+"""
+Background export jobs with an on-disk artifact cache
+An export job streams the appointments page by page into a spool file
+(NDJSON), renders the file from the spool in a process pool (reportlab and
+xlsxwriter are CPU bound and would hold the GIL) and stores it in
+EXPORT_ARTIFACT_DIR under (format, status filter, data version). The data
+version comes from a data marker (a token the server rewrites after every
+appointment write) when one is given, so a cache hit costs one small read
+instead of reading every record; without a marker it is a hash of the
+spooled records. Only the spool's path crosses the process boundary, so
+memory does not grow with the table.
+
+The artifact cache and the job records (jobs/<id>.json) live in
+EXPORT_ARTIFACT_DIR, so with several server workers sharing the directory
+any worker can report on or serve a job another worker ran.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+from exports import EXPORT_FORMATS, render_export, remove_file, temp_export_path
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# Records written to the spool per (threaded) file write
+SPOOL_BATCH = 500
+JOBS_DIRNAME = 'jobs'
+_JOB_ID = re.compile(r'^[0-9a-f-]{36}$')
+
+
+def _filter_token(status_filter: Optional[str]) -> str:
+    """Filesystem-safe name part for a status filter"""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', status_filter)[:40] if status_filter else 'all'
+
+
+class ExportJob:
+    """State of one export request"""
+
+    def __init__(self, fmt: str, status_filter: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.format = fmt
+        self.status_filter = status_filter
+        self.state = JOB_QUEUED
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.path: Optional[str] = None
+        self.cached = False
+        self.error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (JOB_DONE, JOB_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Job status for the API"""
+        return {
+            'id': self.id,
+            'format': self.format,
+            'status_filter': self.status_filter,
+            'state': self.state,
+            'cached': self.cached,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> 'ExportJob':
+        """Job from its on-disk record (to_dict plus the artifact path)"""
+        job = cls(record['format'], record.get('status_filter'))
+        job.id = record['id']
+        job.state = record['state']
+        job.cached = record.get('cached', False)
+        job.error = record.get('error')
+        job.path = record.get('path')
+        job.created_at = datetime.fromisoformat(record['created_at'])
+        if record.get('finished_at'):
+            job.finished_at = datetime.fromisoformat(record['finished_at'])
+        return job
+
+
+class ExportJobManager:
+    """Runs export jobs and keeps their artifacts on disk"""
+
+    def __init__(self, iter_records: Callable[[Optional[str]], AsyncIterator[Dict[str, Any]]],
+                 artifact_dir: Optional[str] = None, workers: Optional[int] = None, job_ttl: Optional[float] = None,
+                 data_marker: Optional[Callable[[], Awaitable[Optional[str]]]] = None):
+        self._iter_records = iter_records
+        self._data_marker = data_marker
+        self.artifact_dir = artifact_dir or settings.EXPORT_ARTIFACT_DIR or os.path.join(tempfile.gettempdir(), 'leadg_exports')
+        self.workers = settings.EXPORT_WORKERS if workers is None else workers
+        self.job_ttl = settings.EXPORT_JOB_TTL if job_ttl is None else job_ttl
+        self._jobs: Dict[str, ExportJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._building: Dict[str, asyncio.Future] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.renders = 0
+
+    def submit(self, fmt: str, status_filter: Optional[str] = None) -> ExportJob:
+        """Queue an export; an unfinished job for the same export is reused"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        self._prune()
+
+        for job in self._jobs.values():
+            if not job.finished and job.format == fmt and job.status_filter == status_filter:
+                return job
+
+        job = ExportJob(fmt, status_filter)
+        self._jobs[job.id] = job
+        self._save_job(job)
+        self._tasks[job.id] = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        """Look up a job by id (including jobs run by other workers)"""
+        job = self._jobs.get(job_id)
+        if job is not None or not _JOB_ID.match(job_id):
+            return job
+        try:
+            with open(self._job_path(job_id), 'r', encoding='utf-8') as f:
+                return ExportJob.from_record(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Unreadable export job record {job_id}: {e}")
+            return None
+
+    async def build_artifact(self, fmt: str, status_filter: Optional[str] = None) -> Tuple[str, bool]:
+        """Path of the rendered export for the current data, and whether it was cached"""
+        marker = await self._data_marker() if self._data_marker else None
+        if marker:
+            version = hashlib.sha256(json.dumps([fmt, status_filter, marker]).encode('utf-8')).hexdigest()[:24]
+            path = self._artifact_path(fmt, status_filter, version)
+            if await asyncio.to_thread(os.path.exists, path):
+                self.hits += 1
+                return path, True
+            spool_path, _, count = await self._spool(fmt, status_filter)
+        else:
+            spool_path, version, count = await self._spool(fmt, status_filter)
+            path = self._artifact_path(fmt, status_filter, version)
+
+        try:
+            if os.path.exists(path):
+                self.hits += 1
+                return path, True
+
+            # Concurrent requests for the same artifact share one render,
+            # which takes over (and removes) its spool
+            pending = self._building.get(path)
+            if pending is None:
+                pending = asyncio.ensure_future(self._render(fmt, spool_path, count, status_filter, path))
+                self._building[path] = pending
+                pending.add_done_callback(lambda _: self._building.pop(path, None))
+                spool_path = None
+        finally:
+            if spool_path is not None:
+                remove_file(spool_path)
+        await asyncio.shield(pending)
+        return path, False
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the health check"""
+        return {
+            'jobs': len(self._jobs),
+            'running': sum(1 for job in self._jobs.values() if not job.finished),
+            'workers': self.workers,
+            'cache_hits': self.hits,
+            'renders': self.renders,
+        }
+
+    async def _run(self, job: ExportJob):
+        """Execute a queued job"""
+        job.state = JOB_RUNNING
+        self._save_job(job)
+        try:
+            job.path, job.cached = await self.build_artifact(job.format, job.status_filter)
+            job.state = JOB_DONE
+        except Exception as e:
+            logger.error(f"Export job {job.id} failed: {e}")
+            job.error = "Export failed"
+            job.state = JOB_FAILED
+        finally:
+            job.finished_at = datetime.utcnow()
+            self._tasks.pop(job.id, None)
+            self._save_job(job)
+
+    def _artifact_path(self, fmt: str, status_filter: Optional[str], version: str) -> str:
+        extension, _ = EXPORT_FORMATS[fmt]
+        return os.path.join(self.artifact_dir, f"{fmt}-{_filter_token(status_filter)}-{version}{extension}")
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.artifact_dir, JOBS_DIRNAME, f"{job_id}.json")
+
+    def _save_job(self, job: ExportJob):
+        """Write the job's record atomically so other workers can read it"""
+        path = self._job_path(job.id)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(job.to_dict(), path=job.path), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            remove_file(tmp_path)
+            logger.warning(f"Could not save export job {job.id}: {e}")
+
+    async def _spool(self, fmt: str, status_filter: Optional[str]) -> Tuple[str, str, int]:
+        """Stream the records into a spool file; returns (spool path, data version, record count)"""
+        spool_path = temp_export_path('.ndjson')
+        digest = hashlib.sha256(json.dumps([fmt, status_filter]).encode('utf-8'))
+        count = 0
+        try:
+            with open(spool_path, 'w', encoding='utf-8') as f:
+                lines = []
+                async for record in self._iter_records(status_filter):
+                    lines.append(json.dumps(record, sort_keys=True, separators=(',', ':'), default=str))
+                    count += 1
+                    if len(lines) >= SPOOL_BATCH:
+                        await asyncio.to_thread(self._write_lines, f, digest, lines)
+                        lines = []
+                if lines:
+                    await asyncio.to_thread(self._write_lines, f, digest, lines)
+        except BaseException:
+            remove_file(spool_path)
+            raise
+        return spool_path, digest.hexdigest()[:24], count
+
+    @staticmethod
+    def _write_lines(f, digest, lines):
+        text = '\n'.join(lines) + '\n'
+        digest.update(text.encode('utf-8'))
+        f.write(text)
+
+    async def _render(self, fmt: str, spool_path: str, count: int, status_filter: Optional[str], path: str):
+        """Render from the spool into a temporary name and move it into place"""
+        extension, _ = EXPORT_FORMATS[fmt]
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp{extension}"
+        started = time.perf_counter()
+        try:
+            os.makedirs(self.artifact_dir, exist_ok=True)
+            if self.workers > 0:
+                await asyncio.get_running_loop().run_in_executor(
+                    self._get_pool(), render_export, fmt, spool_path, tmp_path, status_filter
+                )
+            else:
+                await asyncio.to_thread(render_export, fmt, spool_path, tmp_path, status_filter)
+            os.replace(tmp_path, path)
+        except BrokenProcessPool:
+            self._pool = None
+            remove_file(tmp_path)
+            raise
+        except BaseException:
+            remove_file(tmp_path)
+            raise
+        finally:
+            remove_file(spool_path)
+
+        self.renders += 1
+        logger.info(f"Rendered {fmt} export of {count} appointments in {time.perf_counter() - started:.2f}s")
+        self._evict_stale(fmt, status_filter, keep=path)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Worker processes, started on first use
+
+        spawn keeps the children free of the server's event loop and client
+        state that fork would copy.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._pool
+
+    def _evict_stale(self, fmt: str, status_filter: Optional[str], keep: str):
+        """Remove artifacts of older data versions for the same export"""
+        extension, _ = EXPORT_FORMATS[fmt]
+        prefix = f"{fmt}-{_filter_token(status_filter)}-"
+        try:
+            names = os.listdir(self.artifact_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.artifact_dir, name)
+            if name.startswith(prefix) and name.endswith(extension) and '.tmp' not in name and path != keep:
+                remove_file(path)
+
+    def _prune(self):
+        """Forget finished jobs older than the job TTL (and their records)"""
+        cutoff = datetime.utcnow().timestamp() - self.job_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at.timestamp() < cutoff:
+                del self._jobs[job_id]
+
+        # Records of every worker's jobs (a job rewrites its record when it finishes)
+        jobs_dir = os.path.join(self.artifact_dir, JOBS_DIRNAME)
+        try:
+            names = os.listdir(jobs_dir)
+        except OSError:
+            return
+        file_cutoff = time.time() - self.job_ttl
+        for name in names:
+            path = os.path.join(jobs_dir, name)
+            try:
+                if os.path.getmtime(path) < file_cutoff:
+                    remove_file(path)
+            except OSError:
+                pass
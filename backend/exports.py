@@ -0,0 +1,453 @@
+"""
+Appointment export files
+Exports are written to a temporary file and streamed back in chunks, so the
+finished file is never held in memory. The Excel writer also runs in
+xlsxwriter's constant_memory mode, which flushes each row to disk as soon as
+the next row starts. The PDF report splits the appointment list into tables
+of PDF_ROWS_PER_TABLE rows, so layout cost grows linearly with the row count.
+Both render from a RecordSpool (records streamed to an NDJSON file), so
+memory stays flat as the table grows.
+CSV and NDJSON exports are encoded on the fly from raw database records and
+never touch the disk. Parquet and Arrow exports build a typed pandas frame
+(UTC timestamps, categorical status/industry) for analytics tools.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from config import settings
+from models import Appointment, ContactForm
+
+logger = logging.getLogger(__name__)
+
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_MEDIA_TYPE = "application/pdf"
+APPOINTMENT_STATUSES = ('pending', 'confirmed', 'completed', 'cancelled')
+
+# Collections available as row exports, with their CSV columns
+EXPORT_COLLECTIONS = {
+    'appointments': list(Appointment.model_fields),
+    'contact_forms': list(ContactForm.model_fields),
+}
+ROW_EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Columnar formats: extension and media type
+COLUMNAR_FORMATS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+}
+# Column types per collection; other columns stay strings
+COLUMNAR_TYPES = {
+    'appointments': {
+        'timestamps': ['created_at', 'appointment_datetime_utc'],
+        'dates': ['appointment_date'],
+        'categories': ['status', 'industry', 'user_timezone'],
+    },
+    'contact_forms': {
+        'timestamps': ['submitted_at'],
+        'dates': [],
+        'categories': ['status', 'industry', 'service'],
+    },
+}
+
+
+def temp_export_path(suffix: str) -> str:
+    """Path of a new empty temporary file for an export"""
+    fd, path = tempfile.mkstemp(prefix='leadg_export_', suffix=suffix, dir=settings.EXPORT_TMP_DIR or None)
+    os.close(fd)
+    return path
+
+
+def remove_file(path: str):
+    """Delete a temporary export file, ignoring files already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove export file {path}: {e}")
+
+
+def iter_file(f: BinaryIO, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    """Read an open file in chunks for a StreamingResponse, closing it afterwards
+
+    Callers open the file before sending headers, so the Content-Length they
+    send stays valid if the file is replaced or removed meanwhile (an open
+    handle survives the unlink). Temporary files are removed by a
+    BackgroundTask of the response, which also runs when the body is never
+    streamed (e.g. the client disconnected).
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    with f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def write_appointments_excel(records: Iterable[Dict[str, Any]], path: str) -> Counter:
+    """Write the appointments workbook to path in a single pass over records
+
+    Returns the status counts (plus 'total') shown on the summary sheet.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'tmpdir': settings.EXPORT_TMP_DIR or None,
+    })
+    try:
+        # Create formats
+        header_format = workbook.add_format({
+            'bold': True,
+            'font_color': 'white',
+            'bg_color': '#00FFD1',
+            'border': 1,
+            'align': 'center',
+            'valign': 'vcenter'
+        })
+
+        cell_format = workbook.add_format({
+            'border': 1,
+            'align': 'left',
+            'valign': 'vcenter'
+        })
+
+        status_formats = {
+            'pending': workbook.add_format({'bg_color': '#FFF2CC', 'border': 1, 'align': 'center'}),
+            'confirmed': workbook.add_format({'bg_color': '#D5E8D4', 'border': 1, 'align': 'center'}),
+            'completed': workbook.add_format({'bg_color': '#DAE8FC', 'border': 1, 'align': 'center'}),
+            'cancelled': workbook.add_format({'bg_color': '#F8CECC', 'border': 1, 'align': 'center'})
+        }
+
+        # The summary sheet comes first in the workbook but is filled in after
+        # the data pass, once the counts are known
+        summary_sheet = workbook.add_worksheet('Summary')
+        appointments_sheet = workbook.add_worksheet('Appointments')
+
+        # Column widths (constant_memory needs them before any rows are written)
+        appointments_sheet.set_column('A:A', 20)  # ID
+        appointments_sheet.set_column('B:B', 20)  # Name
+        appointments_sheet.set_column('C:C', 25)  # Email
+        appointments_sheet.set_column('D:D', 15)  # Phone
+        appointments_sheet.set_column('E:E', 20)  # Business
+        appointments_sheet.set_column('F:F', 15)  # Industry
+        appointments_sheet.set_column('G:G', 20)  # Service Interests
+        appointments_sheet.set_column('H:H', 15)  # Date
+        appointments_sheet.set_column('I:I', 12)  # Time
+        appointments_sheet.set_column('J:J', 12)  # Status
+        appointments_sheet.set_column('K:K', 30)  # Message
+        appointments_sheet.set_column('L:L', 20)  # Created At
+
+        headers = ['ID', 'Name', 'Email', 'Phone', 'Business', 'Industry', 'Service Interests',
+                   'Appointment Date', 'Appointment Time', 'Status', 'Message', 'Created At']
+        appointments_sheet.write_row(0, 0, headers, header_format)
+
+        # Data rows: one model at a time, counting statuses as we go
+        counts = Counter()
+        for row, record in enumerate(records, 1):
+            appointment = Appointment(**record)
+            counts[appointment.status] += 1
+            appointments_sheet.write_row(row, 0, [
+                appointment.id,
+                appointment.name,
+                appointment.email,
+                appointment.phone,
+                appointment.business or '',
+                appointment.industry or '',
+                appointment.service_interests or '',
+                appointment.appointment_date,
+                appointment.appointment_time,
+            ], cell_format)
+            appointments_sheet.write(row, 9, appointment.status.capitalize(), status_formats.get(appointment.status, cell_format))
+            appointments_sheet.write(row, 10, appointment.message or '', cell_format)
+            appointments_sheet.write(row, 11, appointment.created_at.strftime('%Y-%m-%d %H:%M:%S'), cell_format)
+        counts['total'] = sum(counts.values())
+
+        # Summary worksheet
+        summary_sheet.merge_range('A1:G1', 'Lead G - Appointments Summary', header_format)
+
+        summary_sheet.write('A3', 'Total Appointments:', cell_format)
+        summary_sheet.write('B3', counts['total'], cell_format)
+        for offset, status_value in enumerate(APPOINTMENT_STATUSES):
+            summary_sheet.write(3 + offset, 0, f'{status_value.capitalize()}:', cell_format)
+            summary_sheet.write(3 + offset, 1, counts[status_value], cell_format)
+
+        summary_sheet.write('A9', f'Generated on: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}', cell_format)
+    finally:
+        workbook.close()
+
+    return counts
+
+
+class RecordSpool:
+    """Records spooled to an NDJSON file, re-iterable without loading them all
+
+    Export jobs stream the database pages into a spool and hand its path to
+    the worker process, so neither side holds (or pickles) the whole table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class _LazyStory(list):
+    """Flowable list for doc.build() that is topped up from an iterator
+
+    build() consumes the story from the front and checks len() before each
+    flowable, so keeping a couple of items buffered is enough.
+    """
+
+    def __init__(self, head: List[Any], pending: Iterator[Any], buffered: int = 2):
+        super().__init__(head)
+        self._pending = pending
+        self._buffered = buffered
+
+    def __len__(self) -> int:
+        while list.__len__(self) < self._buffered:
+            item = next(self._pending, None)
+            if item is None:
+                break
+            self.append(item)
+        return list.__len__(self)
+
+
+def count_statuses(records: Iterable[Dict[str, Any]]) -> Counter:
+    """Status counts (plus 'total') of raw appointment records"""
+    counts = Counter(record.get('status', 'pending') for record in records)
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def write_appointments_pdf(records: Iterable[Dict[str, Any]], path: str, status_filter: Optional[str] = None,
+                           rows_per_table: Optional[int] = None) -> Counter:
+    """Write the appointments report to path
+
+    records is iterated twice (status counts for the summary, then the
+    details), so pass a list or a RecordSpool rather than a generator.
+
+    The details are laid out as a series of fixed-size tables instead of one
+    table holding every row; reportlab re-measures a table each time it
+    splits across a page, which made one huge table roughly quadratic.
+    Returns the status counts shown in the summary.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.enums import TA_CENTER
+
+    rows_per_table = rows_per_table or settings.PDF_ROWS_PER_TABLE
+    counts = count_statuses(records)
+
+    doc = SimpleDocTemplate(path, pagesize=A4)
+    styles = getSampleStyleSheet()
+
+    # Title style
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#00FFD1')
+    )
+
+    # Build content
+    story = []
+
+    # Title
+    title_text = "Lead G - Appointments Report"
+    if status_filter:
+        title_text += f" ({status_filter.capitalize()})"
+    story.append(Paragraph(title_text, title_style))
+
+    # Date
+    story.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Summary
+    summary_data = [['Status', 'Count'], ['Total', str(counts['total'])]]
+    summary_data += [[status_value.capitalize(), str(counts[status_value])] for status_value in APPOINTMENT_STATUSES]
+
+    summary_table = Table(summary_data, colWidths=[2*inch, 1*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00FFD1')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    story.append(summary_table)
+    story.append(Spacer(1, 30))
+
+    # Appointments tables, one per chunk of rows, created as the layout
+    # reaches them so only a few exist at a time
+    if counts['total']:
+        story.append(Paragraph("Appointment Details", styles['Heading2']))
+        story.append(Spacer(1, 12))
+
+        header = ['Name', 'Email', 'Phone', 'Business', 'Date', 'Time', 'Status']
+        col_widths = [1.2*inch, 1.5*inch, 1*inch, 1.2*inch, 0.8*inch, 0.6*inch, 0.7*inch]
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#333333')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+
+        def detail_tables():
+            remaining = iter(records)
+            while True:
+                chunk = list(islice(remaining, rows_per_table))
+                if not chunk:
+                    return
+                table_data = [header]
+                for record in chunk:
+                    appointment = Appointment(**record)
+                    table_data.append([
+                        appointment.name,
+                        appointment.email,
+                        appointment.phone,
+                        appointment.business or 'N/A',
+                        appointment.appointment_date,
+                        appointment.appointment_time,
+                        appointment.status.capitalize()
+                    ])
+
+                appointments_table = Table(table_data, colWidths=col_widths, repeatRows=1)
+                appointments_table.setStyle(table_style)
+                yield appointments_table
+
+        story = _LazyStory(story, detail_tables())
+
+    # Build PDF
+    doc.build(story)
+    return counts
+
+
+# Formats rendered from the appointment list: extension, media type, writer
+EXPORT_FORMATS = {
+    'pdf': ('.pdf', PDF_MEDIA_TYPE),
+    'excel': ('.xlsx', EXCEL_MEDIA_TYPE),
+}
+
+
+def render_export(fmt: str, records_path: str, path: str, status_filter: Optional[str] = None) -> str:
+    """Render an export format to path from spooled records (runs in an export worker process)"""
+    records = RecordSpool(records_path)
+    if fmt == 'pdf':
+        write_appointments_pdf(records, path, status_filter)
+    elif fmt == 'excel':
+        write_appointments_excel(records, path)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return path
+
+
+async def encode_csv(records: AsyncIterator[Dict[str, Any]], fields: List[str]) -> AsyncIterator[bytes]:
+    """CSV bytes for raw records, flushed every EXPORT_CHUNK_SIZE characters
+
+    Columns are the model fields; keys outside them are dropped and missing
+    values are left empty.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    async for record in records:
+        writer.writerow(record)
+        if buffer.tell() >= settings.EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+async def encode_ndjson(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """One JSON object per line for raw records, flushed in chunks"""
+    lines: List[str] = []
+    size = 0
+    async for record in records:
+        line = json.dumps(record, separators=(',', ':'), ensure_ascii=False, default=str)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= settings.EXPORT_CHUNK_SIZE:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines, size = [], 0
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+async def collect_columns(records: AsyncIterator[Dict[str, Any]], fields: List[str]) -> Dict[str, List[Any]]:
+    """Gather raw records into one list per field (no per-row dicts kept)"""
+    columns: Dict[str, List[Any]] = {field: [] for field in fields}
+    async for record in records:
+        for field, values in columns.items():
+            values.append(record.get(field))
+    return columns
+
+
+def build_frame(columns: Dict[str, List[Any]], collection: str):
+    """Typed DataFrame of a collection's columns
+
+    Timestamps are parsed in one vectorized call per column (stored values
+    mix naive and offset ISO strings; all are UTC). Unparseable values become
+    NaT rather than failing the export.
+    """
+    import pandas as pd
+
+    types = COLUMNAR_TYPES[collection]
+    frame = pd.DataFrame(columns)
+    for name in types['timestamps']:
+        frame[name] = pd.to_datetime(frame[name], utc=True, errors='coerce', format='ISO8601')
+    for name in types['dates']:
+        frame[name] = pd.to_datetime(frame[name], errors='coerce', format='%Y-%m-%d')
+    for name in types['categories']:
+        frame[name] = frame[name].astype('category')
+    typed = set(types['timestamps']) | set(types['dates']) | set(types['categories'])
+    for name in frame.columns:
+        if name not in typed:
+            frame[name] = frame[name].astype('string')
+    return frame
+
+
+def write_columnar(columns: Dict[str, List[Any]], collection: str, path: str, fmt: str) -> int:
+    """Write a collection as Parquet or Arrow IPC (Feather v2); returns the row count
+
+    Needs pyarrow; raises ImportError when it is not installed.
+    """
+    frame = build_frame(columns, collection)
+    if fmt == 'parquet':
+        frame.to_parquet(path, engine='pyarrow', index=False)
+    elif fmt == 'arrow':
+        frame.to_feather(path)
+    else:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+    return len(frame)
@@ -0,0 +1,156 @@
+"""
+Image format and dimension sniffing
+Identifies an upload from its leading bytes instead of the client-supplied
+Content-Type, and reads width and height from the format headers. Only the
+header bytes are read: a few dozen for PNG, GIF, WebP and BMP, the segment
+markers for JPEG (skipped over by seeking), and the first 4KB for SVG.
+"""
+import io
+import re
+import struct
+from typing import BinaryIO, NamedTuple, Optional, Union
+
+SNIFF_BYTES = 32
+SVG_SNIFF_BYTES = 4096
+
+# JPEG start-of-frame markers (carry the dimensions); C4, C8 and CC are not frames
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+_SVG_ROOT = re.compile(rb'^\s*(?:<\?xml[^>]*>\s*)?(?:<!--.*?-->\s*|<!DOCTYPE[^>]*>\s*)*<svg[\s>]', re.IGNORECASE | re.DOTALL)
+_SVG_TAG = re.compile(rb'<svg[^>]*>', re.IGNORECASE)
+_SVG_SIZE = re.compile(rb'\s(width|height)\s*=\s*["\']\s*([\d.]+)\s*(?:px)?\s*["\']', re.IGNORECASE)
+
+
+class ImageInfo(NamedTuple):
+    """Detected format of an image; width/height are None when not stated in the header"""
+    content_type: str
+    width: Optional[int]
+    height: Optional[int]
+
+
+def probe_image(image: Union[bytes, BinaryIO]) -> Optional[ImageInfo]:
+    """Format and dimensions of image bytes or of a seekable file (position is kept)
+
+    Returns None when the content is not a supported image.
+    """
+    if isinstance(image, (bytes, bytearray)):
+        image = io.BytesIO(image)
+    position = image.tell()
+    try:
+        image.seek(0)
+        head = image.read(SNIFF_BYTES)
+
+        if head.startswith(b'\x89PNG\r\n\x1a\n'):
+            return _png(head)
+        if head.startswith(b'\xff\xd8\xff'):
+            return _jpeg(image)
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return _gif(head)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return _webp(head)
+        if head[:2] == b'BM':
+            return _bmp(head)
+
+        image.seek(0)
+        return _svg(image.read(SVG_SNIFF_BYTES))
+    finally:
+        image.seek(position)
+
+
+def _png(head: bytes) -> Optional[ImageInfo]:
+    if head[12:16] != b'IHDR' or len(head) < 24:
+        return None
+    width, height = struct.unpack('>II', head[16:24])
+    return ImageInfo('image/png', width, height)
+
+
+def _gif(head: bytes) -> Optional[ImageInfo]:
+    if len(head) < 10:
+        return None
+    width, height = struct.unpack('<HH', head[6:10])
+    return ImageInfo('image/gif', width, height)
+
+
+def _webp(head: bytes) -> Optional[ImageInfo]:
+    chunk = head[12:16]
+    if chunk == b'VP8 ' and len(head) >= 30:
+        width, height = struct.unpack('<HH', head[26:30])
+        return ImageInfo('image/webp', width & 0x3FFF, height & 0x3FFF)
+    if chunk == b'VP8L' and len(head) >= 25 and head[20] == 0x2F:
+        b0, b1, b2, b3 = head[21:25]
+        width = 1 + (b0 | (b1 & 0x3F) << 8)
+        height = 1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10)
+        return ImageInfo('image/webp', width, height)
+    if chunk == b'VP8X' and len(head) >= 30:
+        width = 1 + int.from_bytes(head[24:27], 'little')
+        height = 1 + int.from_bytes(head[27:30], 'little')
+        return ImageInfo('image/webp', width, height)
+    return None
+
+
+def _bmp(head: bytes) -> Optional[ImageInfo]:
+    if len(head) < 26:
+        return None
+    header_size = struct.unpack('<I', head[14:18])[0]
+    if header_size == 12:
+        width, height = struct.unpack('<HH', head[18:22])
+    elif header_size >= 40:
+        width, height = struct.unpack('<ii', head[18:26])
+    else:
+        return None
+    # Negative height marks a top-down bitmap
+    return ImageInfo('image/bmp', abs(width), abs(height))
+
+
+def _jpeg(image: BinaryIO) -> Optional[ImageInfo]:
+    """Walk the JPEG segments to the first start-of-frame, seeking over segment bodies"""
+    image.seek(2)
+    while True:
+        byte = image.read(1)
+        if not byte:
+            return ImageInfo('image/jpeg', None, None)
+        if byte != b'\xff':
+            return None
+        marker = image.read(1)
+        while marker == b'\xff':  # fill bytes
+            marker = image.read(1)
+        if not marker:
+            return ImageInfo('image/jpeg', None, None)
+
+        code = marker[0]
+        if code in JPEG_STANDALONE_MARKERS:
+            continue
+        if code in (0xD9, 0xDA):
+            # End of image or start of scan before any frame header
+            return ImageInfo('image/jpeg', None, None)
+
+        length_bytes = image.read(2)
+        if len(length_bytes) < 2:
+            return ImageInfo('image/jpeg', None, None)
+        length = struct.unpack('>H', length_bytes)[0]
+        if length < 2:
+            return None
+        if code in JPEG_SOF_MARKERS:
+            frame = image.read(5)
+            if len(frame) < 5:
+                return ImageInfo('image/jpeg', None, None)
+            height, width = struct.unpack('>HH', frame[1:5])
+            return ImageInfo('image/jpeg', width, height)
+        image.seek(length - 2, io.SEEK_CUR)
+
+
+def _svg(head: bytes) -> Optional[ImageInfo]:
+    if head.startswith(b'\xef\xbb\xbf'):
+        head = head[3:]
+    if not _SVG_ROOT.match(head):
+        return None
+    tag = _SVG_TAG.search(head)
+    sizes = {name.lower(): value for name, value in _SVG_SIZE.findall(tag.group(0) if tag else b'')}
+    width = sizes.get(b'width')
+    height = sizes.get(b'height')
+    return ImageInfo(
+        'image/svg+xml',
+        int(float(width)) if width else None,
+        int(float(height)) if height else None
+    )
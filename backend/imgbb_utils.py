@@ -1,89 +1,80 @@
 """
 ImgBB API Integration
 Handles image uploads to ImgBB cloud storage
+
+upload_to_imgbb_async is the path used by the API: it shares one pooled
+httpx.AsyncClient per worker, caps concurrent uploads, and retries timeouts,
+connection errors, 429 and 5xx responses with exponential backoff. Cancelling
+the awaiting task aborts the upload. IMGBB_API_URL can point at a local
+stand-in server for testing.
+
+Images are sent as a multipart file part. A file object (such as the
+UploadFile spool) is streamed in 64 KB chunks, so an upload never holds a
+base64 copy of the image in memory.
 """
 import os
+import asyncio
 import logging
-import base64
+import io
+import random
 import requests
-from typing import Optional, Dict
+from typing import BinaryIO, Optional, Dict, Tuple, Union
+
+from config import settings
+from image_probe import ImageInfo, probe_image
 
 logger = logging.getLogger(__name__)
 
 # ImgBB API Configuration
 IMGBB_API_KEY = os.getenv("IMGBB_API_KEY", "81c81608aeec2e89be5d099d3f3a55e8")
-IMGBB_API_URL = "https://api.imgbb.com/1/upload"
+IMGBB_API_URL = os.getenv("IMGBB_API_URL", "https://api.imgbb.com/1/upload")
+
+
+ImageSource = Union[bytes, BinaryIO]
 
 
-def upload_to_imgbb(file_content: bytes, filename: str) -> Dict:
+def upload_size(image: ImageSource) -> int:
+    """Size in bytes of image content or of a seekable file (position is kept)"""
+    if isinstance(image, (bytes, bytearray)):
+        return len(image)
+    position = image.tell()
+    try:
+        return image.seek(0, io.SEEK_END)
+    finally:
+        image.seek(position)
+
+
+def upload_to_imgbb(file_content: ImageSource, filename: str, content_type: str = None) -> Dict:
     """
     Upload an image to ImgBB and return the URL
     
     Args:
-        file_content: The binary content of the image file
+        file_content: The image bytes, or a binary file object to stream
         filename: Original filename (for reference)
+        content_type: MIME type sent with the file part
     
     Returns:
         Dict with success status and either url or error message
     """
     try:
         # Validate file content
-        if not file_content:
+        if not upload_size(file_content):
             return {
                 "success": False,
                 "error": "No file content provided"
             }
         
-        # Encode file content to base64
-        base64_image = base64.b64encode(file_content).decode('utf-8')
-        
-        # Prepare the payload
-        payload = {
-            'key': IMGBB_API_KEY,
-            'image': base64_image,
-            'name': filename
-        }
-        
         logger.info(f"📤 Uploading image to ImgBB: {filename}")
         
-        # Make the API request
+        # Make the API request (image as a multipart file part)
         response = requests.post(
             IMGBB_API_URL,
-            data=payload,
+            data={'key': IMGBB_API_KEY, 'name': filename},
+            files={'image': (filename, file_content, content_type or 'application/octet-stream')},
             timeout=30
         )
         
-        # Check response status
-        if response.status_code == 200:
-            result = response.json()
-            
-            if result.get('success'):
-                image_url = result['data']['url']
-                display_url = result['data']['display_url']
-                delete_url = result['data'].get('delete_url')
-                
-                logger.info(f"✅ Image uploaded successfully to ImgBB: {image_url}")
-                
-                return {
-                    "success": True,
-                    "url": image_url,
-                    "display_url": display_url,
-                    "delete_url": delete_url,
-                    "filename": filename
-                }
-            else:
-                error_msg = result.get('error', {}).get('message', 'Unknown error')
-                logger.error(f"❌ ImgBB API returned error: {error_msg}")
-                return {
-                    "success": False,
-                    "error": f"ImgBB API error: {error_msg}"
-                }
-        else:
-            logger.error(f"❌ ImgBB API request failed with status {response.status_code}")
-            return {
-                "success": False,
-                "error": f"Upload failed with status code {response.status_code}"
-            }
+        return _upload_result(response.status_code, response.json, filename)
             
     except requests.exceptions.Timeout:
         logger.error("❌ ImgBB API request timed out")
@@ -105,35 +96,206 @@ def upload_to_imgbb(file_content: bytes, filename: str) -> Dict:
         }
 
 
-def validate_image_file(file_content: bytes, content_type: str, max_size_mb: int = 5) -> Optional[str]:
+def _upload_result(status_code: int, read_json, filename: str) -> Dict:
+    """Translate an ImgBB API response into the upload result dict"""
+    if status_code == 200:
+        result = read_json()
+        
+        if result.get('success'):
+            image_url = result['data']['url']
+            display_url = result['data']['display_url']
+            delete_url = result['data'].get('delete_url')
+            
+            logger.info(f"✅ Image uploaded successfully to ImgBB: {image_url}")
+            
+            return {
+                "success": True,
+                "url": image_url,
+                "display_url": display_url,
+                "delete_url": delete_url,
+                "filename": filename
+            }
+        else:
+            error_msg = result.get('error', {}).get('message', 'Unknown error')
+            logger.error(f"❌ ImgBB API returned error: {error_msg}")
+            return {
+                "success": False,
+                "error": f"ImgBB API error: {error_msg}"
+            }
+    else:
+        logger.error(f"❌ ImgBB API request failed with status {status_code}")
+        return {
+            "success": False,
+            "error": f"Upload failed with status code {status_code}"
+        }
+
+
+class ImgBBClient:
+    """Async ImgBB uploader with a pooled client, a concurrency cap and retries"""
+    
+    def __init__(self, api_url: str = None, api_key: str = None, max_concurrency: int = None,
+                 max_retries: int = None, timeout: float = None, backoff: float = None):
+        self.api_url = api_url or IMGBB_API_URL
+        self.api_key = api_key or IMGBB_API_KEY
+        self.max_concurrency = max_concurrency or settings.IMGBB_MAX_CONCURRENCY
+        self.max_retries = settings.IMGBB_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or settings.IMGBB_TIMEOUT
+        self.backoff = settings.IMGBB_BACKOFF if backoff is None else backoff
+        self._client = None
+        self._client_loop = None
+        self._semaphore = None
+    
+    def _get_client(self):
+        """Create the AsyncClient and semaphore lazily for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._client_loop is not loop:
+            # Neither can be shared across event loops (e.g. test clients)
+            self._client = None
+        if self._client is None:
+            import httpx
+            
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 10.0)),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client_loop = loop
+        return self._client
+    
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff with jitter; a numeric Retry-After wins if longer"""
+        delay = self.backoff * (2 ** attempt) * (1 + random.random())
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return min(delay, settings.IMGBB_MAX_BACKOFF)
+    
+    async def upload(self, file_content: ImageSource, filename: str, content_type: str = None) -> Dict:
+        """Upload an image; same result dict as upload_to_imgbb
+        
+        A file object is streamed from its start on every attempt.
+        """
+        import httpx
+        
+        if not upload_size(file_content):
+            return {
+                "success": False,
+                "error": "No file content provided"
+            }
+        
+        form = {'key': self.api_key, 'name': filename}
+        image_part = (filename, file_content, content_type or 'application/octet-stream')
+        
+        client = self._get_client()
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    logger.info(f"📤 Uploading image to ImgBB: {filename} (attempt {attempt + 1})")
+                    response = await client.post(self.api_url, data=form, files={'image': image_part})
+                if response.status_code < 500 and response.status_code != 429:
+                    return _upload_result(response.status_code, response.json, filename)
+                retry_after = response.headers.get('Retry-After')
+                error = {
+                    "success": False,
+                    "error": f"Upload failed with status code {response.status_code}"
+                }
+            except httpx.TimeoutException:
+                error = {
+                    "success": False,
+                    "error": "Upload request timed out. Please try again."
+                }
+            except httpx.TransportError as e:
+                error = {
+                    "success": False,
+                    "error": f"Network error: {str(e)}"
+                }
+            except Exception as e:
+                logger.error(f"❌ Unexpected error during ImgBB upload: {str(e)}")
+                return {
+                    "success": False,
+                    "error": f"Unexpected error: {str(e)}"
+                }
+            
+            if attempt >= self.max_retries:
+                logger.error(f"❌ ImgBB upload of {filename} failed after {attempt + 1} attempts: {error['error']}")
+                return error
+            delay = self._retry_delay(attempt, retry_after)
+            logger.warning(f"ImgBB upload of {filename} failed ({error['error']}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            if self._client_loop is asyncio.get_running_loop():
+                await self._client.aclose()
+            self._client = None
+
+
+imgbb_client = ImgBBClient()
+
+
+async def upload_to_imgbb_async(file_content: ImageSource, filename: str, content_type: str = None) -> Dict:
+    """Upload an image to ImgBB without blocking the event loop (see ImgBBClient)"""
+    return await imgbb_client.upload(file_content, filename, content_type)
+
+
+def inspect_image(file_content: ImageSource, content_type: str = None, max_size_mb: int = 5,
+                  max_pixels: Optional[int] = None) -> Tuple[Optional[ImageInfo], Optional[str]]:
     """
-    Validate image file before upload
+    Validate an image by its content before upload
+    
+    The format is sniffed from the leading bytes and the dimensions are read
+    from the image header; the client-supplied content_type is not trusted.
     
     Args:
-        file_content: The binary content of the file
-        content_type: MIME type of the file
+        file_content: The binary content of the file, or a seekable file
+            object (its size is checked without reading it)
+        content_type: MIME type claimed by the client
         max_size_mb: Maximum file size in MB
+        max_pixels: Maximum width * height (defaults to MAX_IMAGE_PIXELS)
     
     Returns:
-        Error message if validation fails, None if valid
+        (ImageInfo, None) if valid, (None, error message) otherwise
     """
     # Check if file content exists
-    if not file_content:
-        return "No file content provided"
-    
-    # Validate file type
-    allowed_types = [
-        "image/jpeg", "image/jpg", "image/png", 
-        "image/gif", "image/webp", "image/svg+xml", "image/bmp"
-    ]
-    if content_type not in allowed_types:
-        return "Invalid file type. Allowed types: JPEG, PNG, GIF, WebP, SVG, BMP"
+    file_size = upload_size(file_content)
+    if not file_size:
+        return None, "No file content provided"
     
     # Validate file size
     max_size_bytes = max_size_mb * 1024 * 1024
-    file_size = len(file_content)
     if file_size > max_size_bytes:
-        return f"File size ({file_size / (1024*1024):.2f}MB) exceeds maximum allowed size ({max_size_mb}MB)"
+        return None, f"File size ({file_size / (1024*1024):.2f}MB) exceeds maximum allowed size ({max_size_mb}MB)"
+    
+    # Validate file type from the content itself
+    info = probe_image(file_content)
+    if info is None:
+        return None, "Invalid file type. Allowed types: JPEG, PNG, GIF, WebP, SVG, BMP"
+    if content_type and content_type.replace('image/jpg', 'image/jpeg') != info.content_type:
+        logger.info(f"Upload declared as {content_type} is {info.content_type}")
+    
+    # Validate dimensions (decoding a huge image would exhaust memory)
+    max_pixels = settings.MAX_IMAGE_PIXELS if max_pixels is None else max_pixels
+    if info.width is not None and info.height is not None:
+        if not info.width or not info.height:
+            return None, "Image has no width or height"
+        if info.width * info.height > max_pixels:
+            return None, f"Image dimensions ({info.width}x{info.height}) exceed the maximum of {max_pixels} pixels"
     
     # File is valid
-    return None
+    return info, None
+
+
+def validate_image_file(file_content: ImageSource, content_type: str, max_size_mb: int = 5) -> Optional[str]:
+    """
+    Validate image file before upload (see inspect_image)
+    
+    Returns:
+        Error message if validation fails, None if valid
+    """
+    return inspect_image(file_content, content_type, max_size_mb)[1]
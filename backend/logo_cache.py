@@ -0,0 +1,99 @@
+"""
+Content-addressed logo uploads
+Logos are identified by the SHA-256 of their bytes. The digest maps to the
+ImgBB URLs in the database under LOGO_HASH_ROOT, so re-uploading an identical
+logo returns the stored URLs without a network call or a duplicate remote
+image. Identical uploads running at the same time share one ImgBB upload.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional, Union
+
+from imgbb_utils import upload_to_imgbb_async
+
+logger = logging.getLogger(__name__)
+
+LOGO_HASH_ROOT = 'logo_hashes'
+HASH_CHUNK_SIZE = 64 * 1024
+
+_uploading: Dict[str, asyncio.Future] = {}
+
+
+def content_hash(image: Union[bytes, BinaryIO]) -> str:
+    """SHA-256 hex digest of image bytes or of a seekable file, read in chunks"""
+    if isinstance(image, (bytes, bytearray)):
+        return hashlib.sha256(image).hexdigest()
+
+    digest = hashlib.sha256()
+    image.seek(0)
+    while True:
+        chunk = image.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+    image.seek(0)
+    return digest.hexdigest()
+
+
+async def upload_logo(db, image: Union[bytes, BinaryIO], filename: str, content_type: Optional[str] = None) -> Dict:
+    """Upload a logo unless identical content was uploaded before
+
+    Returns the upload_to_imgbb result dict, with "cached": True when the
+    URLs came from the hash index.
+    """
+    # Hashing a large upload (and reading a spooled file) would block the loop
+    digest = await asyncio.to_thread(content_hash, image)
+    path = f'{LOGO_HASH_ROOT}/{digest}'
+
+    entry = await db.get(path)
+    if isinstance(entry, dict) and entry.get('url'):
+        logger.info(f"♻️ Reusing uploaded logo for {filename} ({digest[:12]})")
+        return {
+            "success": True,
+            "url": entry['url'],
+            "display_url": entry.get('display_url', entry['url']),
+            "delete_url": entry.get('delete_url'),
+            "filename": filename,
+            "cached": True
+        }
+
+    pending = _uploading.get(digest)
+    while pending is not None and pending.get_loop() is asyncio.get_running_loop():
+        result = await asyncio.shield(pending)
+        if result is not None:
+            return dict(result, filename=filename, cached=result.get("success", False))
+        # The sharing request was cancelled before it finished: upload ourselves
+        # (or join whichever waiter took over)
+        pending = _uploading.get(digest)
+
+    future = asyncio.get_running_loop().create_future()
+    _uploading[digest] = future
+    try:
+        result = await upload_to_imgbb_async(image, filename, content_type)
+        if result.get("success"):
+            stored = await db.set(path, {
+                "url": result["url"],
+                "display_url": result.get("display_url", result["url"]),
+                "delete_url": result.get("delete_url"),
+                "filename": filename,
+                "content_type": content_type,
+                "uploaded_at": datetime.utcnow().isoformat()
+            })
+            if not stored:
+                logger.warning(f"Could not record logo hash {digest[:12]}; the next identical upload will not be deduplicated")
+        result = dict(result, cached=False)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            # Cancelling the future would cancel the waiters too; None makes them retry
+            future.set_result(None)
+        else:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        if _uploading.get(digest) is future:
+            del _uploading[digest]
@@ -0,0 +1,197 @@
+"""
+Pluggable logo storage
+LOGO_STORAGE selects where uploaded logos go:
+
+- imgbb: the original image on ImgBB (deduplicated by content hash)
+- local: resized WebP and PNG variants written under UPLOAD_DIR/logo_variants
+  and served by this API (SVG logos are stored as uploaded)
+
+Local variant files are named after the SHA-256 of the uploaded bytes and the
+variant width, so a name always refers to the same bytes and can be served
+with a far-future immutable Cache-Control; re-uploading the same logo reuses
+the existing files.
+"""
+import asyncio
+import io
+import logging
+import os
+import uuid
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from fastapi.staticfiles import StaticFiles
+
+from config import settings
+from logo_cache import content_hash, upload_logo
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIRNAME = 'logo_variants'
+VARIANT_FORMATS = {'webp': 'WEBP', 'png': 'PNG'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _read_all(image: Union[bytes, BinaryIO]) -> bytes:
+    """Image bytes from bytes or a seekable file"""
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    image.seek(0)
+    data = image.read()
+    image.seek(0)
+    return data
+
+
+def render_variants(data: bytes, widths: List[int]) -> Dict[int, Dict[str, bytes]]:
+    """Resize an image to each width (never upscaling) as WebP and PNG
+
+    Returns {width: {'webp': bytes, 'png': bytes}}; widths larger than the
+    image collapse into one variant at the original width.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        source.seek(0)  # first frame of animated images
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        variants = {}
+        for width in sorted(set(min(width, image.width) for width in widths)):
+            resized = image.copy()
+            resized.thumbnail((width, image.height), Image.LANCZOS)
+
+            encoded = {}
+            for extension, pil_format in VARIANT_FORMATS.items():
+                buffer = io.BytesIO()
+                if pil_format == 'WEBP':
+                    resized.save(buffer, pil_format, quality=settings.LOGO_WEBP_QUALITY, method=4)
+                else:
+                    resized.save(buffer, pil_format, optimize=True)
+                encoded[extension] = buffer.getvalue()
+            variants[width] = encoded
+        return variants
+
+
+class ImgBBLogoStorage:
+    """Logos on ImgBB (the original image, no variants)"""
+
+    name = 'imgbb'
+
+    def __init__(self, db):
+        self._db = db
+
+    async def save(self, image: Union[bytes, BinaryIO], filename: str, content_type: Optional[str] = None,
+                   base_url: str = '') -> Dict[str, Any]:
+        return await upload_logo(self._db, image, filename, content_type)
+
+
+class LocalLogoStorage:
+    """Logos as resized variants on local disk, served from /uploads"""
+
+    name = 'local'
+
+    def __init__(self, upload_dir: Optional[str] = None, widths: Optional[List[int]] = None):
+        self.upload_dir = upload_dir or settings.UPLOAD_DIR
+        self.variant_dir = os.path.join(self.upload_dir, VARIANT_DIRNAME)
+        self.widths = widths or settings.LOGO_VARIANT_WIDTHS
+
+    async def save(self, image: Union[bytes, BinaryIO], filename: str, content_type: Optional[str] = None,
+                   base_url: str = '') -> Dict[str, Any]:
+        """Write the variants (if not already stored) and return their URLs"""
+        prefix = f"{base_url.rstrip('/')}/uploads/{VARIANT_DIRNAME}"
+        svg = content_type == 'image/svg+xml'
+        try:
+            # Hashing, reading the spooled upload and rendering all block
+            digest, stored = await asyncio.to_thread(self._save, image, svg)
+        except Exception as e:
+            logger.error(f"❌ Failed to store logo {filename} locally: {e}")
+            return {
+                "success": False,
+                "error": "Could not process image. Use a PNG, JPEG, GIF, WebP or BMP file."
+            }
+
+        if svg:
+            return {
+                "success": True,
+                "url": f"{prefix}/{stored}",
+                "display_url": f"{prefix}/{stored}",
+                "variants": {},
+                "filename": filename
+            }
+
+        variants = {
+            extension: {str(width): f"{prefix}/{names[extension]}" for width, names in stored.items()}
+            for extension in VARIANT_FORMATS
+        }
+        # Default: PNG (works everywhere) at the width closest to LOGO_DEFAULT_WIDTH
+        default_width = min(stored, key=lambda width: abs(width - settings.LOGO_DEFAULT_WIDTH))
+        logger.info(f"✅ Stored {len(stored)} logo variants for {filename} ({digest[:12]})")
+        return {
+            "success": True,
+            "url": variants['png'][str(default_width)],
+            "display_url": variants['webp'][str(default_width)],
+            "variants": variants,
+            "filename": filename
+        }
+
+    def _save(self, image: Union[bytes, BinaryIO], svg: bool) -> Tuple[str, Any]:
+        """Digest of the upload and its stored file name (SVG) or variant names"""
+        digest = content_hash(image)[:32]
+        data = _read_all(image)
+        if svg:
+            # Vector logos need no variants
+            name = f"{digest}.svg"
+            if not os.path.exists(os.path.join(self.variant_dir, name)):
+                os.makedirs(self.variant_dir, exist_ok=True)
+                self._write(name, data)
+            return digest, name
+        return digest, self._store(digest, data)
+
+    def _store(self, digest: str, data: bytes) -> Dict[int, Dict[str, str]]:
+        """Variant file names per width, rendering only what is missing"""
+        os.makedirs(self.variant_dir, exist_ok=True)
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as probe:
+            original_width = probe.width
+        widths = sorted(set(min(width, original_width) for width in self.widths))
+        names = {
+            width: {extension: f"{digest}-{width}.{extension}" for extension in VARIANT_FORMATS}
+            for width in widths
+        }
+
+        missing = [
+            width for width in widths
+            if not all(os.path.exists(os.path.join(self.variant_dir, name)) for name in names[width].values())
+        ]
+        if missing:
+            for width, encoded in render_variants(data, missing).items():
+                for extension, payload in encoded.items():
+                    self._write(names[width][extension], payload)
+        return names
+
+    def _write(self, name: str, payload: bytes):
+        """Write a variant atomically (readers never see a partial file)"""
+        path = os.path.join(self.variant_dir, name)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed files: cache them for a year"""
+
+    async def get_response(self, path: str, scope) -> Any:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def get_logo_storage(db):
+    """Storage backend selected by LOGO_STORAGE"""
+    if settings.LOGO_STORAGE == 'local':
+        return LocalLogoStorage()
+    if settings.LOGO_STORAGE != 'imgbb':
+        logger.warning(f"Unknown LOGO_STORAGE '{settings.LOGO_STORAGE}', using imgbb")
+    return ImgBBLogoStorage(db)
@@ -0,0 +1,177 @@
+"""
+Secondary indexes for the in-memory mock databases
+A CollectionIndex keeps, per queried field of one collection, a hash index
+(sort rank -> keys) for equality and `in` filters and a sorted list of
+(sort rank, key) for ordering and ranges. Indexes are built on the first
+query that needs a field and then maintained by the mock's write methods, so
+a query costs the size of its result rather than a scan and sort of the
+collection. Ordering with a limit over a filtered set walks the sorted index
+when the filter is unselective and otherwise ranks the matches with a heap
+(top-k).
+
+Values are compared by query_builder.sort_rank (null < false < true <
+numbers < strings < objects), so fields holding mixed types sort the way the
+Realtime Database sorts them instead of raising TypeError. Documents without
+the field are not in that field's index: they never match a filter on it and
+are left out when ordering by it, as in Firestore.
+
+Data returned by the mocks is the stored object itself; changing it without
+a write method leaves the indexes stale.
+"""
+import bisect
+import heapq
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from query_builder import sort_rank
+
+KEY_FIELD = '$key'
+VALUE_FIELD = '$value'
+
+# Firestore-style filter operators
+RANGE_OPERATORS = {
+    '<': lambda rank, bound: rank < bound,
+    '<=': lambda rank, bound: rank <= bound,
+    '>': lambda rank, bound: rank > bound,
+    '>=': lambda rank, bound: rank >= bound,
+    '!=': lambda rank, bound: rank != bound,
+}
+
+_MISSING = object()
+_rank_of = itemgetter(0)
+
+
+def _field_value(key: str, doc: Any, field: str) -> Any:
+    """Value of a field in a document ($key and $value address the key and the document)"""
+    if field == KEY_FIELD:
+        return key
+    if field == VALUE_FIELD:
+        return doc
+    if isinstance(doc, dict):
+        return doc.get(field, _MISSING)
+    return _MISSING
+
+
+class _FieldIndex:
+    """Hash and sorted index of one field"""
+
+    __slots__ = ('ranks', 'ordered', 'buckets')
+
+    def __init__(self, field: str, docs: Dict[str, Any]):
+        self.ranks: Dict[str, Tuple] = {}
+        self.buckets: Dict[Tuple, Set[str]] = {}
+        for key, doc in docs.items():
+            value = _field_value(key, doc, field)
+            if value is not _MISSING:
+                rank = sort_rank(value)
+                self.ranks[key] = rank
+                self.buckets.setdefault(rank, set()).add(key)
+        self.ordered: List[Tuple[Tuple, str]] = sorted((rank, key) for key, rank in self.ranks.items())
+
+    def add(self, key: str, rank: Tuple):
+        self.ranks[key] = rank
+        self.buckets.setdefault(rank, set()).add(key)
+        bisect.insort(self.ordered, (rank, key))
+
+    def remove(self, key: str):
+        rank = self.ranks.pop(key, None)
+        if rank is None:
+            return
+        bucket = self.buckets[rank]
+        bucket.discard(key)
+        if not bucket:
+            del self.buckets[rank]
+        position = bisect.bisect_left(self.ordered, (rank, key))
+        if position < len(self.ordered) and self.ordered[position] == (rank, key):
+            del self.ordered[position]
+
+
+class CollectionIndex:
+    """Indexes of the fields queried on one collection"""
+
+    def __init__(self):
+        self._fields: Dict[str, _FieldIndex] = {}
+
+    def field(self, name: str, docs: Dict[str, Any]) -> _FieldIndex:
+        """Index of a field, built from docs on first use"""
+        index = self._fields.get(name)
+        if index is None:
+            index = self._fields[name] = _FieldIndex(name, docs)
+        return index
+
+    def put(self, key: str, doc: Any):
+        """Re-index a document after it was written"""
+        for name, index in self._fields.items():
+            index.remove(key)
+            value = _field_value(key, doc, name)
+            if value is not _MISSING:
+                index.add(key, sort_rank(value))
+
+    def discard(self, key: str):
+        """Drop a deleted document"""
+        for index in self._fields.values():
+            index.remove(key)
+
+    def range(self, field: str, docs: Dict[str, Any], equal_to: Any = None, start_at: Any = None,
+              end_at: Any = None, limit_to_first: Optional[int] = None,
+              limit_to_last: Optional[int] = None) -> List[str]:
+        """Keys ordered by a field within bounds (Realtime Database query semantics)"""
+        ordered = self.field(field, docs).ordered
+        if equal_to is not None:
+            start_at = end_at = equal_to
+        low = 0 if start_at is None else bisect.bisect_left(ordered, sort_rank(start_at), key=_rank_of)
+        high = len(ordered) if end_at is None else bisect.bisect_right(ordered, sort_rank(end_at), key=_rank_of)
+        if limit_to_first:
+            high = min(high, low + limit_to_first)
+        if limit_to_last:
+            low = max(low, high - limit_to_last)
+        return [key for _, key in ordered[low:high]]
+
+    def select(self, docs: Dict[str, Any], filters: Iterable[Tuple[str, str, Any]] = (),
+               order_field: Optional[str] = None, descending: bool = False,
+               limit: Optional[int] = None) -> List[str]:
+        """Keys matching Firestore-style filters, ordered by order_field (document key by default)"""
+        candidates: Optional[Set[str]] = None
+        range_filters = []
+        for field, operator, value in filters:
+            if operator in ('==', 'in'):
+                buckets = self.field(field, docs).buckets
+                values = [value] if operator == '==' else value
+                matched = set()
+                for item in values:
+                    matched.update(buckets.get(sort_rank(item), ()))
+                candidates = matched if candidates is None else candidates & matched
+            elif operator in RANGE_OPERATORS:
+                range_filters.append((self.field(field, docs).ranks, RANGE_OPERATORS[operator], sort_rank(value)))
+            else:
+                raise ValueError(f"Unsupported query operator: {operator}")
+
+        order_index = self.field(order_field or KEY_FIELD, docs)
+        if candidates is None and not range_filters:
+            # Straight off the sorted index
+            ordered = reversed(order_index.ordered) if descending else iter(order_index.ordered)
+            return [key for _, key in islice(ordered, limit or None)]
+
+        if candidates is None:
+            candidates = range_filters[0][0].keys()
+        order_ranks = order_index.ranks
+
+        def accept(key):
+            return key in order_ranks and all(
+                key in ranks and test(ranks[key], bound) for ranks, test, bound in range_filters
+            )
+
+        if limit and limit * len(order_index.ordered) <= len(candidates) ** 2:
+            # Unselective filter: walking the sorted index finds limit matches
+            # sooner than ranking every candidate
+            ordered = reversed(order_index.ordered) if descending else iter(order_index.ordered)
+            return list(islice((key for _, key in ordered if key in candidates and accept(key)), limit))
+
+        matches = [key for key in candidates if accept(key)]
+        sort_key = lambda key: (order_ranks[key], key)
+        if limit:
+            if descending:
+                return heapq.nlargest(limit, matches, key=sort_key)
+            return heapq.nsmallest(limit, matches, key=sort_key)
+        return sorted(matches, key=sort_key, reverse=descending)
@@ -0,0 +1,311 @@
+"""
+Crash-safe persistence for the mock Realtime Database
+With MOCK_DB_DIR set, every write to the mock is appended to a write-ahead
+log (wal.log) before the call returns, and the log is periodically compacted
+into a snapshot (snapshot.json). Startup loads the snapshot and replays the
+log records written after it.
+
+Log records are single lines "<crc32> <json>"; a torn or corrupt tail left by
+a crash is detected by the checksum and truncated on startup. MOCK_DB_FSYNC
+picks the durability of appended records:
+
+- always: fsync after every write (survives power loss, slowest). The async
+  client applies the write on the event loop and waits for the fsync in a
+  worker thread, where concurrent writers share one fsync (group commit)
+- interval: fsync at most every MOCK_DB_FSYNC_INTERVAL seconds from a
+  background thread (a power loss can lose the last interval)
+- never: leave flushing to the OS (survives a process crash only)
+
+Compaction after MOCK_DB_SNAPSHOT_EVERY records serializes the data in the
+writing thread, rotates the log to wal.log.1 and writes the snapshot from a
+background thread, so a write only pays for the serialization.
+
+Only one process may own a directory: an exclusive lock on its LOCK file is
+held from load_snapshot() until close(), and a second process fails fast
+instead of replaying (and truncating) a log that is still being written.
+"""
+import json
+import logging
+import os
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = 'snapshot.json'
+LOG_FILE = 'wal.log'
+ROTATED_LOG_FILE = 'wal.log.1'
+LOCK_FILE = 'LOCK'
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+
+def _fsync_dir(directory: str):
+    """Make renames in a directory durable (not supported on every platform)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _lock_directory(directory: str) -> Optional[int]:
+    """Take the directory's exclusive lock; raises RuntimeError when another process holds it"""
+    try:
+        import fcntl
+    except ImportError:
+        logger.warning("Mock DB: file locking unavailable; make sure only one process uses MOCK_DB_DIR")
+        return None
+    fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        raise RuntimeError(f"Mock DB directory {directory} is in use by another process")
+    return fd
+
+
+def _encode(record: Dict[str, Any], default: Callable) -> bytes:
+    """Log line for a record: checksum, space, JSON"""
+    payload = json.dumps(record, separators=(',', ':'), default=default).encode('utf-8')
+    return b'%08x %s\n' % (zlib.crc32(payload), payload)
+
+
+def _read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of a log file, truncating it at the first torn or corrupt line"""
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        return
+    with f:
+        offset = 0
+        for line in f:
+            record = None
+            if line.endswith(b'\n') and len(line) > 10 and line[8:9] == b' ':
+                payload = line[9:-1]
+                try:
+                    if int(line[:8], 16) == zlib.crc32(payload):
+                        record = json.loads(payload)
+                except ValueError:
+                    record = None
+            if record is None:
+                logger.warning(f"Mock DB: truncating {path} at byte {offset} (incomplete or corrupt record)")
+                f.truncate(offset)
+                return
+            offset += len(line)
+            yield record
+
+
+class WriteAheadLog:
+    """Append-only log plus snapshots for one mock database directory"""
+
+    def __init__(self, directory: str, fsync: str = 'interval', fsync_interval: float = 1.0,
+                 snapshot_every: int = 10000, default: Optional[Callable] = None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"MOCK_DB_FSYNC must be one of {', '.join(FSYNC_POLICIES)}, got {fsync!r}")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self._default = default
+        self._lock = threading.Lock()
+        self._file = None
+        self._lock_fd: Optional[int] = None
+        self._seq = 0
+        self._synced = 0
+        self._sync_lock = threading.Lock()
+        self._since_snapshot = 0
+        self._dirty = False
+        self._closed = threading.Event()
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._sync_thread: Optional[threading.Thread] = None
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the last appended record"""
+        return self._seq
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.directory, LOG_FILE)
+
+    @property
+    def rotated_path(self) -> str:
+        return os.path.join(self.directory, ROTATED_LOG_FILE)
+
+    def load_snapshot(self) -> Dict[str, Any]:
+        """Data of the latest snapshot (empty without one); locks the directory"""
+        os.makedirs(self.directory, exist_ok=True)
+        if self._lock_fd is None:
+            self._lock_fd = _lock_directory(self.directory)
+        data: Dict[str, Any] = {}
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'rb') as f:
+                snapshot = json.load(f)
+            data = snapshot.get('data') or {}
+            self._seq = snapshot.get('seq', 0)
+        return data
+
+    def replay(self, apply: Callable[[Dict[str, Any]], None], storage: Dict[str, Any]) -> int:
+        """Apply the log records newer than the snapshot and open the log for appending
+
+        apply performs one record on storage (which holds the snapshot data).
+        Returns the number of records applied.
+        """
+        interrupted = os.path.exists(self.rotated_path)
+        applied = 0
+        for path in (self.rotated_path, self.log_path):
+            for record in _read_records(path):
+                if record['seq'] <= self._seq:
+                    continue
+                apply(record)
+                self._seq = record['seq']
+                applied += 1
+        self._since_snapshot = applied
+
+        self._file = open(self.log_path, 'ab')
+        if self.fsync == 'interval':
+            self._sync_thread = threading.Thread(target=self._sync_loop, name='mock-db-fsync', daemon=True)
+            self._sync_thread.start()
+
+        if interrupted:
+            # A snapshot did not finish before the last shutdown
+            self.compact(storage, wait=True)
+        return applied
+
+    def append(self, record: Dict[str, Any], storage: Dict[str, Any], sync: bool = True) -> int:
+        """Log a write that was just applied to storage and return its seq
+        
+        sync=False leaves the fsync of the "always" policy to a later sync(seq).
+        """
+        with self._lock:
+            if self._file is None:
+                return self._seq
+            self._seq += 1
+            self._file.write(_encode(dict(record, seq=self._seq), self._default))
+            self._file.flush()
+            if self.fsync == 'always' and sync:
+                os.fsync(self._file.fileno())
+                self._synced = self._seq
+            else:
+                self._dirty = True
+            self._since_snapshot += 1
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                self._compact(storage)
+            return self._seq
+
+    def sync(self, seq: int):
+        """fsync the log up to record seq; one fsync covers every record appended so far"""
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            with self._lock:
+                f, target = self._file, self._seq
+                self._dirty = False
+            if f is not None:
+                try:
+                    os.fsync(f.fileno())
+                except (OSError, ValueError):
+                    pass  # rotated and closed meanwhile; rotation fsyncs it
+            with self._lock:
+                self._synced = max(self._synced, target)
+
+    def compact(self, storage: Dict[str, Any], wait: bool = False):
+        """Snapshot storage and drop the log records it contains"""
+        with self._lock:
+            self._compact(storage)
+        if wait and self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+
+    def close(self):
+        """Flush and fsync the log, wait for a running snapshot and unlock the directory"""
+        self._closed.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)  # releases the flock
+                self._lock_fd = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the health check"""
+        return {
+            'directory': self.directory,
+            'fsync': self.fsync,
+            'seq': self._seq,
+            'records_since_snapshot': self._since_snapshot,
+        }
+
+    def _compact(self, storage: Dict[str, Any]):
+        """Rotate the log and write the snapshot in the background (lock held)"""
+        if self._snapshot_thread is not None:
+            # One snapshot at a time: wal.log.1 must be covered before it is replaced
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+        payload = json.dumps({'seq': self._seq, 'data': storage}, separators=(',', ':'), default=self._default)
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._synced = self._seq
+        self._since_snapshot = 0
+        self._dirty = False
+        if os.path.exists(self.rotated_path):
+            # The previous snapshot failed (or startup found one unfinished):
+            # snapshot in place, then both logs are covered
+            if self._write_snapshot(payload):
+                self._file.truncate(0)
+            return
+
+        self._file.close()
+        os.replace(self.log_path, self.rotated_path)
+        self._file = open(self.log_path, 'ab')
+
+        self._snapshot_thread = threading.Thread(
+            target=self._write_snapshot, args=(payload,), name='mock-db-snapshot', daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def _write_snapshot(self, payload: str) -> bool:
+        """Atomically replace the snapshot, then remove the log it supersedes"""
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        tmp_path = f"{snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, snapshot_path)
+            _fsync_dir(self.directory)
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+            logger.info(f"Mock DB: wrote snapshot ({len(payload)} bytes)")
+            return True
+        except OSError as e:
+            # wal.log.1 is kept, so nothing is lost; the next compaction retries
+            logger.error(f"Mock DB: failed to write snapshot: {e}")
+            return False
+
+    def _sync_loop(self):
+        """fsync the log every fsync_interval seconds while there are unsynced writes"""
+        while not self._closed.wait(self.fsync_interval):
+            with self._lock:
+                f = self._file if self._dirty else None
+                self._dirty = False
+            if f is None:
+                continue
+            try:
+                # Outside the lock so writers do not wait for the disk
+                os.fsync(f.fileno())
+            except (OSError, ValueError):
+                pass  # rotated and closed meanwhile; rotation fsyncs it
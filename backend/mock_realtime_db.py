@@ -1,16 +1,147 @@
 """
 Mock Firebase Realtime Database for testing
+Queries are answered from secondary indexes (see mock_index) that the write
+methods keep up to date. With MOCK_DB_DIR set, the serving process calls
+open_persistence() at startup: writes are then persisted to a write-ahead log
+and snapshots in that directory (see mock_persistence) and reloaded on the
+next start. Importing the module never touches the directory, so spawned
+worker processes that re-import the server leave the log alone.
 """
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Tuple
 import uuid
-from datetime import datetime
+import json
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, date
+
+from config import settings
+from mock_index import CollectionIndex
+from mock_persistence import WriteAheadLog
+from query_builder import Query
+from write_batch import WriteBatch
 
 logger = logging.getLogger(__name__)
 
 # In-memory storage for mock database
 _mock_storage = {}
 
+# Indexes of queried collections, by path parts
+_indexes: Dict[Tuple[str, ...], CollectionIndex] = {}
+
+# Serializes compare-and-set so conditional writes are atomic across threads
+_cas_lock = threading.RLock()
+
+# ETag reported for a location that holds no data (same as Firebase)
+NULL_ETAG = 'null_etag'
+
+# Write-ahead log when persistence is enabled (see enable_persistence)
+_wal: Optional[WriteAheadLog] = None
+_wal_state = threading.local()
+
+def _json_default(value: Any) -> Any:
+    """Serialize datetimes the same way the Realtime Database REST client does"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _to_stored(data: Any) -> Any:
+    """Round-trip data through JSON so the mock stores what Firebase would store"""
+    return json.loads(json.dumps(data, default=_json_default))
+
+def _etag(value: Any) -> str:
+    """Content hash standing in for the ETag Firebase computes"""
+    if value is None:
+        return NULL_ETAG
+    return hashlib.md5(json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+def _walk(parts: list, create: bool = False) -> Optional[Dict[str, Any]]:
+    """Return the node addressed by path parts, optionally creating missing parents"""
+    node = _mock_storage
+    for part in parts:
+        child = node.get(part)
+        if not isinstance(child, dict):
+            if not create:
+                return None
+            child = node[part] = {}
+        node = child
+    return node
+
+def _prune(parts: list):
+    """Drop empty nested nodes like Firebase does (top-level collections are kept)"""
+    while len(parts) > 1:
+        parent = _walk(parts[:-1])
+        if parent is None or parent.get(parts[-1]) != {}:
+            return
+        del parent[parts[-1]]
+        parts = parts[:-1]
+
+def _persist(op: str, path: str, data: Any = None):
+    """Log a write that was applied to _mock_storage"""
+    if _wal is not None and not getattr(_wal_state, 'suspended', False):
+        _wal.append({'op': op, 'path': path, 'data': data}, _mock_storage,
+                    sync=not getattr(_wal_state, 'deferred_sync', False))
+
+@contextmanager
+def _unlogged():
+    """Writes in this block are not logged individually (replay, multi-location updates)"""
+    previous = getattr(_wal_state, 'suspended', False)
+    _wal_state.suspended = True
+    try:
+        yield
+    finally:
+        _wal_state.suspended = previous
+
+async def _durable_write(write: Callable, *args, **kwargs) -> Any:
+    """Apply a write on the event loop; with MOCK_DB_FSYNC=always wait for its fsync in a thread"""
+    wal = _wal
+    if wal is None or wal.fsync != 'always':
+        return write(*args, **kwargs)
+    _wal_state.deferred_sync = True
+    try:
+        result = write(*args, **kwargs)
+        seq = wal.seq
+    finally:
+        _wal_state.deferred_sync = False
+    await asyncio.to_thread(wal.sync, seq)
+    return result
+
+def _index_for(parts: list) -> Tuple[CollectionIndex, Dict[str, Any]]:
+    """Index of the collection at path parts, and its documents"""
+    docs = _walk(parts)
+    if not isinstance(docs, dict):
+        docs = {}
+    index = _indexes.get(tuple(parts))
+    if index is None:
+        index = _indexes[tuple(parts)] = CollectionIndex()
+    return index, docs
+
+def _reindex(parts: list):
+    """Update the indexes affected by a write at path parts
+    
+    Collections containing the written path re-index the document the path is
+    in; indexes of the written node itself or below it are dropped and rebuilt
+    on the next query.
+    """
+    if not _indexes:
+        return
+    depth = len(parts)
+    with _cas_lock:
+        for collection, index in list(_indexes.items()):
+            if len(collection) >= depth:
+                if list(collection[:depth]) == parts:
+                    del _indexes[collection]
+            elif tuple(parts[:len(collection)]) == collection:
+                key = parts[len(collection)]
+                docs = _walk(list(collection))
+                if docs is not None and key in docs:
+                    index.put(key, docs[key])
+                else:
+                    index.discard(key)
+
 class MockFirebaseRealtimeDB:
     """Mock Firebase Realtime Database for testing"""
     
@@ -24,14 +155,15 @@ class MockFirebaseRealtimeDB:
         try:
             path = path.strip('/')
             if '/' in path:
-                # Handle nested paths like 'appointments/id'
+                # Handle nested paths like 'appointments/id' or 'appointment_slots/day/time'
                 parts = path.split('/')
-                collection = parts[0]
-                doc_id = parts[1]
+                collection = '/'.join(parts[:-1])
+                doc_id = parts[-1]
+                parent = _walk(parts[:-1])
                 
-                if collection in _mock_storage and doc_id in _mock_storage[collection]:
+                if parent is not None and doc_id in parent:
                     logger.info(f"Mock: Retrieved document {doc_id} from {collection}")
-                    return _mock_storage[collection][doc_id]
+                    return parent[doc_id]
                 else:
                     logger.info(f"Mock: Document {doc_id} not found in {collection}")
                     return None
@@ -52,22 +184,28 @@ class MockFirebaseRealtimeDB:
         """Set data at a path"""
         try:
             path = path.strip('/')
+            if data is None:
+                # Writing null removes the node, as in Firebase
+                self.delete(path)
+                return True
+            
             if '/' in path:
-                # Handle nested paths like 'appointments/id'
+                # Handle nested paths like 'appointments/id' or 'appointment_slots/day/time'
                 parts = path.split('/')
-                collection = parts[0]
-                doc_id = parts[1]
-                
-                if collection not in _mock_storage:
-                    _mock_storage[collection] = {}
+                collection = '/'.join(parts[:-1])
+                doc_id = parts[-1]
                 
-                _mock_storage[collection][doc_id] = data
+                stored = _walk(parts[:-1], create=True)[doc_id] = _to_stored(data)
+                _reindex(parts)
+                _persist('set', path, stored)
                 logger.info(f"Mock: Set document {doc_id} in {collection}")
                 return True
             else:
                 # Handle collection paths
                 collection = path
-                _mock_storage[collection] = data
+                stored = _mock_storage[collection] = _to_stored(data)
+                _reindex([collection])
+                _persist('set', path, stored)
                 logger.info(f"Mock: Set collection {collection}")
                 return True
         except Exception as e:
@@ -79,18 +217,19 @@ class MockFirebaseRealtimeDB:
         try:
             path = path.strip('/')
             if '/' in path:
-                # Handle nested paths like 'appointments/id'
+                # Handle nested paths like 'appointments/id' or 'appointment_slots/day/time'
                 parts = path.split('/')
-                collection = parts[0]
-                doc_id = parts[1]
-                
-                if collection not in _mock_storage:
-                    _mock_storage[collection] = {}
+                collection = '/'.join(parts[:-1])
+                doc_id = parts[-1]
+                parent = _walk(parts[:-1], create=True)
+                stored = _to_stored(data)
                 
-                if doc_id in _mock_storage[collection]:
-                    _mock_storage[collection][doc_id].update(data)
+                if isinstance(parent.get(doc_id), dict):
+                    parent[doc_id].update(stored)
                 else:
-                    _mock_storage[collection][doc_id] = data
+                    parent[doc_id] = stored
+                _reindex(parts)
+                _persist('update', path, stored)
                 
                 logger.info(f"Mock: Updated document {doc_id} in {collection}")
                 return True
@@ -106,13 +245,17 @@ class MockFirebaseRealtimeDB:
         try:
             path = path.strip('/')
             if '/' in path:
-                # Handle nested paths like 'appointments/id'
+                # Handle nested paths like 'appointments/id' or 'appointment_slots/day/time'
                 parts = path.split('/')
-                collection = parts[0]
-                doc_id = parts[1]
+                collection = '/'.join(parts[:-1])
+                doc_id = parts[-1]
+                parent = _walk(parts[:-1])
                 
-                if collection in _mock_storage and doc_id in _mock_storage[collection]:
-                    del _mock_storage[collection][doc_id]
+                if parent is not None and doc_id in parent:
+                    del parent[doc_id]
+                    _prune(parts[:-1])
+                    _reindex(parts)
+                    _persist('delete', path)
                     logger.info(f"Mock: Deleted document {doc_id} from {collection}")
                     return True
                 else:
@@ -123,6 +266,8 @@ class MockFirebaseRealtimeDB:
                 collection = path
                 if collection in _mock_storage:
                     del _mock_storage[collection]
+                    _reindex([collection])
+                    _persist('delete', path)
                     logger.info(f"Mock: Deleted collection {collection}")
                     return True
                 else:
@@ -132,6 +277,90 @@ class MockFirebaseRealtimeDB:
             logger.error(f"Mock: Error deleting data at {path}: {e}")
             return False
     
+    def push(self, path: str, data: Any) -> Optional[str]:
+        """Push data to a path (creates new entry with unique key)"""
+        new_key = uuid.uuid4().hex
+        if self.set(f"{path.strip('/')}/{new_key}", data):
+            return new_key
+        return None
+    
+    def query(self, path: str, order_by: str = None, limit_to_first: int = None,
+              limit_to_last: int = None, equal_to: Any = None, start_at: Any = None,
+              end_at: Any = None, timeout: Any = None) -> Any:
+        """Query data with filters (mirrors the Realtime Database REST parameters; timeout is ignored)"""
+        data = self.get(path)
+        if not isinstance(data, dict):
+            return data
+        
+        if order_by:
+            # Ordered range of the field's sorted index
+            with _cas_lock:
+                index, docs = _index_for(path.strip('/').split('/'))
+                keys = index.range(order_by, docs, equal_to=equal_to, start_at=start_at, end_at=end_at,
+                                   limit_to_first=limit_to_first, limit_to_last=limit_to_last)
+            return {key: data[key] for key in keys}
+        
+        items = list(data.items())
+        if limit_to_first:
+            items = items[:limit_to_first]
+        if limit_to_last:
+            items = items[-limit_to_last:]
+        return dict(items)
+    
+    def batch(self, chunk_size: int = None) -> WriteBatch:
+        """Collect writes to commit as multi-location updates (see write_batch)"""
+        return WriteBatch(self, chunk_size)
+    
+    def multi_update(self, updates: Dict[str, Any], chunk_size: int = None, timeout: Any = None) -> bool:
+        """Write many non-overlapping paths at once (null deletes)"""
+        with _cas_lock:
+            # One log record, so a crash cannot persist part of the update
+            with _unlogged():
+                for path, value in updates.items():
+                    self.set(path, value)
+            _persist('multi', '', _to_stored(updates))
+        logger.info(f"Mock: Wrote {len(updates)} paths in a multi-location update")
+        return True
+    
+    def ref(self, path: str) -> Query:
+        """Query builder for the data at a path (see query_builder)"""
+        return Query(self, path)
+    
+    def get_with_etag(self, path: str) -> Tuple[Any, Optional[str]]:
+        """Get data from a path together with its ETag"""
+        with _cas_lock:
+            value = self.get(path)
+            return value, _etag(value)
+    
+    def set_if_match(self, path: str, data: Any, etag: str) -> Tuple[bool, Any, Optional[str]]:
+        """Compare-and-set: write only if the current ETag matches
+        
+        Returns (written, current value, current ETag) like the Firebase client.
+        """
+        with _cas_lock:
+            current = self.get(path)
+            current_etag = _etag(current)
+            if etag != current_etag:
+                logger.info(f"Mock: ETag mismatch at {path}")
+                return False, current, current_etag
+            self.set(path, data)
+            stored = self.get(path)
+            return True, stored, _etag(stored)
+    
+    def reserve(self, path: str, value: Any, max_retries: int = 3) -> Tuple[bool, Any]:
+        """Atomically claim an empty path (or one that already holds value)"""
+        etag = NULL_ETAG
+        for _ in range(max_retries + 1):
+            written, current, current_etag = self.set_if_match(path, value, etag)
+            if written:
+                return True, value
+            if current is not None and current != value:
+                return False, current
+            if current == value:
+                return True, value
+            etag = current_etag
+        return False, None
+    
     def get_collection(self, collection_name: str):
         """Get collection reference (for compatibility with Firestore-style code)"""
         return MockCollection(collection_name)
@@ -139,6 +368,10 @@ class MockFirebaseRealtimeDB:
     def collection(self, collection_name: str):
         """Get collection reference (for compatibility with Firestore-style code)"""
         return MockCollection(collection_name)
+    
+    def open_persistence(self) -> bool:
+        """Load and persist to MOCK_DB_DIR (for scripts; the server opens it at startup)"""
+        return open_configured_persistence()
 
 class MockCollection:
     """Mock collection for compatibility"""
@@ -147,6 +380,7 @@ class MockCollection:
         self.collection_name = collection_name
         if collection_name not in _mock_storage:
             _mock_storage[collection_name] = {}
+            _reindex([collection_name])
     
     def document(self, doc_id: str):
         """Get document reference"""
@@ -183,7 +417,9 @@ class MockDocumentRef:
         """Set document data"""
         if self.collection_name not in _mock_storage:
             _mock_storage[self.collection_name] = {}
-        _mock_storage[self.collection_name][self.doc_id] = data
+        stored = _mock_storage[self.collection_name][self.doc_id] = _to_stored(data)
+        _reindex([self.collection_name, self.doc_id])
+        _persist('set', f"{self.collection_name}/{self.doc_id}", stored)
         logger.info(f"Mock: Set document {self.doc_id} in {self.collection_name}")
     
     def get(self):
@@ -237,34 +473,148 @@ class MockQuery:
                         filters=new_filters)
     
     def get(self):
-        """Execute query"""
-        docs = []
-        if self.collection_name in _mock_storage:
-            for doc_id, data in _mock_storage[self.collection_name].items():
-                # Apply filters
-                include = True
-                for field, operator, value in self.filters:
-                    if field in data:
-                        if operator == '==' and data[field] != value:
-                            include = False
-                            break
-                        elif operator == 'in' and data[field] not in value:
-                            include = False
-                            break
-                
-                if include:
-                    docs.append(MockDoc(doc_id, data))
-        
-        # Apply ordering (basic implementation)
-        if self.order_field:
-            reverse = self.order_direction.upper() == 'DESCENDING'
-            docs.sort(key=lambda d: d.to_dict().get(self.order_field, ''), reverse=reverse)
-        
-        # Apply limit
-        if self.limit_count:
-            docs = docs[:self.limit_count]
-        
-        return docs
+        """Execute query (from the collection's indexes, see mock_index)"""
+        with _cas_lock:
+            index, docs = _index_for([self.collection_name])
+            keys = index.select(docs, self.filters, order_field=self.order_field,
+                                descending=self.order_direction.upper() == 'DESCENDING',
+                                limit=self.limit_count)
+            return [MockDoc(key, docs[key]) for key in keys]
+
+class AsyncMockFirebaseRealtimeDB:
+    """asyncio facade over MockFirebaseRealtimeDB matching AsyncFirebaseRealtimeDB"""
+    
+    def __init__(self, sync_db: MockFirebaseRealtimeDB):
+        self._db = sync_db
+    
+    async def get(self, path: str, query_params: Dict[str, Any] = None, timeout: Any = None) -> Any:
+        """Get data from a path"""
+        return self._db.get(path)
+    
+    async def set(self, path: str, data: Any, timeout: Any = None) -> bool:
+        """Set data at a path"""
+        return await _durable_write(self._db.set, path, data)
+    
+    async def push(self, path: str, data: Any, timeout: Any = None) -> Optional[str]:
+        """Push data to a path (creates new entry with unique key)"""
+        return await _durable_write(self._db.push, path, data)
+    
+    async def update(self, path: str, data: Dict[str, Any], timeout: Any = None) -> bool:
+        """Update data at a path"""
+        return await _durable_write(self._db.update, path, data)
+    
+    async def delete(self, path: str, timeout: Any = None) -> bool:
+        """Delete data at a path"""
+        return await _durable_write(self._db.delete, path)
+    
+    async def query(self, path: str, order_by: str = None, limit_to_first: int = None,
+                    limit_to_last: int = None, equal_to: Any = None, start_at: Any = None,
+                    end_at: Any = None, timeout: Any = None) -> Any:
+        """Query data with filters"""
+        return self._db.query(path, order_by=order_by, limit_to_first=limit_to_first,
+                              limit_to_last=limit_to_last, equal_to=equal_to,
+                              start_at=start_at, end_at=end_at)
+    
+    def batch(self, chunk_size: int = None) -> WriteBatch:
+        """Collect writes to commit as multi-location updates (see write_batch)"""
+        return WriteBatch(self, chunk_size)
+    
+    async def multi_update(self, updates: Dict[str, Any], chunk_size: int = None, timeout: Any = None) -> bool:
+        """Write many non-overlapping paths at once (null deletes)"""
+        return await _durable_write(self._db.multi_update, updates, chunk_size=chunk_size)
+    
+    def ref(self, path: str) -> Query:
+        """Query builder for the data at a path (see query_builder)"""
+        return Query(self, path)
+    
+    async def get_with_etag(self, path: str, timeout: Any = None) -> Tuple[Any, Optional[str]]:
+        """Get data from a path together with its ETag"""
+        return self._db.get_with_etag(path)
+    
+    async def set_if_match(self, path: str, data: Any, etag: str, timeout: Any = None) -> Tuple[bool, Any, Optional[str]]:
+        """Compare-and-set: write only if the current ETag matches"""
+        return await _durable_write(self._db.set_if_match, path, data, etag)
+    
+    async def reserve(self, path: str, value: Any, max_retries: int = 3, timeout: Any = None) -> Tuple[bool, Any]:
+        """Atomically claim an empty path (or one that already holds value)"""
+        return await _durable_write(self._db.reserve, path, value, max_retries=max_retries)
+    
+    async def get_collection(self, collection_name: str) -> Dict[str, Any]:
+        """Get all documents in a collection (same shape as AsyncFirebaseRealtimeDB)"""
+        data = self._db.get(collection_name)
+        if data and isinstance(data, dict):
+            return {
+                'items': [
+                    {**value, 'id': key} for key, value in data.items()
+                ],
+                'raw': data
+            }
+        return {'items': [], 'raw': {}}
+    
+    def persistence_stats(self) -> Optional[Dict[str, Any]]:
+        """Write-ahead log counters (None when the mock is in-memory only)"""
+        return _wal.stats() if _wal is not None else None
+    
+    async def open_persistence(self) -> bool:
+        """Load and persist to MOCK_DB_DIR (called once by the serving process)"""
+        return await asyncio.to_thread(open_configured_persistence)
+    
+    async def aclose(self):
+        """Flush the write-ahead log when persistence is enabled"""
+        close_persistence()
+
+def enable_persistence(directory: str, fsync: str = None, fsync_interval: float = None,
+                       snapshot_every: int = None):
+    """Load the mock's data from directory and log every later write there"""
+    global _wal
+    close_persistence()
+    started = time.perf_counter()
+    wal = WriteAheadLog(
+        directory,
+        fsync=fsync or settings.MOCK_DB_FSYNC,
+        fsync_interval=settings.MOCK_DB_FSYNC_INTERVAL if fsync_interval is None else fsync_interval,
+        snapshot_every=settings.MOCK_DB_SNAPSHOT_EVERY if snapshot_every is None else snapshot_every,
+        default=_json_default
+    )
+    
+    def apply(record: Dict[str, Any]):
+        op, path, data = record['op'], record['path'], record.get('data')
+        if op == 'set':
+            firebase_db.set(path, data)
+        elif op == 'update':
+            firebase_db.update(path, data)
+        elif op == 'delete':
+            firebase_db.delete(path)
+        elif op == 'multi':
+            firebase_db.multi_update(data)
+    
+    try:
+        with _cas_lock, _unlogged():
+            _mock_storage.clear()
+            _indexes.clear()
+            _mock_storage.update(wal.load_snapshot())
+            replayed = wal.replay(apply, _mock_storage)
+    except BaseException:
+        wal.close()
+        raise
+    _wal = wal
+    logger.info(f"Mock: Loaded {len(_mock_storage)} collections from {directory} "
+                f"({replayed} log records replayed) in {time.perf_counter() - started:.2f}s")
+
+def open_configured_persistence() -> bool:
+    """Enable persistence to MOCK_DB_DIR if configured and not already enabled"""
+    if not settings.MOCK_DB_DIR or _wal is not None:
+        return _wal is not None
+    enable_persistence(settings.MOCK_DB_DIR)
+    return True
+
+def close_persistence():
+    """Flush and close the write-ahead log (the mock stays usable in memory)"""
+    global _wal
+    if _wal is not None:
+        _wal.close()
+        _wal = None
 
-# Global instance
-firebase_db = MockFirebaseRealtimeDB()
\ No newline at end of file
+# Global instances
+firebase_db = MockFirebaseRealtimeDB()
+async_firebase_db = AsyncMockFirebaseRealtimeDB(firebase_db)
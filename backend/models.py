@@ -88,6 +88,11 @@ class Appointment(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class ExportJobCreate(BaseModel):
+    """Model for queueing an export job"""
+    format: str = Field(..., description="Export format: pdf or excel")
+    status_filter: Optional[str] = Field(None, description="Only export appointments with this status")
+
 class AdminLoginRequest(BaseModel):
     """Model for admin login request"""
     email: EmailStr
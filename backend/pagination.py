@@ -0,0 +1,154 @@
+"""
+Cursor pagination over Realtime Database collections
+Pages are ordered newest first by a timestamp child (created_at, submitted_at)
+with the record key as tie-breaker. The cursor is an opaque token holding the
+(timestamp, key) of the last record returned; the next page is fetched with
+orderBy/endAt/limitToLast so only about one page of records is downloaded.
+iter_collection walks a whole collection the same way, in key order, for
+streaming exports; iter_newest walks it newest first for rendered reports.
+"""
+import base64
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(value: Any, key: str) -> str:
+    """Opaque cursor for the position after (value, key)"""
+    raw = json.dumps([value, key], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor
+
+    A valid cursor is a [timestamp, key] pair of strings.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        decoded = json.loads(raw)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    # Pages are ordered by string timestamps: anything else would fail to compare
+    if not (isinstance(decoded, list) and len(decoded) == 2 and all(isinstance(part, str) for part in decoded)):
+        raise ValueError("Invalid cursor")
+    value, key = decoded
+    return value, key
+
+
+async def fetch_query(db, query) -> Optional[Dict[str, Any]]:
+    """Result of a query_builder query, evaluated client-side on a full read if the query fails
+
+    A failed REST query (e.g. "Index not defined" before the .indexOn rules
+    are deployed, or a network error) returns None, which callers would
+    otherwise take for an empty result.
+    """
+    result = await query.get()
+    if result is None:
+        logger.warning(f"Query on {query.path} returned no result; falling back to a full read")
+        result = query.apply(await db.get(query.path))
+    return result
+
+
+async def fetch_page(db, path: str, order_by: str, limit: int, cursor: Optional[str] = None,
+                     predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page of records under path, newest first
+
+    predicate filters records client-side (the database can order by only one
+    child); the window is widened until a full page survives the filter or the
+    collection is exhausted. Returns (records, next_cursor); next_cursor is None
+    on the last page.
+    """
+    if limit <= 0:
+        return [], None
+
+    after = decode_cursor(cursor) if cursor else None
+    # One extra record to detect a next page, plus the cursor record itself
+    # (endAt is inclusive)
+    fetch = limit + 2 if after else limit + 1
+
+    while True:
+        query = db.ref(path).order_by_child(order_by).limit_to_last(fetch)
+        if after:
+            query = query.end_at(after[0])
+        raw = await query.get()
+        exhausted = raw is None or len(raw) < fetch
+        if raw is None:
+            # Query failed (e.g. index not deployed yet): fall back to a full read
+            raw = await db.get(path)
+            exhausted = True
+
+        rows = [
+            (record.get(order_by), key, record)
+            for key, record in (raw or {}).items()
+            if isinstance(record, dict) and record.get(order_by) is not None
+        ]
+        rows.sort(key=lambda row: (row[0], row[1]), reverse=True)
+        if after:
+            rows = [row for row in rows if (row[0], row[1]) < after]
+        if predicate:
+            rows = [row for row in rows if predicate(row[2])]
+
+        if len(rows) > limit or exhausted:
+            break
+        fetch *= 2
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1][0], page[-1][1]) if len(rows) > limit else None
+    return [record for _, _, record in page], next_cursor
+
+
+async def iter_collection(db, path: str, page_size: Optional[int] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Yield every (key, record) under path in key order, one page at a time
+
+    Only one page of records is held at a time. Raises RuntimeError if a page
+    after the first cannot be read, so a caller never mistakes a failed read
+    for the end of the collection.
+    """
+    page_size = page_size or settings.EXPORT_PAGE_SIZE
+    last_key = None
+
+    while True:
+        query = db.ref(path).order_by_key()
+        if last_key is None:
+            query = query.limit_to_first(page_size)
+        else:
+            # startAt is inclusive: fetch one extra for the last key already sent
+            query = query.start_at(last_key).limit_to_first(page_size + 1)
+
+        raw = await query.get()
+        if raw is None:
+            if last_key is None:
+                return
+            raise RuntimeError(f"Failed to read {path} after key {last_key}")
+
+        items = query.ordered(raw)
+        if last_key is not None and items and items[0][0] == last_key:
+            items = items[1:]
+
+        for key, record in items:
+            if isinstance(record, dict):
+                yield key, record
+
+        if len(items) < page_size:
+            return
+        last_key = items[-1][0]
+
+
+async def iter_newest(db, path: str, order_by: str, page_size: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Yield every record under path newest first by order_by, one page at a time
+
+    Records without order_by are skipped (as in fetch_page).
+    """
+    page_size = page_size or settings.EXPORT_PAGE_SIZE
+    cursor = None
+    while True:
+        page, cursor = await fetch_page(db, path, order_by, page_size, cursor=cursor)
+        for record in page:
+            yield record
+        if not cursor:
+            return
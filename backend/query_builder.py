@@ -0,0 +1,151 @@
+"""
+Query builder for Realtime Database reads
+Describes an orderBy / range / limit query and pushes it down to the
+database's REST query parameters, so only matching records are downloaded:
+
+    await firebase_db.ref('appointments').order_by_child('status').equal_to('pending').get()
+    firebase_db.ref('status_checks').order_by_child('timestamp').limit_to_last(20).get()
+
+ref() exists on every database client (sync, asyncio and mock); get() returns
+whatever the client's query() returns, so it is awaited for asyncio clients.
+Every child used in order_by_child() needs an ".indexOn" entry in
+database.rules.json.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def sort_rank(value: Any) -> Tuple[int, Any]:
+    """Realtime Database ordering: null < false < true < numbers < strings < objects"""
+    if value is None:
+        return 0, 0
+    if isinstance(value, bool):
+        return 1, int(value)
+    if isinstance(value, (int, float)):
+        return 2, value
+    if isinstance(value, str):
+        return 3, value
+    return 4, 0
+
+
+class Query:
+    """Immutable description of a Realtime Database query"""
+
+    def __init__(self, db, path: str, params: Optional[Dict[str, Any]] = None):
+        self._db = db
+        self.path = path
+        self.params = dict(params or {})
+
+    def _with(self, **changes) -> 'Query':
+        """Copy of this query with parameters changed"""
+        params = dict(self.params)
+        params.update(changes)
+        return Query(self._db, self.path, params)
+
+    def order_by_child(self, child: str) -> 'Query':
+        """Order by a child value (needs .indexOn for that child)"""
+        if 'order_by' in self.params:
+            raise ValueError("A query can only have one orderBy")
+        return self._with(order_by=child)
+
+    def order_by_key(self) -> 'Query':
+        """Order by record key"""
+        return self.order_by_child('$key')
+
+    def order_by_value(self) -> 'Query':
+        """Order by the record value itself"""
+        return self.order_by_child('$value')
+
+    def start_at(self, value: Any) -> 'Query':
+        """Only records whose ordered value is >= value"""
+        return self._range(start_at=value)
+
+    def end_at(self, value: Any) -> 'Query':
+        """Only records whose ordered value is <= value"""
+        return self._range(end_at=value)
+
+    def between(self, start: Any, end: Any) -> 'Query':
+        """Only records whose ordered value is within [start, end]"""
+        return self._range(start_at=start, end_at=end)
+
+    def equal_to(self, value: Any) -> 'Query':
+        """Only records whose ordered value equals value"""
+        if 'start_at' in self.params or 'end_at' in self.params:
+            raise ValueError("equalTo cannot be combined with startAt/endAt")
+        return self._with(equal_to=value)
+
+    def limit_to_first(self, count: int) -> 'Query':
+        """Keep the first count records in order"""
+        if 'limit_to_last' in self.params:
+            raise ValueError("limitToFirst cannot be combined with limitToLast")
+        return self._with(limit_to_first=count)
+
+    def limit_to_last(self, count: int) -> 'Query':
+        """Keep the last count records in order"""
+        if 'limit_to_first' in self.params:
+            raise ValueError("limitToLast cannot be combined with limitToFirst")
+        return self._with(limit_to_last=count)
+
+    def _range(self, **bounds) -> 'Query':
+        """Add startAt/endAt bounds"""
+        if 'equal_to' in self.params:
+            raise ValueError("startAt/endAt cannot be combined with equalTo")
+        return self._with(**bounds)
+
+    def get(self, timeout: Any = None) -> Any:
+        """Run the query on the database (a coroutine for asyncio clients)"""
+        params = dict(self.params)
+        if params and 'order_by' not in params:
+            raise ValueError("Range filters and limits require an orderBy")
+        if timeout is not None:
+            params['timeout'] = timeout
+        return self._db.query(self.path, **params)
+
+    def ordered(self, result: Optional[Dict[str, Any]], descending: bool = False) -> List[Tuple[str, Any]]:
+        """(key, value) pairs of a query result in the query's order
+
+        The REST API returns an unordered JSON object, so results are sorted
+        client-side the way the database ordered them (ties broken by key).
+        """
+        return sorted((result or {}).items(), key=lambda item: (self._rank(*item), item[0]), reverse=descending)
+
+    def apply(self, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Evaluate the query client-side on the full data at its path
+
+        Fallback for when the database cannot run the query (e.g. the
+        .indexOn rule is not deployed yet).
+        """
+        items = self.ordered(data)
+        params = self.params
+        if 'equal_to' in params:
+            bound = self._bound_rank(params['equal_to'])
+            items = [item for item in items if self._rank(*item) == bound]
+        if 'start_at' in params:
+            bound = self._bound_rank(params['start_at'])
+            items = [item for item in items if self._rank(*item) >= bound]
+        if 'end_at' in params:
+            bound = self._bound_rank(params['end_at'])
+            items = [item for item in items if self._rank(*item) <= bound]
+        if params.get('limit_to_first'):
+            items = items[:params['limit_to_first']]
+        if params.get('limit_to_last'):
+            items = items[-params['limit_to_last']:]
+        return dict(items)
+
+    def _rank(self, key: str, value: Any) -> Tuple:
+        """Sort rank of a record under the query's orderBy"""
+        order_by = self.params.get('order_by')
+        if order_by == '$key' or order_by is None:
+            return 0, key
+        if order_by == '$value':
+            return sort_rank(value)
+        child = value.get(order_by) if isinstance(value, dict) else None
+        return sort_rank(child)
+
+    def _bound_rank(self, bound: Any) -> Tuple:
+        """Sort rank of a startAt/endAt/equalTo value"""
+        if self.params.get('order_by') == '$key':
+            return 0, str(bound)
+        return sort_rank(bound)
@@ -0,0 +1,51 @@
+"""
+Rebuild the appointment slot index from the raw appointments node
+Run once after deploying the slot index, or whenever the index drifts:
+
+    python rebuild_slot_index.py            # rebuild and write the index
+    python rebuild_slot_index.py --dry-run  # only report what would be written
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_backend import firebase_db
+from slot_index import SLOT_INDEX_ROOT, build_slot_index
+
+
+def rebuild_slot_index(dry_run: bool = False) -> bool:
+    """Reconstruct appointment_slots from appointments"""
+    appointments = firebase_db.get('appointments') or {}
+    index, duplicates = build_slot_index(appointments)
+
+    slot_count = sum(len(slots) for slots in index.values())
+    print(f"Scanned {len(appointments)} appointments")
+    print(f"✓ {slot_count} active slots across {len(index)} days")
+
+    if duplicates:
+        print(f"⚠️  {len(duplicates)} active appointments share a slot with an earlier booking:")
+        for app_id in duplicates:
+            print(f"   - {app_id}")
+
+    if dry_run:
+        print("\nDry run - index not written")
+        return True
+
+    if not firebase_db.set(SLOT_INDEX_ROOT, index or None):
+        print("❌ Failed to write slot index")
+        return False
+
+    print(f"\n✅ Slot index written to /{SLOT_INDEX_ROOT}")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Lead G - Rebuild Appointment Slot Index")
+    print("=" * 60)
+
+    if hasattr(firebase_db, 'open_persistence'):
+        firebase_db.open_persistence()  # mock database with MOCK_DB_DIR set
+
+    ok = rebuild_slot_index(dry_run='--dry-run' in sys.argv)
+    sys.exit(0 if ok else 1)
@@ -1,17 +1,19 @@
 """
 Seed script to populate the database with demo testimonials and companies
 This will transfer the hardcoded demo data from frontend to the actual database
+All writes (including --clear) go out as one multi-location update
 """
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import firebase_db
+from db_backend import firebase_db
+from write_batch import WriteBatch
 from models import Testimonial, WorkedWithCompany
 from datetime import datetime
 import uuid
 
-def seed_testimonials():
+def seed_testimonials(batch: WriteBatch):
     """Seed demo testimonials into the database"""
     demo_testimonials = [
         {
@@ -54,13 +56,12 @@ def seed_testimonials():
             **testimonial_data
         )
         
-        doc_ref = firebase_db.get_collection('testimonials').document(testimonial.id)
-        doc_ref.set(testimonial.dict())
-        print(f"✓ Added testimonial: {testimonial.company_name}")
+        batch.set(f'testimonials/{testimonial.id}', testimonial.dict())
+        print(f"✓ Queued testimonial: {testimonial.company_name}")
     
-    print(f"\n✅ Successfully seeded {len(demo_testimonials)} testimonials")
+    print(f"\n✅ Queued {len(demo_testimonials)} testimonials")
 
-def seed_worked_with_companies():
+def seed_worked_with_companies(batch: WriteBatch):
     """Seed demo 'Worked With' companies into the database"""
     demo_companies = [
         {
@@ -133,41 +134,47 @@ def seed_worked_with_companies():
             **company_data
         )
         
-        doc_ref = firebase_db.get_collection('worked_with_companies').document(company.id)
-        doc_ref.set(company.dict())
-        print(f"✓ Added company: {company.company_name}")
+        batch.set(f'worked_with_companies/{company.id}', company.dict())
+        print(f"✓ Queued company: {company.company_name}")
     
-    print(f"\n✅ Successfully seeded {len(demo_companies)} companies")
+    print(f"\n✅ Queued {len(demo_companies)} companies")
 
-def clear_collections():
+def clear_collections(batch: WriteBatch):
     """Clear existing data from collections"""
     print("\nClearing existing data...")
     
     # Clear testimonials
-    testimonials_docs = firebase_db.get_collection('testimonials').get()
-    for doc in testimonials_docs:
-        doc.reference.delete()
-    print(f"✓ Cleared {len(testimonials_docs)} testimonials")
+    batch.delete('testimonials')
+    print("✓ Queued clearing testimonials")
     
     # Clear worked with companies
-    companies_docs = firebase_db.get_collection('worked_with_companies').get()
-    for doc in companies_docs:
-        doc.reference.delete()
-    print(f"✓ Cleared {len(companies_docs)} companies")
+    batch.delete('worked_with_companies')
+    print("✓ Queued clearing companies")
 
 if __name__ == "__main__":
     print("=" * 60)
     print("Lead G - Database Seed Script")
     print("=" * 60)
     
+    if hasattr(firebase_db, 'open_persistence'):
+        firebase_db.open_persistence()  # mock database with MOCK_DB_DIR set
+    
+    batch = firebase_db.batch()
+    
     # Ask user if they want to clear existing data
-    import sys
     if len(sys.argv) > 1 and sys.argv[1] == '--clear':
-        clear_collections()
+        clear_collections(batch)
     
     # Seed the data
-    seed_testimonials()
-    seed_worked_with_companies()
+    seed_testimonials(batch)
+    seed_worked_with_companies(batch)
+    
+    # Write everything in one multi-location update
+    path_count = len(batch)
+    if not batch.commit():
+        print("\n❌ Failed to write seed data")
+        sys.exit(1)
+    print(f"\n✓ Wrote {path_count} paths in one batch")
     
     print("\n" + "=" * 60)
     print("✅ Database seeding completed successfully!")
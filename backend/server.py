@@ -4,32 +4,30 @@ A modern, scalable API for Lead Generation services
 """
 from fastapi import FastAPI, HTTPException, status, Depends, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.background import BackgroundTask
 from fastapi.staticfiles import StaticFiles
 import logging
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Optional
 import jwt
 import os
 import shutil
 from pathlib import Path
-from zoneinfo import ZoneInfo
-import pytz
 import bcrypt
 import secrets
 import re
+import hashlib
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 # Local imports
 from config import settings
-try:
-    from database_realtime import firebase_db  # Using Firebase Realtime Database
-except Exception as e:
-    print(f"Firebase Realtime Database not available: {e}. Using mock database.")
-    from mock_realtime_db import firebase_db  # Fallback to mock database
+from db_backend import async_firebase_db as firebase_db  # Backend selected by DATABASE_BACKEND (asyncio client)
 from models import (
     StatusCheck, StatusCheckCreate,
     ContactForm, ContactFormCreate,
@@ -37,9 +35,22 @@ from models import (
     AdminLoginRequest, AdminLoginResponse,
     Testimonial, TestimonialCreate,
     WorkedWithCompany, WorkedWithCompanyCreate,
+    ExportJobCreate,
     APIResponse
 )
-from imgbb_utils import upload_to_imgbb, validate_image_file
+from imgbb_utils import imgbb_client, inspect_image
+from upload_limits import UploadLimitMiddleware
+from logo_storage import VARIANT_DIRNAME, ImmutableStaticFiles, get_logo_storage
+from slot_index import slot_key, slot_path, slot_datetime, release_slot, SLOT_INDEX_ROOT, ACTIVE_STATUSES
+from timezone_utils import local_to_utc, utc_to_local, utc_to_local_batch, utc_days_for_local_date
+from cache import TTLCache
+from pagination import fetch_page, fetch_query, decode_cursor, iter_collection, iter_newest
+from appointment_import import AppointmentImporter, IMPORT_FORMATS, MAX_REPORTED_ERRORS
+from exports import (
+    EXPORT_FORMATS, APPOINTMENT_STATUSES, EXPORT_COLLECTIONS, ROW_EXPORT_MEDIA_TYPES, COLUMNAR_FORMATS,
+    temp_export_path, remove_file, iter_file, encode_csv, encode_ndjson, collect_columns, write_columnar
+)
+from export_jobs import ExportJobManager
 
 # Configure logging
 logging.basicConfig(
@@ -73,21 +84,66 @@ ADMIN_PASSWORD_HASH = os.getenv("ADMIN_PASSWORD_HASH")
 if not ADMIN_EMAIL or not ADMIN_PASSWORD_HASH:
     raise ValueError("Admin credentials (ADMIN_EMAIL and ADMIN_PASSWORD_HASH) must be set in environment")
 
+# Availability responses keyed by (date, timezone), tagged with the UTC days they read
+availability_cache = TTLCache(
+    ttl=settings.AVAILABILITY_CACHE_TTL,
+    max_entries=settings.AVAILABILITY_CACHE_SIZE,
+    name='availability'
+)
+
+# Pre-serialized JSON bodies of the public testimonials / worked-with lists
+public_list_cache = TTLCache(
+    ttl=settings.PUBLIC_LIST_CACHE_TTL,
+    max_entries=settings.PUBLIC_LIST_CACHE_SIZE,
+    name='public_lists'
+)
+
+def render_json(content) -> bytes:
+    """Serialize content exactly like the default JSON response would"""
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+def render_cacheable_json(content) -> tuple:
+    """Serialized body and its content-hash ETag, computed once per cache fill"""
+    body = render_json(content)
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match lists etag (weak comparison, as RFC 9110 requires)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def conditional_json_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """JSON response with ETag/Cache-Control, or 304 when the client copy is current"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def validate_cursor(cursor: Optional[str]):
+    """Reject a malformed pagination cursor with 400"""
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+
+def invalidate_availability(utc_datetime_str: str):
+    """Drop cached availability that covers the UTC day of a changed slot"""
+    day, _ = slot_key(utc_datetime_str)
+    availability_cache.invalidate_tag(day)
+
 def convert_local_to_utc(date_str: str, time_str: str, timezone_str: str) -> datetime:
     """Convert local datetime to UTC datetime"""
     try:
-        # Parse the date and time
-        local_datetime_str = f"{date_str} {time_str}"
-        naive_datetime = datetime.strptime(local_datetime_str, "%Y-%m-%d %H:%M")
-        
-        # Localize to user's timezone
-        user_tz = pytz.timezone(timezone_str)
-        local_datetime = user_tz.localize(naive_datetime)
-        
-        # Convert to UTC
-        utc_datetime = local_datetime.astimezone(pytz.UTC)
-        
-        return utc_datetime
+        # Localize to user's timezone (cached tzinfo) and convert to UTC
+        return local_to_utc(date_str, time_str, timezone_str)
     except Exception as e:
         logger.error(f"Error converting timezone: {e}")
         raise HTTPException(
@@ -98,15 +154,7 @@ def convert_local_to_utc(date_str: str, time_str: str, timezone_str: str) -> dat
 def convert_utc_to_local(utc_datetime_str: str, timezone_str: str) -> tuple:
     """Convert UTC datetime string to local date and time"""
     try:
-        # Parse UTC datetime
-        utc_datetime = datetime.fromisoformat(utc_datetime_str.replace('Z', '+00:00'))
-        utc_datetime = utc_datetime.replace(tzinfo=pytz.UTC)
-        
-        # Convert to user's timezone
-        user_tz = pytz.timezone(timezone_str)
-        local_datetime = utc_datetime.astimezone(user_tz)
-        
-        return local_datetime.strftime("%Y-%m-%d"), local_datetime.strftime("%H:%M")
+        return utc_to_local(utc_datetime_str, timezone_str)
     except Exception as e:
         logger.error(f"Error converting from UTC: {e}")
         return None, None
@@ -171,6 +219,13 @@ limiter = Limiter(key_func=get_client_ip)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Cap logo uploads while they stream in (added before CORS so rejections carry CORS headers)
+app.add_middleware(
+    UploadLimitMiddleware,
+    paths=[f"{settings.API_V1_STR}/testimonials/upload-logo", f"{settings.API_V1_STR}/worked-with/upload-logo"],
+    max_bytes=settings.MAX_LOGO_SIZE_MB * 1024 * 1024,
+)
+
 # Add CORS middleware - Very permissive for cross-domain access
 app.add_middleware(
     CORSMiddleware,
@@ -197,6 +252,10 @@ async def ensure_json_response(request, call_next):
         response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
         response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
         
+        # API responses are private unless the route sets its own caching policy
+        if request.url.path.startswith(settings.API_V1_STR) and "cache-control" not in response.headers:
+            response.headers["Cache-Control"] = "no-store"
+        
         # Handle OPTIONS preflight requests
         if request.method == "OPTIONS":
             response.headers["Access-Control-Allow-Origin"] = "*"
@@ -217,8 +276,10 @@ async def ensure_json_response(request, call_next):
             }
         )
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory="/app/backend/uploads"), name="uploads")
+# Mount static files for uploads (logo variants are content-addressed and
+# cached by clients for a year; the more specific mount must come first)
+app.mount(f"/uploads/{VARIANT_DIRNAME}", ImmutableStaticFiles(directory=os.path.join(settings.UPLOAD_DIR, VARIANT_DIRNAME), check_dir=False), name="logo_variants")
+app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # CORS preflight handler
 @app.options("/{path:path}")
@@ -253,15 +314,26 @@ async def health_check():
     """Detailed health check endpoint"""
     try:
         # Test Firebase connection
-        firebase_db.db.collection('health_check').limit(1).get()
-        
+        await firebase_db.get('health_check')
+
+        data = {
+            "database": "connected",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        # Connection pool usage, used to size FIREBASE_POOL_SIZE per uvicorn worker
+        if hasattr(firebase_db, 'pool_stats'):
+            data["connection_pool"] = firebase_db.pool_stats()
+        # Write-ahead log of the persistent mock database
+        if hasattr(firebase_db, 'persistence_stats'):
+            data["persistence"] = firebase_db.persistence_stats()
+        data["availability_cache"] = availability_cache.stats()
+        data["public_list_cache"] = public_list_cache.stats()
+        data["export_jobs"] = export_jobs.stats()
+
         return APIResponse(
             success=True,
             message="All services are healthy",
-            data={
-                "database": "connected",
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            data=data
         )
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -382,8 +454,7 @@ async def create_status_check(status_data: StatusCheckCreate):
         status_check = StatusCheck(**status_data.dict())
         
         # Save to Firebase
-        doc_ref = firebase_db.get_collection('status_checks').document(status_check.id)
-        doc_ref.set(status_check.dict())
+        await firebase_db.set(f'status_checks/{status_check.id}', status_check.dict())
         
         logger.info(f"Created status check: {status_check.id}")
         return status_check
@@ -399,12 +470,15 @@ async def create_status_check(status_data: StatusCheckCreate):
 async def get_status_checks(limit: int = 100):
     """Retrieve status checks"""
     try:
-        docs = firebase_db.get_collection('status_checks').order_by('timestamp', direction='DESCENDING').limit(limit).get()
+        # Only the latest `limit` checks are downloaded
+        query = firebase_db.ref('status_checks').order_by_child('timestamp').limit_to_last(limit)
         
-        status_checks = []
-        for doc in docs:
-            data = doc.to_dict()
-            status_checks.append(StatusCheck(**data))
+        # Sort by timestamp (most recent first)
+        status_checks = [
+            StatusCheck(**check_data)
+            for check_id, check_data in query.ordered(await fetch_query(firebase_db, query), descending=True)
+        ]
+        status_checks = status_checks[:limit]
         
         logger.info(f"Retrieved {len(status_checks)} status checks")
         return status_checks
@@ -424,8 +498,7 @@ async def submit_contact_form(contact_data: ContactFormCreate):
         contact_form = ContactForm(**contact_data.dict())
         
         # Save to Firebase
-        doc_ref = firebase_db.get_collection('contact_forms').document(contact_form.id)
-        doc_ref.set(contact_form.dict())
+        await firebase_db.set(f'contact_forms/{contact_form.id}', contact_form.dict())
         
         logger.info(f"Contact form submitted: {contact_form.id} by {contact_form.email}")
         return contact_form
@@ -438,20 +511,22 @@ async def submit_contact_form(contact_data: ContactFormCreate):
         )
 
 @app.get(f"{settings.API_V1_STR}/contact", response_model=List[ContactForm])
-async def get_contact_forms(limit: int = 100, status_filter: str = None):
-    """Retrieve contact forms (admin endpoint)"""
+async def get_contact_forms(response: Response, limit: int = 100, status_filter: str = None, cursor: str = None):
+    """Retrieve contact forms (admin endpoint)
+    
+    Most recent first; pass the X-Next-Cursor response header back as cursor
+    to get the next page.
+    """
+    validate_cursor(cursor)
     try:
-        query = firebase_db.get_collection('contact_forms').order_by('submitted_at', direction='DESCENDING')
-        
-        if status_filter:
-            query = query.where('status', '==', status_filter)
-            
-        docs = query.limit(limit).get()
-        
-        contact_forms = []
-        for doc in docs:
-            data = doc.to_dict()
-            contact_forms.append(ContactForm(**data))
+        # Fetch only this page (ordered by submission time, most recent first)
+        page, next_cursor = await fetch_page(
+            firebase_db, 'contact_forms', 'submitted_at', limit, cursor=cursor,
+            predicate=(lambda form_data: form_data.get('status') == status_filter) if status_filter else None
+        )
+        contact_forms = [ContactForm(**form_data) for form_data in page]
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         logger.info(f"Retrieved {len(contact_forms)} contact forms")
         return contact_forms
@@ -475,26 +550,31 @@ async def create_appointment(appointment_data: AppointmentCreate):
             appointment_data.user_timezone
         )
         
-        # Check for overlapping appointments using UTC time
-        # Get all appointments from Realtime Database
-        all_appointments = firebase_db.get('appointments')
-        if all_appointments:
-            for app_id, app_data in all_appointments.items():
-                if (app_data.get('appointment_datetime_utc') == utc_datetime.isoformat() and 
-                    app_data.get('status') in ['pending', 'confirmed']):
-                    raise HTTPException(
-                        status_code=status.HTTP_409_CONFLICT,
-                        detail="This appointment slot is already booked. Please select a different time."
-                    )
-        
         # Create appointment with timezone info
         appointment = Appointment(
             **appointment_data.dict(),
             appointment_datetime_utc=utc_datetime.isoformat()
         )
         
-        # Save to Firebase Realtime Database
-        firebase_db.set(f'appointments/{appointment.id}', appointment.dict())
+        # Atomically claim the UTC slot (conditional write) so concurrent
+        # bookings for the same time cannot both succeed
+        appointment_slot = slot_path(utc_datetime.isoformat())
+        reserved, slot_holder = await firebase_db.reserve(appointment_slot, appointment.id)
+        if not reserved:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This appointment slot is already booked. Please select a different time."
+            )
+        
+        # Save to Firebase Realtime Database, releasing the slot if that fails
+        if not await firebase_db.set(f'appointments/{appointment.id}', appointment.dict()):
+            await release_slot(firebase_db, appointment_slot, appointment.id)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create appointment"
+            )
+        invalidate_availability(utc_datetime.isoformat())
+        await bump_appointments_version()
         
         logger.info(f"Created appointment: {appointment.id} for {appointment.email} on {appointment.appointment_date} at {appointment.appointment_time} {appointment.user_timezone} (UTC: {utc_datetime.isoformat()})")
         return appointment
@@ -509,25 +589,22 @@ async def create_appointment(appointment_data: AppointmentCreate):
         )
 
 @app.get(f"{settings.API_V1_STR}/appointments", response_model=List[Appointment])
-async def get_appointments(limit: int = 100, status_filter: str = None, current_user: str = Depends(verify_token)):
-    """Retrieve appointments (admin endpoint - requires authentication)"""
+async def get_appointments(response: Response, limit: int = 100, status_filter: str = None, cursor: str = None, current_user: str = Depends(verify_token)):
+    """Retrieve appointments (admin endpoint - requires authentication)
+    
+    Most recent first; pass the X-Next-Cursor response header back as cursor
+    to get the next page.
+    """
+    validate_cursor(cursor)
     try:
-        # Get all appointments from Realtime Database
-        all_appointments = firebase_db.get('appointments')
-        
-        appointments = []
-        if all_appointments:
-            for app_id, app_data in all_appointments.items():
-                # Apply status filter if provided
-                if status_filter and app_data.get('status') != status_filter:
-                    continue
-                appointments.append(Appointment(**app_data))
-        
-        # Sort by created_at timestamp (most recent first)
-        appointments.sort(key=lambda x: x.created_at, reverse=True)
-        
-        # Apply limit
-        appointments = appointments[:limit]
+        # Fetch only this page from Realtime Database (by created_at, most recent first)
+        page, next_cursor = await fetch_page(
+            firebase_db, 'appointments', 'created_at', limit, cursor=cursor,
+            predicate=(lambda app_data: app_data.get('status') == status_filter) if status_filter else None
+        )
+        appointments = [Appointment(**app_data) for app_data in page]
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         logger.info(f"Retrieved {len(appointments)} appointments")
         return appointments
@@ -551,7 +628,7 @@ async def update_appointment_status(appointment_id: str, status_update: dict, cu
             )
         
         # Check if appointment exists
-        appointment_data = firebase_db.get(f'appointments/{appointment_id}')
+        appointment_data = await firebase_db.get(f'appointments/{appointment_id}')
         
         if not appointment_data:
             raise HTTPException(
@@ -559,8 +636,37 @@ async def update_appointment_status(appointment_id: str, status_update: dict, cu
                 detail="Appointment not found"
             )
         
+        # Keep the slot index in sync: only pending/confirmed appointments hold a slot
+        appointment_slot = None
+        if appointment_data.get('appointment_datetime_utc'):
+            appointment_slot = slot_path(appointment_data['appointment_datetime_utc'])
+        
+        # A slot claimed here (rather than already held) is given back if the update fails
+        claimed_slot = False
+        if appointment_slot and new_status in ACTIVE_STATUSES:
+            reserved, slot_holder = await firebase_db.reserve(appointment_slot, appointment_id)
+            if not reserved:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="This appointment slot is already booked by another appointment."
+                )
+            claimed_slot = appointment_data.get('status') not in ACTIVE_STATUSES
+        
         # Update status
-        firebase_db.update(f'appointments/{appointment_id}', {'status': new_status})
+        if not await firebase_db.update(f'appointments/{appointment_id}', {'status': new_status}):
+            if claimed_slot:
+                await release_slot(firebase_db, appointment_slot, appointment_id)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to update appointment status"
+            )
+        
+        if appointment_slot and new_status not in ACTIVE_STATUSES:
+            await release_slot(firebase_db, appointment_slot, appointment_id)
+        
+        if appointment_slot:
+            invalidate_availability(appointment_data['appointment_datetime_utc'])
+        await bump_appointments_version()
         
         logger.info(f"Updated appointment {appointment_id} status to {new_status}")
         return {"success": True, "message": "Appointment status updated successfully"}
@@ -575,38 +681,43 @@ async def update_appointment_status(appointment_id: str, status_update: dict, cu
         )
 
 @app.get(f"{settings.API_V1_STR}/appointments/availability")
-async def check_availability(date: str, timezone: str = "UTC"):
+async def check_availability(request: Request, date: str, timezone: str = "UTC"):
     """Check appointment availability for a specific date in user's timezone (public endpoint)"""
+    # Only the UTC day partitions of the slot index that overlap the local date
     try:
-        # Get all appointments
-        all_appointments = firebase_db.get_collection('appointments')\
-            .where('status', 'in', ['pending', 'confirmed'])\
-            .get()
-        
-        # Filter appointments for the requested date in the user's timezone
-        booked_times = []
-        for doc in all_appointments:
-            appointment_data = doc.to_dict()
-            
-            # Convert UTC datetime to user's timezone
-            utc_datetime_str = appointment_data.get('appointment_datetime_utc')
-            if utc_datetime_str:
-                local_date, local_time = convert_utc_to_local(utc_datetime_str, timezone)
-                
-                # Check if this appointment is on the requested date in user's timezone
-                if local_date == date:
-                    booked_times.append(local_time)
-            else:
-                # Fallback for old appointments without UTC time
-                if appointment_data.get('appointment_date') == date:
-                    booked_times.append(appointment_data.get('appointment_time'))
+        utc_days = utc_days_for_local_date(date, timezone)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid timezone or date format: {str(e)}"
+        )
+    
+    async def load_availability() -> tuple:
+        partitions = await asyncio.gather(
+            *(firebase_db.get(f'{SLOT_INDEX_ROOT}/{day}') for day in utc_days)
+        )
         
-        return {
+        # Convert all booked UTC slots to the user's timezone in one batch
+        slot_datetimes = [
+            slot_datetime(day, time_key)
+            for day, slots in zip(utc_days, partitions)
+            for time_key in (slots or {})
+        ]
+        booked_times = [
+            local_time for local_date, local_time in utc_to_local_batch(slot_datetimes, timezone)
+            if local_date == date
+        ]
+        
+        return render_cacheable_json({
             "date": date,
             "timezone": timezone,
             "booked_times": sorted(list(set(booked_times))),  # Remove duplicates and sort
             "message": f"Found {len(booked_times)} booked appointments for this date"
-        }
+        })
+    
+    try:
+        body, etag = await availability_cache.get_or_load((date, timezone), load_availability, tags=utc_days)
+        return conditional_json_response(request, body, etag, settings.AVAILABILITY_CACHE_CONTROL)
         
     except Exception as e:
         logger.error(f"Failed to check availability: {e}")
@@ -615,129 +726,107 @@ async def check_availability(date: str, timezone: str = "UTC"):
             detail="Failed to check availability"
         )
 
+@app.post(f"{settings.API_V1_STR}/admin/appointments/import")
+async def import_appointments(request: Request, format: str = None, dry_run: bool = False, current_user: str = Depends(verify_token)):
+    """Bulk import appointments from an NDJSON or CSV upload (admin endpoint)
+    
+    The body is read as it arrives and every row is validated like a public
+    booking; accepted rows are written in batches while the upload streams.
+    The response reports counts and the rejected rows (first
+    MAX_REPORTED_ERRORS). dry_run validates without writing.
+    """
+    import_format = (format or '').lower()
+    if not import_format:
+        content_type = request.headers.get('content-type', '')
+        import_format = 'csv' if 'csv' in content_type else 'ndjson'
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported import format. Use one of: {', '.join(IMPORT_FORMATS)}"
+        )
+    
+    importer = AppointmentImporter(firebase_db, dry_run=dry_run)
+    errors = []
+    try:
+        async for event in importer.run(request.stream(), import_format):
+            if 'summary' in event:
+                result = event
+            elif len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(event)
+    except Exception as e:
+        logger.error(f"Appointment import failed: {e}")
+        result = importer.summary(error="Import failed")
+    finally:
+        for day in importer.touched_days:
+            availability_cache.invalidate_tag(day)
+        if importer.touched_days and not dry_run:
+            await bump_appointments_version()
+    
+    result.pop('summary', None)
+    result['errors'] = errors
+    result['errors_truncated'] = importer.failed > len(errors)
+    return result
+
 # Export Endpoints
+# Token rewritten after every appointment write; exports are cached per token,
+# so anything else that edits appointments must bump it too
+APPOINTMENTS_VERSION_PATH = 'data_versions/appointments'
+
+async def bump_appointments_version():
+    """Mark the appointments as changed (invalidates cached exports)"""
+    if not await firebase_db.set(APPOINTMENTS_VERSION_PATH, secrets.token_hex(16)):
+        logger.warning("Failed to update the appointments data version")
+
+async def appointments_version() -> Optional[str]:
+    """Current appointments data version, created on first use"""
+    version = await firebase_db.get(APPOINTMENTS_VERSION_PATH)
+    if not version:
+        version = secrets.token_hex(16)
+        if not await firebase_db.set(APPOINTMENTS_VERSION_PATH, version):
+            return None
+    return version
+
+async def appointment_records(status_filter: Optional[str] = None):
+    """Raw appointment records newest first, read page by page"""
+    async for app_data in iter_newest(firebase_db, 'appointments', 'created_at'):
+        if status_filter and app_data.get('status') != status_filter:
+            continue
+        yield app_data
+
+export_jobs = ExportJobManager(appointment_records, data_marker=appointments_version)
+
+EXPORT_FILENAMES = {'pdf': 'appointments_report', 'excel': 'appointments_export'}
+
+def export_file_response(fmt: str, path: str) -> StreamingResponse:
+    """Stream a cached export artifact in chunks
+    
+    The artifact is opened here, so evicting it for newer data while the
+    download runs does not cut the response short. Raises FileNotFoundError
+    when it was already evicted.
+    """
+    extension, media_type = EXPORT_FORMATS[fmt]
+    filename = f"{EXPORT_FILENAMES[fmt]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+    f = open(path, 'rb')
+    return StreamingResponse(
+        iter_file(f),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(os.fstat(f.fileno()).st_size)
+        }
+    )
+
 @app.get(f"{settings.API_V1_STR}/admin/export/pdf")
 async def export_appointments_pdf(status_filter: str = None, current_user: str = Depends(verify_token)):
-    """Export appointments to PDF (admin endpoint)"""
+    """Export appointments to PDF (admin endpoint)
+    
+    Rendered in an export worker process, or served from the artifact cache
+    when the appointments have not changed. Large exports should use the
+    export jobs endpoints instead of waiting on this request.
+    """
     try:
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-        from io import BytesIO
-        from fastapi.responses import StreamingResponse
-        
-        # Get appointments
-        query = firebase_db.get_collection('appointments').order_by('created_at', direction='DESCENDING')
-        if status_filter:
-            query = query.where('status', '==', status_filter)
-        
-        docs = query.get()
-        appointments = []
-        for doc in docs:
-            data = doc.to_dict()
-            appointments.append(Appointment(**data))
-        
-        # Create PDF
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        
-        # Title style
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#00FFD1')
-        )
-        
-        # Build content
-        story = []
-        
-        # Title
-        title_text = "Lead G - Appointments Report"
-        if status_filter:
-            title_text += f" ({status_filter.capitalize()})"
-        story.append(Paragraph(title_text, title_style))
-        
-        # Date
-        story.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Summary
-        total = len(appointments)
-        summary_data = [
-            ['Status', 'Count'],
-            ['Total', str(total)],
-            ['Pending', str(len([a for a in appointments if a.status == 'pending']))],
-            ['Confirmed', str(len([a for a in appointments if a.status == 'confirmed']))],
-            ['Completed', str(len([a for a in appointments if a.status == 'completed']))],
-            ['Cancelled', str(len([a for a in appointments if a.status == 'cancelled']))]
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[2*inch, 1*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#00FFD1')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(summary_table)
-        story.append(Spacer(1, 30))
-        
-        # Appointments table
-        if appointments:
-            story.append(Paragraph("Appointment Details", styles['Heading2']))
-            story.append(Spacer(1, 12))
-            
-            # Table data
-            table_data = [['Name', 'Email', 'Phone', 'Business', 'Date', 'Time', 'Status']]
-            
-            for appointment in appointments:
-                table_data.append([
-                    appointment.name,
-                    appointment.email,
-                    appointment.phone,
-                    appointment.business or 'N/A',
-                    appointment.appointment_date,
-                    appointment.appointment_time,
-                    appointment.status.capitalize()
-                ])
-            
-            appointments_table = Table(table_data, colWidths=[1.2*inch, 1.5*inch, 1*inch, 1.2*inch, 0.8*inch, 0.6*inch, 0.7*inch])
-            appointments_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#333333')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            story.append(appointments_table)
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        filename = f"appointments_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        
-        return StreamingResponse(
-            BytesIO(buffer.read()),
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        path, _ = await export_jobs.build_artifact('pdf', status_filter)
+        return export_file_response('pdf', path)
         
     except Exception as e:
         logger.error(f"Failed to export PDF: {e}")
@@ -748,121 +837,14 @@ async def export_appointments_pdf(status_filter: str = None, current_user: str =
 
 @app.get(f"{settings.API_V1_STR}/admin/export/excel")
 async def export_appointments_excel(status_filter: str = None, current_user: str = Depends(verify_token)):
-    """Export appointments to Excel (admin endpoint)"""
+    """Export appointments to Excel (admin endpoint)
+    
+    Rendered in an export worker process, or served from the artifact cache
+    when the appointments have not changed.
+    """
     try:
-        import xlsxwriter
-        from io import BytesIO
-        from fastapi.responses import StreamingResponse
-        
-        # Get appointments
-        query = firebase_db.get_collection('appointments').order_by('created_at', direction='DESCENDING')
-        if status_filter:
-            query = query.where('status', '==', status_filter)
-        
-        docs = query.get()
-        appointments = []
-        for doc in docs:
-            data = doc.to_dict()
-            appointments.append(Appointment(**data))
-        
-        # Create Excel file
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        
-        # Create formats
-        header_format = workbook.add_format({
-            'bold': True,
-            'font_color': 'white',
-            'bg_color': '#00FFD1',
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-        
-        cell_format = workbook.add_format({
-            'border': 1,
-            'align': 'left',
-            'valign': 'vcenter'
-        })
-        
-        status_formats = {
-            'pending': workbook.add_format({'bg_color': '#FFF2CC', 'border': 1, 'align': 'center'}),
-            'confirmed': workbook.add_format({'bg_color': '#D5E8D4', 'border': 1, 'align': 'center'}),
-            'completed': workbook.add_format({'bg_color': '#DAE8FC', 'border': 1, 'align': 'center'}),
-            'cancelled': workbook.add_format({'bg_color': '#F8CECC', 'border': 1, 'align': 'center'})
-        }
-        
-        # Summary worksheet  
-        summary_sheet = workbook.add_worksheet('Summary')
-        summary_sheet.write('A1', 'Lead G - Appointments Summary', header_format)
-        summary_sheet.merge_range('A1:G1', 'Lead G - Appointments Summary', header_format)
-        
-        summary_sheet.write('A3', 'Total Appointments:', cell_format)
-        summary_sheet.write('B3', len(appointments), cell_format)
-        
-        summary_sheet.write('A4', 'Pending:', cell_format)
-        summary_sheet.write('B4', len([a for a in appointments if a.status == 'pending']), cell_format)
-        
-        summary_sheet.write('A5', 'Confirmed:', cell_format)
-        summary_sheet.write('B5', len([a for a in appointments if a.status == 'confirmed']), cell_format)
-        
-        summary_sheet.write('A6', 'Completed:', cell_format)
-        summary_sheet.write('B6', len([a for a in appointments if a.status == 'completed']), cell_format)
-        
-        summary_sheet.write('A7', 'Cancelled:', cell_format)
-        summary_sheet.write('B7', len([a for a in appointments if a.status == 'cancelled']), cell_format)
-        
-        summary_sheet.write('A9', f'Generated on: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}', cell_format)
-        
-        # Appointments worksheet
-        appointments_sheet = workbook.add_worksheet('Appointments')
-        
-        # Headers
-        headers = ['ID', 'Name', 'Email', 'Phone', 'Business', 'Industry', 'Service Interests', 
-                  'Appointment Date', 'Appointment Time', 'Status', 'Message', 'Created At']
-        
-        for col, header in enumerate(headers):
-            appointments_sheet.write(0, col, header, header_format)
-        
-        # Data rows
-        for row, appointment in enumerate(appointments, 1):
-            appointments_sheet.write(row, 0, appointment.id, cell_format)
-            appointments_sheet.write(row, 1, appointment.name, cell_format)
-            appointments_sheet.write(row, 2, appointment.email, cell_format)
-            appointments_sheet.write(row, 3, appointment.phone, cell_format)
-            appointments_sheet.write(row, 4, appointment.business or '', cell_format)
-            appointments_sheet.write(row, 5, appointment.industry or '', cell_format)
-            appointments_sheet.write(row, 6, appointment.service_interests or '', cell_format)
-            appointments_sheet.write(row, 7, appointment.appointment_date, cell_format)
-            appointments_sheet.write(row, 8, appointment.appointment_time, cell_format)
-            appointments_sheet.write(row, 9, appointment.status.capitalize(), status_formats.get(appointment.status, cell_format))
-            appointments_sheet.write(row, 10, appointment.message or '', cell_format)
-            appointments_sheet.write(row, 11, appointment.created_at.strftime('%Y-%m-%d %H:%M:%S'), cell_format)
-        
-        # Adjust column widths
-        appointments_sheet.set_column('A:A', 20)  # ID
-        appointments_sheet.set_column('B:B', 20)  # Name
-        appointments_sheet.set_column('C:C', 25)  # Email
-        appointments_sheet.set_column('D:D', 15)  # Phone
-        appointments_sheet.set_column('E:E', 20)  # Business
-        appointments_sheet.set_column('F:F', 15)  # Industry
-        appointments_sheet.set_column('G:G', 20)  # Service Interests
-        appointments_sheet.set_column('H:H', 15)  # Date
-        appointments_sheet.set_column('I:I', 12)  # Time
-        appointments_sheet.set_column('J:J', 12)  # Status
-        appointments_sheet.set_column('K:K', 30)  # Message
-        appointments_sheet.set_column('L:L', 20)  # Created At
-        
-        workbook.close()
-        output.seek(0)
-        
-        filename = f"appointments_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
-        return StreamingResponse(
-            BytesIO(output.read()),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        path, _ = await export_jobs.build_artifact('excel', status_filter)
+        return export_file_response('excel', path)
         
     except Exception as e:
         logger.error(f"Failed to export Excel: {e}")
@@ -871,38 +853,194 @@ async def export_appointments_excel(status_filter: str = None, current_user: str
             detail="Failed to export Excel"
         )
 
+@app.post(f"{settings.API_V1_STR}/admin/export/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(job_request: ExportJobCreate, current_user: str = Depends(verify_token)):
+    """Queue an export (admin endpoint); poll the job, then download it"""
+    if job_request.format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    if job_request.status_filter and job_request.status_filter not in APPOINTMENT_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid status filter. Must be one of: {', '.join(APPOINTMENT_STATUSES)}"
+        )
+    
+    job = export_jobs.submit(job_request.format, job_request.status_filter)
+    return job.to_dict()
+
+@app.get(settings.API_V1_STR + "/admin/export/jobs/{job_id}")
+async def get_export_job(job_id: str, current_user: str = Depends(verify_token)):
+    """Status of an export job (admin endpoint)"""
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export job not found"
+        )
+    return job.to_dict()
+
+@app.get(settings.API_V1_STR + "/admin/export/jobs/{job_id}/download")
+async def download_export_job(job_id: str, current_user: str = Depends(verify_token)):
+    """Download the file of a finished export job (admin endpoint)"""
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export job not found"
+        )
+    if job.state != 'done':
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export job is {job.state}"
+        )
+    try:
+        return export_file_response(job.format, job.path)
+    except FileNotFoundError:
+        # Replaced by a newer data version since the job finished
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Export file has expired; start a new export"
+        )
+
+async def collection_records(collection: str, status_filter: Optional[str] = None):
+    """Raw records of an exportable collection, read page by page"""
+    async for _, record in iter_collection(firebase_db, collection):
+        if status_filter and record.get('status') != status_filter:
+            continue
+        yield record
+
+def row_export_response(fmt: str, collection: str, status_filter: Optional[str]) -> StreamingResponse:
+    """Stream a collection as CSV or NDJSON straight from paged database reads"""
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported collection. Use one of: {', '.join(EXPORT_COLLECTIONS)}"
+        )
+    
+    records = collection_records(collection, status_filter)
+    
+    async def body():
+        encoded = encode_csv(records, EXPORT_COLLECTIONS[collection]) if fmt == 'csv' else encode_ndjson(records)
+        try:
+            async for chunk in encoded:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated download
+            logger.error(f"Failed to stream {fmt} export of {collection}: {e}")
+            raise
+    
+    filename = f"{collection}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return StreamingResponse(
+        body(),
+        media_type=ROW_EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@app.get(f"{settings.API_V1_STR}/admin/export/csv")
+async def export_csv(collection: str = 'appointments', status_filter: str = None, current_user: str = Depends(verify_token)):
+    """Export appointments or contact forms as CSV (admin endpoint)"""
+    return row_export_response('csv', collection, status_filter)
+
+@app.get(f"{settings.API_V1_STR}/admin/export/ndjson")
+async def export_ndjson(collection: str = 'appointments', status_filter: str = None, current_user: str = Depends(verify_token)):
+    """Export appointments or contact forms as newline-delimited JSON (admin endpoint)"""
+    return row_export_response('ndjson', collection, status_filter)
+
+async def columnar_export_response(fmt: str, collection: str, status_filter: Optional[str]) -> StreamingResponse:
+    """Build a typed frame of a collection and stream it as Parquet or Arrow"""
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported collection. Use one of: {', '.join(EXPORT_COLLECTIONS)}"
+        )
+    
+    extension, media_type = COLUMNAR_FORMATS[fmt]
+    try:
+        columns = await collect_columns(collection_records(collection, status_filter), EXPORT_COLLECTIONS[collection])
+        path = temp_export_path(extension)
+        try:
+            await asyncio.to_thread(write_columnar, columns, collection, path, fmt)
+        except Exception:
+            remove_file(path)
+            raise
+    except ImportError as e:
+        logger.error(f"{fmt} export unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"{fmt} export requires pyarrow to be installed"
+        )
+    except Exception as e:
+        logger.error(f"Failed to export {collection} as {fmt}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to export {fmt}"
+        )
+    
+    filename = f"{collection}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+    f = open(path, 'rb')
+    return StreamingResponse(
+        iter_file(f),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(os.fstat(f.fileno()).st_size)
+        },
+        background=BackgroundTask(remove_file, path)
+    )
+
+@app.get(f"{settings.API_V1_STR}/admin/export/parquet")
+async def export_parquet(collection: str = 'appointments', status_filter: str = None, current_user: str = Depends(verify_token)):
+    """Export appointments or contact forms as a typed Parquet file (admin endpoint)"""
+    return await columnar_export_response('parquet', collection, status_filter)
+
+@app.get(f"{settings.API_V1_STR}/admin/export/arrow")
+async def export_arrow(collection: str = 'appointments', status_filter: str = None, current_user: str = Depends(verify_token)):
+    """Export appointments or contact forms as an Arrow IPC / Feather file (admin endpoint)"""
+    return await columnar_export_response('arrow', collection, status_filter)
+
+logo_storage = get_logo_storage(firebase_db)
+
+def public_base_url(request: Request) -> str:
+    """Base URL for links to files served by this API"""
+    return settings.PUBLIC_BASE_URL or str(request.base_url)
+
 # Testimonials Endpoints
 
 @app.post(f"{settings.API_V1_STR}/testimonials/upload-logo")
-async def upload_testimonial_logo(file: UploadFile = File(...), current_user: str = Depends(verify_token)):
-    """Upload a testimonial company logo to ImgBB (admin endpoint)"""
+async def upload_testimonial_logo(request: Request, file: UploadFile = File(...), current_user: str = Depends(verify_token)):
+    """Upload a testimonial company logo (admin endpoint)"""
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Validate the image file
-        validation_error = validate_image_file(file_content, file.content_type, max_size_mb=5)
+        # Validate the image by its content: size from the upload spool, format
+        # and dimensions from the header bytes
+        image_info, validation_error = inspect_image(file.file, file.content_type, max_size_mb=settings.MAX_LOGO_SIZE_MB)
         if validation_error:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=validation_error
             )
         
-        # Upload to ImgBB
-        result = upload_to_imgbb(file_content, file.filename)
+        # Store via LOGO_STORAGE: ImgBB (streamed from the spool, deduplicated
+        # by content hash) or resized variants on local disk
+        result = await logo_storage.save(file.file, file.filename, image_info.content_type, base_url=public_base_url(request))
         
         if result["success"]:
-            logger.info(f"✅ Testimonial logo uploaded to ImgBB: {file.filename}")
+            logger.info(f"✅ Testimonial logo stored ({logo_storage.name}): {file.filename}")
             return {
                 "success": True,
                 "logo_url": result["url"],
                 "display_url": result.get("display_url", result["url"]),
-                "filename": file.filename
+                "variants": result.get("variants"),
+                "width": image_info.width,
+                "height": image_info.height,
+                "filename": file.filename,
+                "cached": result.get("cached", False)
             }
         else:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=result.get("error", "Failed to upload logo to ImgBB")
+                detail=result.get("error", "Failed to store logo")
             )
         
     except HTTPException:
@@ -921,7 +1059,8 @@ async def create_testimonial(testimonial_data: TestimonialCreate, current_user:
         testimonial = Testimonial(**testimonial_data.dict())
         
         # Save to Firebase Realtime Database
-        firebase_db.set(f'testimonials/{testimonial.id}', testimonial.dict())
+        await firebase_db.set(f'testimonials/{testimonial.id}', testimonial.dict())
+        public_list_cache.invalidate_tag('testimonials')
         
         logger.info(f"Created testimonial: {testimonial.id} for {testimonial.company_name}")
         return testimonial
@@ -934,11 +1073,13 @@ async def create_testimonial(testimonial_data: TestimonialCreate, current_user:
         )
 
 @app.get(f"{settings.API_V1_STR}/testimonials", response_model=List[Testimonial])
-async def get_testimonials(limit: int = 100):
+async def get_testimonials(request: Request, limit: int = 100):
     """Retrieve all testimonials (public endpoint)"""
-    try:
-        # Get all testimonials from Realtime Database
-        all_testimonials = firebase_db.get('testimonials')
+    async def load_testimonials() -> tuple:
+        # Only the latest `limit` testimonials are downloaded from Realtime Database
+        query = firebase_db.ref('testimonials').order_by_child('created_at').limit_to_last(limit)
+        
+        all_testimonials = await fetch_query(firebase_db, query)
         
         testimonials = []
         if all_testimonials:
@@ -952,7 +1093,12 @@ async def get_testimonials(limit: int = 100):
         testimonials = testimonials[:limit]
         
         logger.info(f"Retrieved {len(testimonials)} testimonials")
-        return testimonials
+        return render_cacheable_json(testimonials)
+    
+    try:
+        # Cache hits skip Firebase, model validation and sorting
+        body, etag = await public_list_cache.get_or_load(('testimonials', limit), load_testimonials, tags=('testimonials',))
+        return conditional_json_response(request, body, etag, settings.TESTIMONIALS_CACHE_CONTROL)
         
     except Exception as e:
         logger.error(f"Failed to retrieve testimonials: {e}")
@@ -966,7 +1112,7 @@ async def update_testimonial(testimonial_id: str, testimonial_data: TestimonialC
     """Update a testimonial (admin endpoint)"""
     try:
         # Check if testimonial exists
-        existing_data = firebase_db.get(f'testimonials/{testimonial_id}')
+        existing_data = await firebase_db.get(f'testimonials/{testimonial_id}')
         
         if not existing_data:
             raise HTTPException(
@@ -981,7 +1127,8 @@ async def update_testimonial(testimonial_id: str, testimonial_data: TestimonialC
             **testimonial_data.dict()
         )
         
-        firebase_db.update(f'testimonials/{testimonial_id}', updated_testimonial.dict())
+        await firebase_db.update(f'testimonials/{testimonial_id}', updated_testimonial.dict())
+        public_list_cache.invalidate_tag('testimonials')
         
         logger.info(f"Updated testimonial: {testimonial_id}")
         return updated_testimonial
@@ -1000,7 +1147,7 @@ async def delete_testimonial(testimonial_id: str, current_user: str = Depends(ve
     """Delete a testimonial (admin endpoint)"""
     try:
         # Check if testimonial exists
-        existing_data = firebase_db.get(f'testimonials/{testimonial_id}')
+        existing_data = await firebase_db.get(f'testimonials/{testimonial_id}')
         
         if not existing_data:
             raise HTTPException(
@@ -1008,7 +1155,8 @@ async def delete_testimonial(testimonial_id: str, current_user: str = Depends(ve
                 detail="Testimonial not found"
             )
         
-        firebase_db.delete(f'testimonials/{testimonial_id}')
+        await firebase_db.delete(f'testimonials/{testimonial_id}')
+        public_list_cache.invalidate_tag('testimonials')
         
         logger.info(f"Deleted testimonial: {testimonial_id}")
         return {
@@ -1029,35 +1177,38 @@ async def delete_testimonial(testimonial_id: str, current_user: str = Depends(ve
 
 
 @app.post(f"{settings.API_V1_STR}/worked-with/upload-logo")
-async def upload_worked_with_logo(file: UploadFile = File(...), current_user: str = Depends(verify_token)):
-    """Upload a worked with company logo to ImgBB (admin endpoint)"""
+async def upload_worked_with_logo(request: Request, file: UploadFile = File(...), current_user: str = Depends(verify_token)):
+    """Upload a worked with company logo (admin endpoint)"""
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Validate the image file
-        validation_error = validate_image_file(file_content, file.content_type, max_size_mb=5)
+        # Validate the image by its content: size from the upload spool, format
+        # and dimensions from the header bytes
+        image_info, validation_error = inspect_image(file.file, file.content_type, max_size_mb=settings.MAX_LOGO_SIZE_MB)
         if validation_error:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=validation_error
             )
         
-        # Upload to ImgBB
-        result = upload_to_imgbb(file_content, file.filename)
+        # Store via LOGO_STORAGE: ImgBB (streamed from the spool, deduplicated
+        # by content hash) or resized variants on local disk
+        result = await logo_storage.save(file.file, file.filename, image_info.content_type, base_url=public_base_url(request))
         
         if result["success"]:
-            logger.info(f"✅ Worked with company logo uploaded to ImgBB: {file.filename}")
+            logger.info(f"✅ Worked with company logo stored ({logo_storage.name}): {file.filename}")
             return {
                 "success": True,
                 "logo_url": result["url"],
                 "display_url": result.get("display_url", result["url"]),
-                "filename": file.filename
+                "variants": result.get("variants"),
+                "width": image_info.width,
+                "height": image_info.height,
+                "filename": file.filename,
+                "cached": result.get("cached", False)
             }
         else:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=result.get("error", "Failed to upload logo to ImgBB")
+                detail=result.get("error", "Failed to store logo")
             )
         
     except HTTPException:
@@ -1076,7 +1227,8 @@ async def create_worked_with_company(company_data: WorkedWithCompanyCreate, curr
         company = WorkedWithCompany(**company_data.dict())
         
         # Save to Firebase Realtime Database
-        firebase_db.set(f'worked_with_companies/{company.id}', company.dict())
+        await firebase_db.set(f'worked_with_companies/{company.id}', company.dict())
+        public_list_cache.invalidate_tag('worked_with_companies')
         
         logger.info(f"Created worked with company: {company.id} for {company.company_name}")
         return company
@@ -1088,12 +1240,36 @@ async def create_worked_with_company(company_data: WorkedWithCompanyCreate, curr
             detail="Failed to create worked with company"
         )
 
+@app.post(f"{settings.API_V1_STR}/worked-with/bulk", response_model=List[WorkedWithCompany])
+async def create_worked_with_companies_bulk(companies_data: List[WorkedWithCompanyCreate], current_user: str = Depends(verify_token)):
+    """Create many worked with companies in one batch write (admin endpoint)"""
+    try:
+        companies = [WorkedWithCompany(**company_data.dict()) for company_data in companies_data]
+        
+        batch = firebase_db.batch()
+        for company in companies:
+            batch.set(f'worked_with_companies/{company.id}', company.dict())
+        
+        if companies and not await batch.commit():
+            raise Exception("multi-location update failed")
+        public_list_cache.invalidate_tag('worked_with_companies')
+        
+        logger.info(f"Created {len(companies)} worked with companies in one batch")
+        return companies
+        
+    except Exception as e:
+        logger.error(f"Failed to create worked with companies: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create worked with companies"
+        )
+
 @app.get(f"{settings.API_V1_STR}/worked-with", response_model=List[WorkedWithCompany])
-async def get_worked_with_companies(limit: int = 100):
+async def get_worked_with_companies(request: Request, limit: int = 100):
     """Retrieve all worked with companies (public endpoint)"""
-    try:
+    async def load_companies() -> tuple:
         # Get all worked with companies from Realtime Database
-        all_companies = firebase_db.get('worked_with_companies')
+        all_companies = await firebase_db.get('worked_with_companies')
         
         companies = []
         if all_companies:
@@ -1107,7 +1283,12 @@ async def get_worked_with_companies(limit: int = 100):
         companies = companies[:limit]
         
         logger.info(f"Retrieved {len(companies)} worked with companies")
-        return companies
+        return render_cacheable_json(companies)
+    
+    try:
+        # Cache hits skip Firebase, model validation and sorting
+        body, etag = await public_list_cache.get_or_load(('worked_with_companies', limit), load_companies, tags=('worked_with_companies',))
+        return conditional_json_response(request, body, etag, settings.WORKED_WITH_CACHE_CONTROL)
         
     except Exception as e:
         logger.error(f"Failed to retrieve worked with companies: {e}")
@@ -1121,7 +1302,7 @@ async def update_worked_with_company(company_id: str, company_data: WorkedWithCo
     """Update a worked with company (admin endpoint)"""
     try:
         # Check if company exists
-        existing_data = firebase_db.get(f'worked_with_companies/{company_id}')
+        existing_data = await firebase_db.get(f'worked_with_companies/{company_id}')
         
         if not existing_data:
             raise HTTPException(
@@ -1136,7 +1317,8 @@ async def update_worked_with_company(company_id: str, company_data: WorkedWithCo
             **company_data.dict()
         )
         
-        firebase_db.update(f'worked_with_companies/{company_id}', updated_company.dict())
+        await firebase_db.update(f'worked_with_companies/{company_id}', updated_company.dict())
+        public_list_cache.invalidate_tag('worked_with_companies')
         
         logger.info(f"Updated worked with company: {company_id}")
         return updated_company
@@ -1155,7 +1337,7 @@ async def delete_worked_with_company(company_id: str, current_user: str = Depend
     """Delete a worked with company (admin endpoint)"""
     try:
         # Check if company exists
-        existing_data = firebase_db.get(f'worked_with_companies/{company_id}')
+        existing_data = await firebase_db.get(f'worked_with_companies/{company_id}')
         
         if not existing_data:
             raise HTTPException(
@@ -1163,7 +1345,8 @@ async def delete_worked_with_company(company_id: str, current_user: str = Depend
                 detail="Worked with company not found"
             )
         
-        firebase_db.delete(f'worked_with_companies/{company_id}')
+        await firebase_db.delete(f'worked_with_companies/{company_id}')
+        public_list_cache.invalidate_tag('worked_with_companies')
         
         logger.info(f"Deleted worked with company: {company_id}")
         return {
@@ -1233,20 +1416,26 @@ async def seed_database_data(current_user: str = Depends(verify_token)):
             {"company_name": "IBM", "logo_url": "https://upload.wikimedia.org/wikipedia/commons/5/51/IBM_logo.svg", "website_url": "https://www.ibm.com", "display_order": 10}
         ]
         
-        # Seed testimonials
+        # Seed testimonials and companies in one multi-location update
+        batch = firebase_db.batch()
         testimonials_added = 0
         for testimonial_data in demo_testimonials:
             testimonial = Testimonial(**testimonial_data)
-            firebase_db.set(f'testimonials/{testimonial.id}', testimonial.dict())
+            batch.set(f'testimonials/{testimonial.id}', testimonial.dict())
             testimonials_added += 1
         
-        # Seed companies
         companies_added = 0
         for company_data in demo_companies:
             company = WorkedWithCompany(**company_data)
-            firebase_db.set(f'worked_with_companies/{company.id}', company.dict())
+            batch.set(f'worked_with_companies/{company.id}', company.dict())
             companies_added += 1
         
+        if not await batch.commit():
+            raise Exception("multi-location update failed")
+        
+        public_list_cache.invalidate_tag('testimonials')
+        public_list_cache.invalidate_tag('worked_with_companies')
+        
         logger.info(f"Seeded {testimonials_added} testimonials and {companies_added} companies")
         
         return {
@@ -1294,6 +1483,16 @@ async def startup_event():
     logger.info(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     logger.info(f"Debug mode: {settings.DEBUG}")
+    # Only the serving process owns the mock's write-ahead log, not export workers
+    if hasattr(firebase_db, 'open_persistence'):
+        await firebase_db.open_persistence()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled connections and export workers on shutdown"""
+    export_jobs.shutdown()
+    await imgbb_client.aclose()
+    await firebase_db.aclose()
 
 if __name__ == "__main__":
     import uvicorn
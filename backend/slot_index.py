@@ -0,0 +1,106 @@
+"""
+Appointment slot index
+Keeps one entry per booked UTC slot so conflict checks are a single-key lookup
+
+Layout in the Realtime Database:
+    appointment_slots/{YYYY-MM-DD}/{HHMM} -> appointment id
+
+Only active (pending/confirmed) appointments hold a slot. Slots are grouped by
+UTC day so a whole day of bookings can be read with one request; availability
+for a local date only reads the one or two UTC days that overlap it.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple, List
+
+from timezone_utils import local_to_utc
+
+logger = logging.getLogger(__name__)
+
+SLOT_INDEX_ROOT = 'appointment_slots'
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+def slot_key(utc_datetime_str: str) -> Tuple[str, str]:
+    """Return the (UTC day, HHMM) key for an ISO UTC datetime string"""
+    utc_datetime = datetime.fromisoformat(utc_datetime_str.replace('Z', '+00:00'))
+    if utc_datetime.tzinfo is None:
+        utc_datetime = utc_datetime.replace(tzinfo=timezone.utc)
+    else:
+        utc_datetime = utc_datetime.astimezone(timezone.utc)
+    return utc_datetime.strftime('%Y-%m-%d'), utc_datetime.strftime('%H%M')
+
+
+def slot_path(utc_datetime_str: str) -> str:
+    """Database path of the slot entry for an ISO UTC datetime string"""
+    day, time_key = slot_key(utc_datetime_str)
+    return f"{SLOT_INDEX_ROOT}/{day}/{time_key}"
+
+
+def slot_datetime(day: str, time_key: str) -> datetime:
+    """UTC datetime of a slot entry from its (day, HHMM) key"""
+    return datetime.strptime(f"{day} {time_key}", '%Y-%m-%d %H%M').replace(tzinfo=timezone.utc)
+
+
+def is_active(appointment_data: Dict[str, Any]) -> bool:
+    """Whether an appointment should hold its slot"""
+    return appointment_data.get('status') in ACTIVE_STATUSES
+
+
+async def release_slot(db, path: str, holder: str) -> bool:
+    """Free a slot entry only while it still belongs to holder
+
+    Conditional on the ETag read, so a booking that claims the slot in
+    between is never removed. Returns whether the entry was removed.
+    """
+    current, etag = await db.get_with_etag(path)
+    if current != holder or etag is None:
+        return False
+    released, _, _ = await db.set_if_match(path, None, etag)
+    if not released:
+        logger.info(f"Slot {path} changed hands before it could be released")
+    return released
+
+
+def build_slot_index(appointments: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+    """Rebuild the slot index from the raw appointments node
+
+    Returns the index and the ids of active appointments that could not be
+    indexed because an earlier booking already holds the same slot.
+    """
+    index: Dict[str, Dict[str, str]] = {}
+    holders: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    duplicates = []
+
+    # Oldest booking wins when historical data contains double-bookings
+    active = [
+        (app_id, app_data) for app_id, app_data in (appointments or {}).items()
+        if isinstance(app_data, dict) and is_active(app_data)
+    ]
+    active.sort(key=lambda item: str(item[1].get('created_at', '')))
+
+    for app_id, app_data in active:
+        try:
+            key = slot_key(app_data.get('appointment_datetime_utc') or _legacy_utc(app_data))
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Skipping appointment {app_id} with invalid UTC datetime")
+            continue
+
+        if key in holders:
+            duplicates.append(app_id)
+            continue
+
+        holders[key] = app_data
+        day, time_key = key
+        index.setdefault(day, {})[time_key] = app_data.get('id', app_id)
+
+    return index, duplicates
+
+
+def _legacy_utc(appointment_data: Dict[str, Any]) -> str:
+    """UTC ISO string for old appointments stored without appointment_datetime_utc"""
+    return local_to_utc(
+        appointment_data['appointment_date'],
+        appointment_data['appointment_time'],
+        appointment_data.get('user_timezone') or 'UTC'
+    ).isoformat()
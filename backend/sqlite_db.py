@@ -0,0 +1,615 @@
+"""
+SQLite storage with the firebase_db interface
+A single-node alternative to Firebase (DATABASE_BACKEND=sqlite): the same
+get/set/update/delete/push/query/multi_update/ETag methods, backed by one
+SQLite file in WAL mode.
+
+The JSON tree is stored one row per document: the first path segment is the
+collection and the second the document key (appointments/<id>,
+appointment_slots/<day>), and the document is a JSON text. Deeper paths are
+read and written inside the document. Every write (and the read of a
+compare-and-set) runs in a BEGIN IMMEDIATE transaction, so conditional writes
+are atomic across processes sharing the file. Expression indexes on the fields the
+API filters and sorts by (INDEXED_FIELDS) let query() and collection() push
+equality, range, ordering and limits down to SQL.
+
+SQL compares JSON values slightly differently from Firebase: booleans are
+the numbers 0 and 1, and objects compare as their JSON text.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from mock_index import CollectionIndex
+from query_builder import Query
+from write_batch import WriteBatch
+
+logger = logging.getLogger(__name__)
+
+# ETag reported for a location that holds no data (same as Firebase)
+NULL_ETAG = 'null_etag'
+
+# Document fields with an expression index
+INDEXED_FIELDS = ('status', 'created_at', 'appointment_datetime_utc', 'submitted_at')
+
+# Key of the row holding a collection whose value is not an object (Firebase keys are never empty)
+SCALAR_KEY = ''
+
+SQL_OPERATORS = {'==': '=', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+_FIELD_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (collection, key)
+) WITHOUT ROWID;
+"""
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize datetimes the same way the Realtime Database REST client does"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), default=_json_default)
+
+
+def _to_stored(data: Any) -> Any:
+    """Round-trip data through JSON so the database stores what Firebase would store"""
+    return json.loads(_dumps(data))
+
+
+def _etag(value: Any) -> str:
+    """Content hash standing in for the ETag Firebase computes"""
+    if value is None:
+        return NULL_ETAG
+    return hashlib.md5(json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def _parts(path: str) -> List[str]:
+    path = path.strip('/')
+    return path.split('/') if path else []
+
+
+def _field_expr(field: str) -> str:
+    """SQL expression for a document field (spelled exactly like the index expressions)"""
+    if field == '$key':
+        return 'key'
+    if not _FIELD_NAME.match(field):
+        raise ValueError(f"Unsupported field name for SQL queries: {field!r}")
+    return f"json_extract(value, '$.{field}')"
+
+
+def _from_documents(field: Optional[str] = None) -> str:
+    """FROM clause, naming the field's index when it has one
+
+    Without table statistics SQLite prefers scanning the primary key range of
+    the collection over an expression index, so indexed fields are hinted.
+    """
+    if field in INDEXED_FIELDS:
+        return f"FROM documents INDEXED BY idx_documents_{field}"
+    return "FROM documents"
+
+
+def _set_child(node: Any, parts: List[str], value: Any) -> Any:
+    """node with value stored at parts (None deletes); empty objects are pruned like in Firebase"""
+    if not parts:
+        return value
+    node = dict(node) if isinstance(node, dict) else {}
+    child = _set_child(node.get(parts[0]), parts[1:], value)
+    if child is None or child == {}:
+        node.pop(parts[0], None)
+    else:
+        node[parts[0]] = child
+    return node or None
+
+
+class SQLiteRealtimeDB:
+    """firebase_db interface on a SQLite database file"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.SQLITE_DB_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One writer connection; readers get their own per thread (WAL lets them run concurrently)
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._conn = self._connect()
+        with self._transaction() as conn:
+            conn.execute(SCHEMA)
+            for field in INDEXED_FIELDS:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_documents_{field} ON documents (collection, {_field_expr(field)}, key)"
+                )
+        # Add db attribute for compatibility with health check
+        self.db = self
+        logger.info(f"Initialized SQLite database: {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit: transactions are opened explicitly by _transaction()
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction on the writer connection
+
+        BEGIN IMMEDIATE takes the database write lock before the first read,
+        so a read-check-write cannot interleave with another process's write.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute('PRAGMA query_only=ON')
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    def close(self):
+        """Close the connections (the last one checkpoints the WAL)"""
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+            self._conn.close()
+
+    # Tree access
+
+    def _read_row(self, conn: sqlite3.Connection, collection: str, key: str) -> Any:
+        row = conn.execute(
+            'SELECT value FROM documents WHERE collection = ? AND key = ?', (collection, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _read(self, conn: sqlite3.Connection, parts: List[str]) -> Any:
+        """Value at a path"""
+        if not parts:
+            collections = [row[0] for row in conn.execute('SELECT DISTINCT collection FROM documents')]
+            return {name: self._read(conn, [name]) for name in collections} or None
+        if len(parts) == 1:
+            data = {}
+            for key, value in conn.execute('SELECT key, value FROM documents WHERE collection = ?', (parts[0],)):
+                if key == SCALAR_KEY:
+                    return json.loads(value)
+                data[key] = json.loads(value)
+            return data or None
+
+        value = self._read_row(conn, parts[0], parts[1])
+        for part in parts[2:]:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+
+    def _write(self, conn: sqlite3.Connection, parts: List[str], value: Any):
+        """Replace the value at a path (None deletes); value is JSON-compatible"""
+        if not parts:
+            conn.execute('DELETE FROM documents')
+            for name, child in (value or {}).items():
+                self._write(conn, [name], child)
+            return
+
+        collection = parts[0]
+        if len(parts) == 1:
+            conn.execute('DELETE FROM documents WHERE collection = ?', (collection,))
+            if isinstance(value, dict):
+                conn.executemany(
+                    'INSERT INTO documents (collection, key, value) VALUES (?, ?, ?)',
+                    [(collection, key, _dumps(child)) for key, child in value.items() if child is not None and child != {}]
+                )
+            elif value is not None:
+                conn.execute('INSERT INTO documents (collection, key, value) VALUES (?, ?, ?)',
+                             (collection, SCALAR_KEY, _dumps(value)))
+            return
+
+        key = parts[1]
+        if len(parts) > 2:
+            value = _set_child(self._read_row(conn, collection, key), parts[2:], value)
+        if value is None or value == {}:
+            conn.execute('DELETE FROM documents WHERE collection = ? AND key = ?', (collection, key))
+        else:
+            conn.execute('DELETE FROM documents WHERE collection = ? AND key = ?', (collection, SCALAR_KEY))
+            conn.execute('INSERT OR REPLACE INTO documents (collection, key, value) VALUES (?, ?, ?)',
+                         (collection, key, _dumps(value)))
+
+    # firebase_db interface
+
+    def get(self, path: str, query_params: Dict[str, Any] = None, timeout: Any = None) -> Any:
+        """Get data from a path"""
+        try:
+            return self._read(self._reader(), _parts(path))
+        except Exception as e:
+            logger.error(f"SQLite: Error getting data from {path}: {e}")
+            return None
+
+    def set(self, path: str, data: Any, timeout: Any = None) -> bool:
+        """Set data at a path (overwrites; None deletes)"""
+        try:
+            value = _to_stored(data)
+            with self._transaction() as conn:
+                self._write(conn, _parts(path), value)
+            return True
+        except Exception as e:
+            logger.error(f"SQLite: Error setting data at {path}: {e}")
+            return False
+
+    def push(self, path: str, data: Any, timeout: Any = None) -> Optional[str]:
+        """Push data to a path (creates new entry with unique key)"""
+        new_key = uuid.uuid4().hex
+        if self.set(f"{path.strip('/')}/{new_key}", data):
+            return new_key
+        return None
+
+    def update(self, path: str, data: Dict[str, Any], timeout: Any = None) -> bool:
+        """Update data at a path (merges the given children)"""
+        try:
+            parts = _parts(path)
+            value = _to_stored(data)
+            with self._transaction() as conn:
+                for child, child_value in value.items():
+                    self._write(conn, parts + _parts(child), child_value)
+            return True
+        except Exception as e:
+            logger.error(f"SQLite: Error updating data at {path}: {e}")
+            return False
+
+    def delete(self, path: str, timeout: Any = None) -> bool:
+        """Delete data at a path"""
+        return self.set(path, None)
+
+    def query(self, path: str, order_by: str = None, limit_to_first: int = None,
+              limit_to_last: int = None, equal_to: Any = None, start_at: Any = None,
+              end_at: Any = None, timeout: Any = None) -> Any:
+        """Query data with filters (mirrors the Realtime Database REST parameters)
+
+        Ordering by $key or a child of the documents of a collection runs in
+        SQL; other queries are evaluated on the fetched node.
+        """
+        try:
+            parts = _parts(path)
+            if len(parts) != 1 or not order_by or order_by == '$value':
+                return self._query_node(self.get(path), order_by, limit_to_first, limit_to_last,
+                                        equal_to, start_at, end_at)
+
+            expr = _field_expr(order_by)
+            sql = f"SELECT key, value {_from_documents(order_by)} WHERE collection = ? AND key != ?"
+            params: List[Any] = [parts[0], SCALAR_KEY]
+            if equal_to is not None:
+                # Equal values are ordered by key (the index order within one value)
+                sql += f" AND {expr} = ?"
+                params.append(equal_to)
+                order = ['key']
+            else:
+                sql += f" AND {expr} IS NOT NULL"
+                order = [expr, 'key'] if expr != 'key' else ['key']
+            if start_at is not None:
+                sql += f" AND {expr} >= ?"
+                params.append(start_at)
+            if end_at is not None:
+                sql += f" AND {expr} <= ?"
+                params.append(end_at)
+            if limit_to_last:
+                sql += " ORDER BY " + ', '.join(f"{term} DESC" for term in order) + " LIMIT ?"
+                params.append(limit_to_last)
+            else:
+                sql += " ORDER BY " + ', '.join(order)
+                if limit_to_first:
+                    sql += " LIMIT ?"
+                    params.append(limit_to_first)
+
+            rows = self._reader().execute(sql, params).fetchall()
+            if limit_to_last:
+                rows.reverse()
+            return {key: json.loads(value) for key, value in rows}
+        except Exception as e:
+            logger.error(f"SQLite: Error querying data from {path}: {e}")
+            return None
+
+    def _query_node(self, data: Any, order_by: str, limit_to_first: Optional[int], limit_to_last: Optional[int],
+                    equal_to: Any, start_at: Any, end_at: Any) -> Any:
+        """Evaluate a query on a fetched node (nested paths and $value ordering)"""
+        if not isinstance(data, dict):
+            return data
+        if order_by:
+            keys = CollectionIndex().range(order_by, data, equal_to=equal_to, start_at=start_at, end_at=end_at,
+                                           limit_to_first=limit_to_first, limit_to_last=limit_to_last)
+            return {key: data[key] for key in keys}
+        items = list(data.items())
+        if limit_to_first:
+            items = items[:limit_to_first]
+        if limit_to_last:
+            items = items[-limit_to_last:]
+        return dict(items)
+
+    def batch(self, chunk_size: int = None) -> WriteBatch:
+        """Collect writes to commit as multi-location updates (see write_batch)"""
+        return WriteBatch(self, chunk_size)
+
+    def multi_update(self, updates: Dict[str, Any], chunk_size: int = None, timeout: Any = None) -> bool:
+        """Write many non-overlapping paths in one transaction (null deletes)"""
+        try:
+            value = _to_stored(updates)
+            with self._transaction() as conn:
+                for path, path_value in value.items():
+                    self._write(conn, _parts(path), path_value)
+            logger.info(f"SQLite: Wrote {len(updates)} paths in a multi-location update")
+            return True
+        except Exception as e:
+            logger.error(f"SQLite: Error in multi-location update of {len(updates)} paths: {e}")
+            return False
+
+    def ref(self, path: str) -> Query:
+        """Query builder for the data at a path (see query_builder)"""
+        return Query(self, path)
+
+    def get_with_etag(self, path: str, timeout: Any = None) -> Tuple[Any, Optional[str]]:
+        """Get data from a path together with its ETag"""
+        value = self.get(path)
+        return value, _etag(value)
+
+    def set_if_match(self, path: str, data: Any, etag: str, timeout: Any = None) -> Tuple[bool, Any, Optional[str]]:
+        """Compare-and-set: write only if the current ETag matches
+
+        Returns (written, current value, current ETag) like the Firebase client.
+        """
+        parts = _parts(path)
+        value = _to_stored(data)
+        with self._transaction() as conn:
+            current = self._read(conn, parts)
+            current_etag = _etag(current)
+            if etag != current_etag:
+                return False, current, current_etag
+            self._write(conn, parts, value)
+        return True, value, _etag(value)
+
+    def reserve(self, path: str, value: Any, max_retries: int = 3, timeout: Any = None) -> Tuple[bool, Any]:
+        """Atomically claim an empty path (or one that already holds value)"""
+        etag = NULL_ETAG
+        for _ in range(max_retries + 1):
+            written, current, current_etag = self.set_if_match(path, value, etag)
+            if written:
+                return True, value
+            if current is not None and current != value:
+                return False, current
+            if current == value:
+                return True, value
+            etag = current_etag
+        return False, None
+
+    def get_collection(self, collection_name: str) -> Dict[str, Any]:
+        """Get all documents in a collection"""
+        data = self.get(collection_name)
+        if data and isinstance(data, dict):
+            return {
+                'items': [
+                    {**value, 'id': key} for key, value in data.items()
+                ],
+                'raw': data
+            }
+        return {'items': [], 'raw': {}}
+
+    def collection(self, collection_name: str) -> 'SQLiteCollection':
+        """Firestore-style collection reference with queries pushed down to SQL"""
+        return SQLiteCollection(self, collection_name)
+
+
+class SQLiteDoc:
+    """Document returned by collection queries"""
+
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]]):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        """Get document data"""
+        return self._data or {}
+
+
+class SQLiteDocumentRef:
+    """Firestore-style document reference"""
+
+    def __init__(self, db: SQLiteRealtimeDB, collection_name: str, doc_id: str):
+        self._db = db
+        self.path = f"{collection_name}/{doc_id}"
+        self.id = doc_id
+
+    def set(self, data: Dict[str, Any]) -> bool:
+        return self._db.set(self.path, data)
+
+    def update(self, data: Dict[str, Any]) -> bool:
+        return self._db.update(self.path, data)
+
+    def delete(self) -> bool:
+        return self._db.delete(self.path)
+
+    def get(self) -> SQLiteDoc:
+        return SQLiteDoc(self.id, self._db.get(self.path))
+
+
+class SQLiteQuery:
+    """Immutable Firestore-style query compiled to one SQL statement"""
+
+    def __init__(self, db: SQLiteRealtimeDB, collection_name: str, filters: Tuple = (),
+                 order: Optional[Tuple[str, str]] = None, limit_count: Optional[int] = None):
+        self._db = db
+        self.collection_name = collection_name
+        self.filters = filters
+        self.order = order
+        self.limit_count = limit_count
+
+    def where(self, field: str, operator: str, value: Any) -> 'SQLiteQuery':
+        """Add a filter (==, !=, <, <=, >, >= or in)"""
+        if operator not in SQL_OPERATORS and operator != 'in':
+            raise ValueError(f"Unsupported query operator: {operator}")
+        return SQLiteQuery(self._db, self.collection_name, self.filters + ((field, operator, value),),
+                           self.order, self.limit_count)
+
+    def order_by(self, field: str, direction: str = 'ASCENDING') -> 'SQLiteQuery':
+        """Order by a field"""
+        return SQLiteQuery(self._db, self.collection_name, self.filters, (field, direction.upper()), self.limit_count)
+
+    def limit(self, count: int) -> 'SQLiteQuery':
+        """Limit results"""
+        return SQLiteQuery(self._db, self.collection_name, self.filters, self.order, count)
+
+    def get(self) -> List[SQLiteDoc]:
+        """Execute query (documents without a filtered or ordered field do not match)"""
+        order_field = self.order[0] if self.order else None
+        # Hint the index of an equality filter unless the ordering can use a different index
+        hint = next((field for field, operator, _ in self.filters if operator in ('==', 'in') and field in INDEXED_FIELDS), None)
+        if order_field in INDEXED_FIELDS and order_field != hint:
+            hint = None
+
+        sql = f"SELECT key, value {_from_documents(hint)} WHERE collection = ? AND key != ?"
+        params: List[Any] = [self.collection_name, SCALAR_KEY]
+        for field, operator, value in self.filters:
+            expr = _field_expr(field)
+            if operator == 'in':
+                values = list(value)
+                if not values:
+                    return []
+                sql += f" AND {expr} IN ({', '.join('?' * len(values))})"
+                params.extend(values)
+            else:
+                sql += f" AND {expr} {SQL_OPERATORS[operator]} ?"
+                params.append(value)
+
+        if self.order:
+            expr = _field_expr(order_field)
+            direction = 'DESC' if self.order[1] == 'DESCENDING' else 'ASC'
+            if any(field == order_field and operator == '==' for field, operator, _ in self.filters):
+                # One value: its index entries are already in key order
+                sql += f" ORDER BY key {direction}"
+            else:
+                sql += f" AND {expr} IS NOT NULL ORDER BY {expr} {direction}, key {direction}"
+        else:
+            sql += " ORDER BY key"
+        if self.limit_count:
+            sql += " LIMIT ?"
+            params.append(self.limit_count)
+
+        rows = self._db._reader().execute(sql, params).fetchall()
+        return [SQLiteDoc(key, json.loads(value)) for key, value in rows]
+
+
+class SQLiteCollection(SQLiteQuery):
+    """Firestore-style collection reference"""
+
+    def __init__(self, db: SQLiteRealtimeDB, collection_name: str):
+        super().__init__(db, collection_name)
+
+    def document(self, doc_id: str = None) -> SQLiteDocumentRef:
+        """Get document reference"""
+        return SQLiteDocumentRef(self._db, self.collection_name, doc_id or uuid.uuid4().hex)
+
+
+class AsyncSQLiteRealtimeDB:
+    """asyncio facade over SQLiteRealtimeDB matching AsyncFirebaseRealtimeDB
+
+    Calls run in worker threads so disk I/O does not block the event loop.
+    """
+
+    def __init__(self, sync_db: SQLiteRealtimeDB):
+        self._db = sync_db
+
+    async def get(self, path: str, query_params: Dict[str, Any] = None, timeout: Any = None) -> Any:
+        """Get data from a path"""
+        return await asyncio.to_thread(self._db.get, path)
+
+    async def set(self, path: str, data: Any, timeout: Any = None) -> bool:
+        """Set data at a path"""
+        return await asyncio.to_thread(self._db.set, path, data)
+
+    async def push(self, path: str, data: Any, timeout: Any = None) -> Optional[str]:
+        """Push data to a path (creates new entry with unique key)"""
+        return await asyncio.to_thread(self._db.push, path, data)
+
+    async def update(self, path: str, data: Dict[str, Any], timeout: Any = None) -> bool:
+        """Update data at a path"""
+        return await asyncio.to_thread(self._db.update, path, data)
+
+    async def delete(self, path: str, timeout: Any = None) -> bool:
+        """Delete data at a path"""
+        return await asyncio.to_thread(self._db.delete, path)
+
+    async def query(self, path: str, order_by: str = None, limit_to_first: int = None,
+                    limit_to_last: int = None, equal_to: Any = None, start_at: Any = None,
+                    end_at: Any = None, timeout: Any = None) -> Any:
+        """Query data with filters"""
+        return await asyncio.to_thread(
+            self._db.query, path, order_by=order_by, limit_to_first=limit_to_first,
+            limit_to_last=limit_to_last, equal_to=equal_to, start_at=start_at, end_at=end_at
+        )
+
+    def batch(self, chunk_size: int = None) -> WriteBatch:
+        """Collect writes to commit as multi-location updates (see write_batch)"""
+        return WriteBatch(self, chunk_size)
+
+    async def multi_update(self, updates: Dict[str, Any], chunk_size: int = None, timeout: Any = None) -> bool:
+        """Write many non-overlapping paths in one transaction (null deletes)"""
+        return await asyncio.to_thread(self._db.multi_update, updates)
+
+    def ref(self, path: str) -> Query:
+        """Query builder for the data at a path (see query_builder)"""
+        return Query(self, path)
+
+    async def get_with_etag(self, path: str, timeout: Any = None) -> Tuple[Any, Optional[str]]:
+        """Get data from a path together with its ETag"""
+        return await asyncio.to_thread(self._db.get_with_etag, path)
+
+    async def set_if_match(self, path: str, data: Any, etag: str, timeout: Any = None) -> Tuple[bool, Any, Optional[str]]:
+        """Compare-and-set: write only if the current ETag matches"""
+        return await asyncio.to_thread(self._db.set_if_match, path, data, etag)
+
+    async def reserve(self, path: str, value: Any, max_retries: int = 3, timeout: Any = None) -> Tuple[bool, Any]:
+        """Atomically claim an empty path (or one that already holds value)"""
+        return await asyncio.to_thread(self._db.reserve, path, value, max_retries)
+
+    async def get_collection(self, collection_name: str) -> Dict[str, Any]:
+        """Get all documents in a collection (same shape as AsyncFirebaseRealtimeDB)"""
+        return await asyncio.to_thread(self._db.get_collection, collection_name)
+
+    def collection(self, collection_name: str) -> SQLiteCollection:
+        """Firestore-style collection reference (its get() is synchronous)"""
+        return self._db.collection(collection_name)
+
+    async def aclose(self):
+        """Close the database connection"""
+        self._db.close()
+
+
+# Global instances
+firebase_db = SQLiteRealtimeDB()
+async_firebase_db = AsyncSQLiteRealtimeDB(firebase_db)
@@ -0,0 +1,43 @@
+"""
+Test setup: import the backend modules from the parent directory with a test
+configuration (no Firebase credentials, so the mock database is used)
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_DATA_DIR = tempfile.mkdtemp(prefix='leadg_tests_')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-with-at-least-32-characters')
+os.environ.setdefault('ADMIN_EMAIL', 'admin@example.com')
+os.environ.setdefault('ADMIN_PASSWORD_HASH', 'unused-in-tests')
+os.environ['FIREBASE_CREDENTIALS_PATH'] = '/nonexistent'
+os.environ['SQLITE_DB_PATH'] = os.path.join(_DATA_DIR, 'leadg.sqlite3')
+os.environ['MOCK_DB_DIR'] = ''
+os.environ['EXPORT_ARTIFACT_DIR'] = os.path.join(_DATA_DIR, 'exports')
+
+
+@pytest.fixture
+def mock_db():
+    """Empty in-memory mock database (blocking client)"""
+    import mock_realtime_db
+
+    mock_realtime_db.close_persistence()
+    mock_realtime_db._mock_storage.clear()
+    mock_realtime_db._indexes.clear()
+    yield mock_realtime_db.firebase_db
+    mock_realtime_db.close_persistence()
+    mock_realtime_db._mock_storage.clear()
+    mock_realtime_db._indexes.clear()
+
+
+@pytest.fixture
+def async_mock_db(mock_db):
+    """asyncio client of the empty mock database"""
+    import mock_realtime_db
+
+    return mock_realtime_db.async_firebase_db
@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from appointment_import import AppointmentImporter
+from slot_index import slot_path
+from timezone_utils import local_to_utc
+
+BOOKING = {
+    'name': 'Ada Lovelace',
+    'email': 'ada@example.com',
+    'phone': '+15551234567',
+    'appointment_date': '2032-03-04',
+    'appointment_time': '10:00',
+    'user_timezone': 'UTC',
+}
+
+
+@pytest.fixture
+def client(mock_db):
+    import server
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def admin_headers():
+    import server
+
+    token = server.create_access_token({'sub': server.ADMIN_EMAIL})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_booking_reserves_the_slot_and_rejects_a_double_booking(client, mock_db):
+    first = client.post('/api/appointments', json=BOOKING)
+    assert first.status_code == 200
+    appointment = first.json()
+    assert mock_db.get(slot_path(appointment['appointment_datetime_utc'])) == appointment['id']
+
+    second = client.post('/api/appointments', json=dict(BOOKING, email='other@example.com'))
+    assert second.status_code == 409
+    assert len(mock_db.get('appointments')) == 1
+
+
+def test_cancelling_releases_the_slot(client, mock_db, admin_headers):
+    appointment = client.post('/api/appointments', json=BOOKING).json()
+    path = slot_path(appointment['appointment_datetime_utc'])
+
+    response = client.put(f"/api/appointments/{appointment['id']}/status",
+                          json={'status': 'cancelled'}, headers=admin_headers)
+    assert response.status_code == 200
+    assert mock_db.get(path) is None
+
+    assert client.post('/api/appointments', json=dict(BOOKING, email='other@example.com')).status_code == 200
+
+
+def test_reactivating_into_a_taken_slot_is_a_conflict(client, mock_db, admin_headers):
+    appointment = client.post('/api/appointments', json=BOOKING).json()
+    client.put(f"/api/appointments/{appointment['id']}/status", json={'status': 'cancelled'}, headers=admin_headers)
+    other = client.post('/api/appointments', json=dict(BOOKING, email='other@example.com')).json()
+
+    response = client.put(f"/api/appointments/{appointment['id']}/status",
+                          json={'status': 'confirmed'}, headers=admin_headers)
+    assert response.status_code == 409
+    assert mock_db.get(slot_path(appointment['appointment_datetime_utc'])) == other['id']
+
+
+def _import(importer, rows):
+    async def chunks():
+        yield '\n'.join(json.dumps(row) for row in rows).encode()
+
+    async def run():
+        return [event async for event in importer.run(chunks(), 'ndjson')]
+    return asyncio.run(run())
+
+
+def _rows(*times):
+    return [dict(BOOKING, appointment_date='2033-01-01', appointment_time=time_value) for time_value in times]
+
+
+def _slot(time_value):
+    return slot_path(local_to_utc('2033-01-01', time_value, 'UTC').isoformat())
+
+
+def test_import_writes_appointments_and_claims_their_slots(async_mock_db, mock_db):
+    events = _import(AppointmentImporter(async_mock_db), _rows('09:00', '10:00', '10:00'))
+
+    assert events[:-1] == [{'row': 3, 'error': 'This appointment slot is already booked'}]
+    assert events[-1]['imported'] == 2 and events[-1]['failed'] == 1
+    appointments = mock_db.get('appointments')
+    assert {mock_db.get(_slot(t)) for t in ('09:00', '10:00')} == set(appointments)
+
+
+def test_import_rolls_back_slot_claims_when_the_batch_fails(async_mock_db, mock_db, monkeypatch):
+    async def failing_commit(self):
+        return False
+    monkeypatch.setattr('write_batch.WriteBatch.commit', failing_commit)
+
+    events = _import(AppointmentImporter(async_mock_db), _rows('09:00', '10:00'))
+
+    assert [event.get('error') for event in events[:-1]] == ['Failed to write appointment'] * 2
+    assert events[-1]['imported'] == 0 and events[-1]['failed'] == 2
+    assert mock_db.get('appointments') is None
+    assert mock_db.get(_slot('09:00')) is None and mock_db.get(_slot('10:00')) is None
+
+
+def test_import_reports_slots_booked_after_the_index_was_read(async_mock_db, mock_db):
+    importer = AppointmentImporter(async_mock_db)
+    load_slots = importer.load_slots
+
+    async def load_then_book():
+        await load_slots()
+        await async_mock_db.set(_slot('10:00'), 'public-booking')
+    importer.load_slots = load_then_book
+
+    events = _import(importer, _rows('09:00', '10:00'))
+
+    assert events[-1]['imported'] == 1 and events[-1]['failed'] == 1
+    assert mock_db.get(_slot('10:00')) == 'public-booking'
+    assert len(mock_db.get('appointments')) == 1
@@ -0,0 +1,152 @@
+import asyncio
+import io
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from imgbb_utils import ImgBBClient
+
+
+class StandInImgBB(ThreadingHTTPServer):
+    """Local stand-in for the ImgBB upload API
+
+    Answers the first len(failures) requests with those status codes, then
+    succeeds; every request's multipart form is recorded.
+    """
+
+    def __init__(self, failures=()):
+        super().__init__(('127.0.0.1', 0), _UploadHandler)
+        self.failures = list(failures)
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/1/upload"
+
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                chunk = self.rfile.read(size + 2)[:size]
+                if not size:
+                    return body
+                body += chunk
+        return self.rfile.read(int(self.headers['Content-Length']))
+
+    def do_POST(self):
+        body = self._read_body()
+        message = BytesParser(policy=HTTP).parsebytes(
+            b'Content-Type: ' + self.headers['Content-Type'].encode() + b'\r\n\r\n' + body
+        )
+        form = {
+            part.get_param('name', header='content-disposition'): (
+                part.get_filename(), part.get_content_type(), part.get_payload(decode=True)
+            )
+            for part in message.iter_parts()
+        }
+        self.server.requests.append(form)
+
+        if self.server.failures:
+            status = self.server.failures.pop(0)
+            self.send_response(status)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        payload = json.dumps({'success': True, 'data': {
+            'url': 'https://i.example/logo.png',
+            'display_url': 'https://i.example/display/logo.png',
+            'delete_url': 'https://i.example/delete/logo',
+        }}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def imgbb_server(request):
+    server = StandInImgBB(getattr(request, 'param', ()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TrackedFile(io.BytesIO):
+    """BytesIO recording the size of every read"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+def _upload(server, image, max_retries=3):
+    async def run():
+        client = ImgBBClient(api_url=server.url, api_key='test-key', max_retries=max_retries, backoff=0)
+        try:
+            return await client.upload(image, 'logo.png', 'image/png')
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_upload_streams_file_as_multipart_part(imgbb_server):
+    data = bytes(range(256)) * 1024  # 256 KB
+    image = TrackedFile(data)
+
+    result = _upload(imgbb_server, image)
+
+    assert result['success'] is True
+    assert result['url'] == 'https://i.example/logo.png'
+    [form] = imgbb_server.requests
+    assert form['key'][2] == b'test-key'
+    assert form['name'][2] == b'logo.png'
+    assert form['image'] == ('logo.png', 'image/png', data)
+    # Read in bounded chunks, never as one whole-file read
+    assert len(image.reads) > 1
+    assert all(0 < size <= 64 * 1024 for size in image.reads)
+
+
+@pytest.mark.parametrize('imgbb_server', [(503, 429)], indirect=True)
+def test_upload_retries_server_errors_and_resends_the_file(imgbb_server):
+    data = b'\x89PNG\r\n\x1a\n' + b'x' * 100_000
+
+    result = _upload(imgbb_server, io.BytesIO(data))
+
+    assert result['success'] is True
+    assert len(imgbb_server.requests) == 3
+    assert all(form['image'][2] == data for form in imgbb_server.requests)
+
+
+@pytest.mark.parametrize('imgbb_server', [(500, 500, 500)], indirect=True)
+def test_upload_gives_up_after_max_retries(imgbb_server):
+    result = _upload(imgbb_server, b'image-bytes', max_retries=2)
+
+    assert result == {'success': False, 'error': 'Upload failed with status code 500'}
+    assert len(imgbb_server.requests) == 3
+
+
+@pytest.mark.parametrize('imgbb_server', [(400,)], indirect=True)
+def test_upload_does_not_retry_client_errors(imgbb_server):
+    result = _upload(imgbb_server, b'image-bytes')
+
+    assert result['success'] is False
+    assert len(imgbb_server.requests) == 1
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import mock_realtime_db
+from mock_persistence import LOG_FILE, SNAPSHOT_FILE
+from query_builder import sort_rank
+
+VALUES = [None, True, False, 0, 1, 2.5, -3, 'a', 'b', 'pending', 'confirmed', {'x': 1}]
+
+
+def _random_doc(rng):
+    return {field: rng.choice(VALUES) for field in ('status', 'n') if rng.random() < 0.8}
+
+
+def _scan(data, order_by, equal_to=None, start_at=None, end_at=None, limit_to_first=None, limit_to_last=None):
+    """Keys a query should return, computed by sorting the whole collection"""
+    ranked = []
+    for key, doc in (data or {}).items():
+        if order_by == '$key':
+            rank = sort_rank(key)
+        elif isinstance(doc, dict) and order_by in doc:
+            rank = sort_rank(doc[order_by])
+        else:
+            continue
+        ranked.append((rank, key))
+    ranked.sort()
+    if equal_to is not None:
+        start_at = end_at = equal_to
+    if start_at is not None:
+        ranked = [item for item in ranked if item[0] >= sort_rank(start_at)]
+    if end_at is not None:
+        ranked = [item for item in ranked if item[0] <= sort_rank(end_at)]
+    if limit_to_first:
+        ranked = ranked[:limit_to_first]
+    if limit_to_last:
+        ranked = ranked[-limit_to_last:]
+    return [key for _, key in ranked]
+
+
+def test_indexed_queries_match_a_full_scan_across_writes(mock_db):
+    rng = random.Random(7)
+    for _ in range(2000):
+        key = f"k{rng.randint(0, 100)}"
+        op = rng.random()
+        if op < 0.4:
+            mock_db.set(f'coll/{key}', _random_doc(rng))
+        elif op < 0.5:
+            mock_db.update(f'coll/{key}', {'status': rng.choice(VALUES)})
+        elif op < 0.6:
+            mock_db.delete(f'coll/{key}')
+        elif op < 0.62:
+            mock_db.set(f'coll/{key}/n', rng.choice(VALUES))
+        else:
+            order_by = rng.choice(['status', 'n', '$key'])
+            params = {}
+            if rng.random() < 0.3:
+                params['equal_to'] = rng.choice(VALUES[:-1])
+            elif rng.random() < 0.5:
+                params['start_at'] = rng.choice(VALUES[:-1])
+            if rng.random() < 0.5:
+                params[rng.choice(['limit_to_first', 'limit_to_last'])] = rng.randint(1, 10)
+
+            result = mock_db.query('coll', order_by=order_by, **params)
+            assert list(result or {}) == _scan(mock_db.get('coll'), order_by, **params)
+
+
+def test_firestore_style_queries_use_the_indexes(mock_db):
+    for n in range(50):
+        mock_db.set(f'appointments/a{n:02d}', {'status': 'pending' if n % 3 else 'done', 'created_at': f'2030-01-{n % 28 + 1:02d}'})
+    mock_db.update('appointments/a03', {'status': 'pending'})
+    mock_db.delete('appointments/a01')
+
+    query = mock_realtime_db.MockQuery('appointments').where('status', '==', 'pending')
+    docs = query.order_by('created_at', 'DESCENDING').limit(5).get()
+
+    data = mock_db.get('appointments')
+    expected = sorted((key for key, doc in data.items() if doc['status'] == 'pending'),
+                      key=lambda key: (data[key]['created_at'], key), reverse=True)[:5]
+    assert [doc.id for doc in docs] == expected
+
+
+@pytest.fixture
+def wal_dir(tmp_path, mock_db):
+    directory = str(tmp_path / 'mockdb')
+    mock_realtime_db.enable_persistence(directory, fsync='always', snapshot_every=0)
+    yield directory
+
+
+def _reopen(directory, **kwargs):
+    mock_realtime_db.close_persistence()
+    mock_realtime_db._mock_storage.clear()
+    mock_realtime_db.enable_persistence(directory, fsync='always', **kwargs)
+
+
+def test_writes_are_replayed_after_a_restart(wal_dir, mock_db):
+    mock_db.set('appointments/a', {'status': 'pending'})
+    mock_db.update('appointments/a', {'status': 'confirmed'})
+    mock_db.set('appointments/b', {'status': 'pending'})
+    mock_db.delete('appointments/b')
+    mock_db.multi_update({'appointment_slots/2030-01-01/10:00': 'a', 'status_checks/x': {'ok': True}})
+    assert mock_db.reserve('appointment_slots/2030-01-01/11:00', 'a') == (True, 'a')
+    expected = mock_db.get('appointments'), mock_db.get('appointment_slots'), mock_db.get('status_checks')
+
+    _reopen(wal_dir)
+
+    assert (mock_db.get('appointments'), mock_db.get('appointment_slots'), mock_db.get('status_checks')) == expected
+
+
+def test_async_writes_are_durable_when_they_return(wal_dir, async_mock_db, mock_db):
+    async def write():
+        await asyncio.gather(*(async_mock_db.set(f'items/k{n}', n) for n in range(20)))
+    asyncio.run(write())
+    with open(os.path.join(wal_dir, LOG_FILE), 'rb') as f:
+        assert len(f.read().splitlines()) == 20
+
+    _reopen(wal_dir)
+
+    assert mock_db.get('items') == {f'k{n}': n for n in range(20)}
+
+
+def test_a_torn_log_tail_is_truncated(wal_dir, mock_db):
+    mock_db.set('items/a', 1)
+    mock_db.set('items/b', 2)
+    mock_realtime_db.close_persistence()
+    log_path = os.path.join(wal_dir, LOG_FILE)
+    intact_size = os.path.getsize(log_path)
+    with open(log_path, 'ab') as f:
+        f.write(b'0badf00d {"op":"set","path":"items/c","da')  # crash mid-append
+
+    _reopen(wal_dir)
+
+    assert mock_db.get('items') == {'a': 1, 'b': 2}
+    assert os.path.getsize(log_path) == intact_size
+    mock_db.set('items/d', 4)
+    _reopen(wal_dir)
+    assert mock_db.get('items') == {'a': 1, 'b': 2, 'd': 4}
+
+
+def test_a_corrupt_record_stops_replay(wal_dir, mock_db):
+    for n in range(3):
+        mock_db.set(f'items/k{n}', n)
+    mock_realtime_db.close_persistence()
+    log_path = os.path.join(wal_dir, LOG_FILE)
+    with open(log_path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    lines[1] = lines[1].replace(b'items/k1', b'items/kX')  # checksum no longer matches
+    with open(log_path, 'wb') as f:
+        f.writelines(lines)
+
+    _reopen(wal_dir)
+
+    assert mock_db.get('items') == {'k0': 0}
+    assert os.path.getsize(log_path) == len(lines[0])
+
+
+def test_compaction_writes_a_snapshot_and_replays_only_newer_records(wal_dir, mock_db):
+    _reopen(wal_dir, snapshot_every=5)
+    for n in range(12):
+        mock_db.set(f'items/k{n}', n)
+    mock_realtime_db._wal.compact(mock_realtime_db._mock_storage, wait=True)
+    mock_db.set('items/k0', 'after-snapshot')
+
+    _reopen(wal_dir)
+
+    assert os.path.exists(os.path.join(wal_dir, SNAPSHOT_FILE))
+    assert mock_db.get('items') == dict({f'k{n}': n for n in range(12)}, k0='after-snapshot')
+
+
+def test_a_directory_is_owned_by_one_process(wal_dir):
+    code = f"import mock_realtime_db; mock_realtime_db.enable_persistence({wal_dir!r})"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(mock_realtime_db.__file__))
+    assert result.returncode != 0
+    assert 'in use by another process' in result.stderr
@@ -0,0 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from sqlite_db import NULL_ETAG, SQLiteRealtimeDB
+
+SLOTS = 100
+PROCESSES = 4
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteRealtimeDB(str(tmp_path / 'test.sqlite3'))
+    yield database
+    database.close()
+
+
+def test_tree_reads_and_writes(db):
+    assert db.set('appointments/a', {'status': 'pending', 'meta': {'source': 'web'}})
+    assert db.update('appointments/a', {'status': 'confirmed', 'meta/source': 'import'})
+    assert db.set('appointment_slots/2030-01-01/10:00', 'a')
+    assert db.push('contact_forms', {'name': 'x'}) in db.get('contact_forms')
+
+    assert db.get('appointments/a') == {'status': 'confirmed', 'meta': {'source': 'import'}}
+    assert db.get('appointments/a/meta/source') == 'import'
+    assert db.get('appointment_slots') == {'2030-01-01': {'10:00': 'a'}}
+
+    assert db.delete('appointment_slots/2030-01-01/10:00')
+    assert db.get('appointment_slots') is None
+    assert db.set('health_check', 'ok') and db.get('health_check') == 'ok'
+
+
+def test_queries_run_in_sql(db):
+    for n in range(20):
+        db.set(f'appointments/a{n:02d}', {'status': 'pending' if n % 2 else 'confirmed', 'created_at': f'2030-01-{n + 1:02d}'})
+
+    newest = db.query('appointments', order_by='created_at', limit_to_last=3)
+    assert list(newest) == ['a17', 'a18', 'a19']
+    pending = db.query('appointments', order_by='status', equal_to='pending', limit_to_first=2)
+    assert list(pending) == ['a01', 'a03']
+    in_range = db.query('appointments', order_by='created_at', start_at='2030-01-05', end_at='2030-01-07')
+    assert list(in_range) == ['a04', 'a05', 'a06']
+
+    docs = db.collection('appointments').where('status', '==', 'confirmed').order_by('created_at', 'DESCENDING').limit(2).get()
+    assert [doc.id for doc in docs] == ['a18', 'a16']
+
+
+def test_compare_and_set(db):
+    assert db.get_with_etag('appointments/a') == (None, NULL_ETAG)
+    written, value, etag = db.set_if_match('appointments/a', {'status': 'pending'}, NULL_ETAG)
+    assert written and value == {'status': 'pending'}
+
+    assert db.set_if_match('appointments/a', {'status': 'stale'}, NULL_ETAG)[:2] == (False, {'status': 'pending'})
+    assert db.set_if_match('appointments/a', {'status': 'confirmed'}, etag)[0]
+
+    assert db.reserve('appointment_slots/2030-01-01/10:00', 'a') == (True, 'a')
+    assert db.reserve('appointment_slots/2030-01-01/10:00', 'a') == (True, 'a')
+    assert db.reserve('appointment_slots/2030-01-01/10:00', 'b') == (False, 'a')
+
+
+def test_multi_update_is_all_or_nothing(db, monkeypatch):
+    db.set('appointments/a', {'status': 'pending'})
+    assert db.multi_update({'appointments/a': None, 'appointments/b': {'status': 'pending'}})
+    assert db.get('appointments') == {'b': {'status': 'pending'}}
+
+    write = db._write
+
+    def fail_on_d(conn, parts, value):
+        if parts[-1] == 'd':
+            raise sqlite3.OperationalError('disk I/O error')
+        write(conn, parts, value)
+    monkeypatch.setattr(db, '_write', fail_on_d)
+
+    assert not db.multi_update({'appointments/c': {'status': 'pending'}, 'appointments/d': {'status': 'pending'}})
+    assert db.get('appointments') == {'b': {'status': 'pending'}}
+
+
+def _reserve_slots(db_path, owner):
+    """Try to claim every slot; runs in a separate process"""
+    db = SQLiteRealtimeDB(db_path)
+    try:
+        return [slot for slot in range(SLOTS) if db.reserve(f'appointment_slots/day/{slot}', owner)[0]]
+    finally:
+        db.close()
+
+
+def test_reserve_is_atomic_across_processes(tmp_path):
+    db_path = str(tmp_path / 'shared.sqlite3')
+    SQLiteRealtimeDB(db_path).close()
+
+    owners = [f'owner-{n}' for n in range(PROCESSES)]
+    with ProcessPoolExecutor(PROCESSES, mp_context=multiprocessing.get_context('spawn')) as pool:
+        won = dict(zip(owners, pool.map(_reserve_slots, [db_path] * PROCESSES, owners)))
+
+    assert sum(len(slots) for slots in won.values()) == SLOTS
+    db = SQLiteRealtimeDB(db_path)
+    stored = db.get('appointment_slots/day')
+    db.close()
+    assert {slot: owner for owner, slots in won.items() for slot in slots} == {int(k): v for k, v in stored.items()}
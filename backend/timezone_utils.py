@@ -0,0 +1,175 @@
+"""
+Timezone conversion helpers
+Converts between users' local date/time and the UTC instants stored for
+appointments. tzinfo objects are cached per name and the UTC offsets in
+effect during each UTC day are memoized, so converting many instants on
+the same day is an arithmetic lookup instead of a full tz database query.
+"""
+import logging
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, List, Tuple, Union
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+UTC = timezone.utc
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_DAY_SECONDS = 86400
+
+
+@lru_cache(maxsize=512)
+def get_timezone(timezone_str: str) -> ZoneInfo:
+    """Cached ZoneInfo for an IANA name; raises ValueError if unknown"""
+    try:
+        return ZoneInfo(timezone_str)
+    except Exception as e:
+        raise ValueError(f"Unknown timezone: {timezone_str}") from e
+
+
+def _offset_seconds(tz: ZoneInfo, utc_seconds: int) -> int:
+    """UTC offset (seconds) of tz at a UTC instant given in epoch seconds"""
+    return int((_EPOCH + timedelta(seconds=utc_seconds)).astimezone(tz).utcoffset().total_seconds())
+
+
+@lru_cache(maxsize=8192)
+def day_offsets(timezone_str: str, utc_day_ordinal: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """Offset table for one UTC day: (segment start second, offset seconds)
+
+    A day normally has a single segment; a day containing a DST transition
+    gets one segment per offset, located to the second.
+    """
+    tz = get_timezone(timezone_str)
+    day_start = (utc_day_ordinal - _EPOCH.toordinal()) * _DAY_SECONDS
+    starts = [0]
+    offsets = [_offset_seconds(tz, day_start)]
+
+    # Find each change of offset within the day by bisecting on seconds
+    seg_start = 0
+    while True:
+        end_offset = _offset_seconds(tz, day_start + _DAY_SECONDS - 1)
+        if end_offset == offsets[-1]:
+            break
+        low, high = seg_start, _DAY_SECONDS - 1
+        while low < high:
+            mid = (low + high) // 2
+            if _offset_seconds(tz, day_start + mid) == offsets[-1]:
+                low = mid + 1
+            else:
+                high = mid
+        seg_start = low
+        starts.append(seg_start)
+        offsets.append(_offset_seconds(tz, day_start + seg_start))
+
+    return tuple(starts), tuple(offsets)
+
+
+def parse_utc(utc_datetime_str: str) -> datetime:
+    """Parse an ISO datetime string as an aware UTC datetime (naive means UTC)"""
+    parsed = datetime.fromisoformat(utc_datetime_str.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=UTC)
+    return parsed.astimezone(UTC)
+
+
+def _to_local_fields(utc_datetime: datetime, timezone_str: str) -> Tuple[str, str]:
+    """Local (YYYY-MM-DD, HH:MM) of an aware UTC datetime via the day offset table"""
+    seconds_of_day = utc_datetime.hour * 3600 + utc_datetime.minute * 60 + utc_datetime.second
+    starts, offsets = day_offsets(timezone_str, utc_datetime.toordinal())
+    offset = offsets[bisect_right(starts, seconds_of_day) - 1]
+    local = utc_datetime + timedelta(seconds=offset)
+    return (
+        f"{local.year:04d}-{local.month:02d}-{local.day:02d}",
+        f"{local.hour:02d}:{local.minute:02d}"
+    )
+
+
+def utc_to_local(utc_datetime: Union[str, datetime], timezone_str: str) -> Tuple[str, str]:
+    """Convert a UTC ISO string or datetime to local (date, time) strings"""
+    get_timezone(timezone_str)
+    if isinstance(utc_datetime, str):
+        utc_datetime = parse_utc(utc_datetime)
+    elif utc_datetime.tzinfo is None:
+        utc_datetime = utc_datetime.replace(tzinfo=UTC)
+    else:
+        utc_datetime = utc_datetime.astimezone(UTC)
+    return _to_local_fields(utc_datetime, timezone_str)
+
+
+def utc_to_local_batch(utc_datetimes: Iterable[Union[str, datetime]], timezone_str: str) -> List[Tuple[str, str]]:
+    """Convert many UTC ISO strings or datetimes to local (date, time) pairs
+
+    Offset tables are looked up once per UTC day in the batch. Unparseable
+    entries come back as (None, None) so results stay aligned with the input.
+    """
+    get_timezone(timezone_str)
+    tables = {}
+    results = []
+    append = results.append
+    for value in utc_datetimes:
+        try:
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            offset = value.utcoffset()
+            if offset:
+                value = value - offset
+            ordinal = value.toordinal()
+
+            table = tables.get(ordinal)
+            if table is None:
+                starts, offsets = day_offsets(timezone_str, ordinal)
+                table = tables[ordinal] = (starts, tuple(timedelta(seconds=o) for o in offsets))
+            starts, deltas = table
+
+            if len(starts) == 1:
+                local = value + deltas[0]
+            else:
+                seconds_of_day = value.hour * 3600 + value.minute * 60 + value.second
+                local = value + deltas[bisect_right(starts, seconds_of_day) - 1]
+
+            iso = local.isoformat()
+            append((iso[:10], iso[11:16]))
+        except (ValueError, TypeError, AttributeError):
+            append((None, None))
+    return results
+
+
+def local_to_utc(date_str: str, time_str: str, timezone_str: str) -> datetime:
+    """Convert local date (YYYY-MM-DD) and time (HH:MM) to an aware UTC datetime
+
+    Matches pytz's localize(is_dst=False): an ambiguous time (clocks going
+    back) uses the standard-time offset and a nonexistent time (clocks going
+    forward) uses the offset before the transition.
+    """
+    tz = get_timezone(timezone_str)
+    naive = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+    local = naive.replace(tzinfo=tz)
+    later = local.replace(fold=1)
+
+    # fold=0 already gives the pre-transition offset inside a gap; only an
+    # ambiguous time (which round-trips with either fold) may switch folds
+    if local.utcoffset() != later.utcoffset():
+        if local.astimezone(UTC).astimezone(tz).replace(tzinfo=None) == naive:
+            if local.dst() or not later.dst():
+                local = later
+
+    return local.astimezone(UTC)
+
+
+def utc_days_for_local_date(date_str: str, timezone_str: str) -> List[str]:
+    """UTC days (YYYY-MM-DD) that overlap one local calendar day in a timezone
+
+    Raises ValueError for an invalid date or an unknown timezone.
+    """
+    tz = get_timezone(timezone_str)
+    local_start = datetime.strptime(date_str, '%Y-%m-%d').replace(tzinfo=tz)
+    utc_start = local_start.astimezone(UTC)
+    utc_end = (local_start + timedelta(days=1)).astimezone(UTC) - timedelta(microseconds=1)
+
+    days = []
+    day = utc_start.date()
+    while day <= utc_end.date():
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
@@ -0,0 +1,79 @@
+"""
+Request body size limits for upload endpoints
+Starlette parses multipart bodies completely (spooling file parts to disk)
+before the endpoint runs, so a size check inside the endpoint only happens
+after the whole upload was received. UploadLimitMiddleware enforces the limit
+while the body streams in: a declared Content-Length over the limit is
+refused before any body is read, and a body without one (chunked) is cut off
+at the first chunk that crosses the limit.
+"""
+import json
+import logging
+from typing import Iterable
+
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+# Room for the multipart boundaries, part headers and small form fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware capping the request body of the given POST paths
+
+    max_bytes is the allowed file size; the body may exceed it by
+    MULTIPART_OVERHEAD.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_bytes = max_bytes + MULTIPART_OVERHEAD
+        self.detail = f"File size exceeds maximum allowed size ({max_bytes / (1024 * 1024):g}MB)"
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST' or scope['path'] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        declared = None
+        for name, value in scope['headers']:
+            if name == b'content-length':
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = None
+                break
+        if declared is not None and declared > self.max_bytes:
+            logger.warning(f"Rejected {declared} byte upload to {scope['path']} (limit {self.max_bytes})")
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_bytes:
+                    logger.warning(f"Stopped upload to {scope['path']} after {received} bytes (limit {self.max_bytes})")
+                    # Raised inside form parsing; FastAPI passes HTTPException through
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=self.detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": self.detail}).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('latin-1')),
+                (b'connection', b'close'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
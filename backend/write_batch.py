@@ -0,0 +1,124 @@
+"""
+Batched multi-location writes for the Realtime Database
+Collects sets, updates and deletes and commits them as multi-location PATCH
+requests on the database root, so N writes cost one round trip (or one per
+chunk for large batches):
+
+    batch = firebase_db.batch()
+    for company in companies:
+        batch.set(f'worked_with_companies/{company.id}', company.dict())
+    batch.delete('appointments/old-id')
+    await batch.commit()        # plain call for the sync client
+
+Each PATCH is atomic; a batch larger than the chunk size is committed as
+several PATCHes in order, so an error can leave earlier chunks applied.
+"""
+import copy
+import logging
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def _parts(path: str) -> list:
+    """Path segments without empty parts"""
+    return [part for part in path.strip('/').split('/') if part]
+
+
+class WriteBatch:
+    """Accumulates writes as a {path: value} map of non-overlapping paths"""
+
+    def __init__(self, db, chunk_size: Optional[int] = None):
+        self._db = db
+        self.chunk_size = chunk_size
+        self._writes: Dict[str, Any] = {}
+        # Queued paths below each ancestor path, so overlap checks cost the path depth
+        self._descendants: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(self, path: str, data: Any) -> 'WriteBatch':
+        """Replace the data at path"""
+        self._put(_parts(path), copy.deepcopy(data))
+        return self
+
+    def update(self, path: str, data: Dict[str, Any]) -> 'WriteBatch':
+        """Merge the children of data into path (like update())"""
+        parts = _parts(path)
+        for key, value in data.items():
+            self._put(parts + _parts(key), copy.deepcopy(value))
+        return self
+
+    def delete(self, path: str) -> 'WriteBatch':
+        """Remove the data at path"""
+        self._put(_parts(path), None)
+        return self
+
+    @property
+    def writes(self) -> Dict[str, Any]:
+        """The multi-location update body"""
+        return dict(self._writes)
+
+    def commit(self, timeout: Any = None) -> Any:
+        """Send the batch (a coroutine for asyncio clients)"""
+        writes = self.writes
+        self._writes = {}
+        self._descendants = {}
+        return self._db.multi_update(writes, chunk_size=self.chunk_size, timeout=timeout)
+
+    def _put(self, parts: list, value: Any):
+        """Record a write, folding it into overlapping paths
+
+        The database rejects a multi-location update where one path is an
+        ancestor of another, so a later write either replaces descendants
+        already queued or is applied inside a queued ancestor's value.
+        """
+        if not parts:
+            raise ValueError("Batch writes to the database root are not supported")
+        path = '/'.join(parts)
+        ancestors = ['/'.join(parts[:depth]) for depth in range(1, len(parts))]
+
+        # Queued paths never overlap, so at most one ancestor can be queued
+        for depth, ancestor in enumerate(ancestors, 1):
+            if ancestor in self._writes:
+                self._writes[ancestor] = self._nested(self._writes[ancestor], parts[depth:], value)
+                return
+
+        for existing in [path, *self._descendants.pop(path, ())]:
+            if existing in self._writes:
+                del self._writes[existing]
+                self._forget(existing)
+
+        self._writes[path] = value
+        for ancestor in ancestors:
+            self._descendants.setdefault(ancestor, set()).add(path)
+
+    def _forget(self, path: str):
+        """Drop a replaced path from its ancestors' descendant sets"""
+        parts = path.split('/')
+        for depth in range(1, len(parts)):
+            ancestor = '/'.join(parts[:depth])
+            queued = self._descendants.get(ancestor)
+            if queued is not None:
+                queued.discard(path)
+                if not queued:
+                    del self._descendants[ancestor]
+
+    @staticmethod
+    def _nested(node: Any, parts: list, value: Any) -> Any:
+        """Copy of node with value written at the relative path parts"""
+        root = node if isinstance(node, dict) else {}
+        current = root
+        for part in parts[:-1]:
+            child = current.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return root or None
+                child = current[part] = {}
+            current = child
+        if value is None:
+            current.pop(parts[-1], None)
+        else:
+            current[parts[-1]] = value
+        return root or None